@@ -0,0 +1,113 @@
+"""
+bench_advance lays out a 500-page English corpus and reports the hits and misses of the word advance cache,
+see Font.advance, and the time of generation and layout with and without the cache.
+
+    python bench/bench_advance.py [--pages N] [--vocabulary N] [--backend headless|pdf]
+
+The words are drawn from a Zipf distribution like natural language: a few words are very frequent,
+most are rare. The headless backend provides the metrics of the standard PDF fonts, the pdf backend
+takes them from reportlab.
+"""
+import gc
+import os
+import sys
+import time
+import random
+import argparse
+import importlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pymates.markdown
+import pymates.sizes
+import pymates.fonts
+import pymates.dom
+from pymates.parser import Parser
+from pymates.scanner import Scanner
+from pymates.evaluator import Evaluator
+from pymates.treeify import treeify
+from pymates.generator import generate
+from pymates.lom import Layouter
+
+# The most frequent English words, in order of frequency
+_common = ("the of and to a in is you that it he was for on are as with his they I at be this have from or one had by "
+    "word but not what all were we when your can said there use an each which she do how their if will up other about "
+    "out many then them these so some her would make like him into time has look two more write go see number no way "
+    "could people my than first water been call who oil its now find long down day did get come made may part").split()
+
+"""
+corpus returns a document of chapters with about `pages` A4 pages of text and a vocabulary of `vocabulary` words.
+"""
+def corpus(pages, vocabulary, seed = 1):
+    rnd = random.Random(seed)
+    letters = "etaoinshrdlcumwfgypbvkjxqz"
+    words = list(_common)
+    while len(words) < vocabulary:
+        words.append("".join(rnd.choice(letters) for i in range(0, rnd.randint(3, 11))))
+    weights = [1 / (rank + 1) for rank in range(0, len(words))]
+    parts = []
+    # A chapter fills about ten pages. Text is emphasized now and then, such that the lines mix fonts
+    for chapter in range(0, max(1, round(pages / 10))):
+        parts.append(f"# Chapter {chapter + 1}\n\n")
+        for p in range(0, 52):
+            sentence = rnd.choices(words, weights, k = 180)
+            sentence[rnd.randrange(0, len(sentence))] = f"*{rnd.choice(words)}*"
+            parts.append(" ".join(sentence).capitalize() + ".\n\n")
+    return "".join(parts)
+
+def parse(src):
+    parser = Parser()
+    parser.addBuiltins(pymates.markdown)
+    parser.addBuiltins(pymates.sizes)
+    parser.setInput(Scanner(src))
+    parser.parse()
+    ev = Evaluator()
+    for step in (None, "counters", "references"):
+        ev.evaluate(parser.doc, parser.nspace, step)
+        if step == None:
+            treeify(parser.doc)
+    return parser.doc
+
+"""
+layout generates and lays out `src` with fonts which remember `maxAdvances` advances each.
+It returns the number of pages, the time and the statistics of the advance cache.
+"""
+def layout(src, maxAdvances):
+    doc = parse(src)
+    pymates.fonts._maxAdvances = maxAdvances
+    # New fonts start with empty caches and counters. The generator's caches of fonts are cleared by resetStyles
+    pymates.fonts.fonts.clear()
+    pymates.dom.resetStyles()
+    gc.collect()
+    start = time.perf_counter()
+    layouter = Layouter(generate(doc))
+    layouter.layout()
+    t = time.perf_counter() - start
+    return len(layouter.pages), t, pymates.fonts.advanceCacheStats()
+
+def main():
+    args = argparse.ArgumentParser(description = "Measures the word advance cache")
+    args.add_argument("--pages", type = int, default = 500, help = "Approximate number of pages")
+    args.add_argument("--vocabulary", type = int, default = 20000, help = "Number of distinct words")
+    args.add_argument("--repeat", type = int, default = 3, help = "Number of runs of which the best is reported")
+    args.add_argument("--backend", choices = ("headless", "pdf"), default = "headless", help = "Font metrics backend")
+    args = args.parse_args()
+    backend = importlib.import_module(f"pymates.{args.backend}backend")
+    if args.backend == "pdf":
+        backend.pdfInit()
+    pymates.fonts.setFontMetricsBackend(backend)
+    src = corpus(args.pages, args.vocabulary)
+    maxAdvances = pymates.fonts._maxAdvances
+    # Fonts, glyph tables and NumPy are loaded before measuring
+    layout(corpus(10, 100), maxAdvances)
+    print("cache size   pages       hits     misses  hit rate   time")
+    for size in (maxAdvances, 0):
+        best = None
+        for i in range(0, args.repeat):
+            pages, t, stats = layout(src, size)
+            best = t if best == None else min(best, t)
+        print(f"{size:10} {pages:7} {stats['hits']:10} {stats['misses']:10} {stats['hitRate'] * 100:8.2f}% {best:6.2f}s")
+    pymates.fonts._maxAdvances = maxAdvances
+
+if __name__ == "__main__":
+    main()
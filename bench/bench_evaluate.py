@@ -0,0 +1,72 @@
+"""
+bench_evaluate measures the evaluation of a section holding many inline function calls,
+alternating \\bold{x} and \\py(3), and checks that the time per call stays flat as the number of calls grows.
+
+    python bench/bench_evaluate.py [--calls N ...] [--ratio R]
+
+The script fails if the time per call at the largest count exceeds R times that at the smallest.
+"""
+import gc
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pymates.markdown
+import pymates.sizes
+from pymates.parser import Parser
+from pymates.scanner import Scanner
+from pymates.evaluator import Evaluator
+
+"""
+inlineCalls returns a document with one section holding `calls` inline function calls.
+"""
+def inlineCalls(calls):
+    return "# Section\n\n" + "text \\bold{x} and \\py(3) " * (calls // 2) + "\n"
+
+def parse(src):
+    parser = Parser()
+    parser.addBuiltins(pymates.markdown)
+    parser.addBuiltins(pymates.sizes)
+    parser.setInput(Scanner(src))
+    parser.parse()
+    return parser
+
+"""
+measure returns the time of evaluating step None of a document with `calls` inline calls.
+The document is parsed before measuring.
+"""
+def measure(calls, collect):
+    parser = parse(inlineCalls(calls))
+    gc.collect()
+    if not collect:
+        gc.disable()
+    try:
+        start = time.perf_counter()
+        Evaluator().evaluate(parser.doc, parser.nspace)
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+def main():
+    args = argparse.ArgumentParser(description = "Measures the evaluation of many inline calls under one section")
+    args.add_argument("--calls", type = int, nargs = "+", default = [10000, 25000, 50000, 100000], help = "Numbers of calls")
+    args.add_argument("--ratio", type = float, default = 2, help = "Largest accepted growth of the time per call")
+    args = args.parse_args()
+    perCall = []
+    print("    calls   without GC            with GC")
+    for calls in args.calls:
+        t = measure(calls, False)
+        tc = measure(calls, True)
+        perCall.append(t / calls)
+        print(f"{calls:9} {t * 1000:7.0f} ms {t / calls * 1e6:5.1f} us  {tc * 1000:7.0f} ms {tc / calls * 1e6:5.1f} us")
+    growth = perCall[-1] / perCall[0]
+    print(f"time per call grows {growth:.1f}x")
+    if growth > args.ratio:
+        print("NOT LINEAR")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+bench_scan measures how long Scanner.scan() needs for a multi-MB prose corpus
+and for a token-dense corpus built from test/example1.md.
+The time of building Tokens, which is what the Parser consumes, is reported as well.
+
+    python bench/bench_scan.py [--size MB] [--repeat N] [--baseline REV]
+
+With --baseline, the scanner of the git revision REV is measured as well, e.g. `--baseline b8b55e8`.
+"""
+import gc
+import os
+import sys
+import time
+import random
+import argparse
+import subprocess
+import importlib.util
+
+_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(_root, "src"))
+
+import pymates.scanner
+
+_words = ("the", "layout", "of", "a", "page", "is", "computed", "from", "blocks", "and", "text", "which",
+    "flows", "into", "boxes", "paragraph", "markdown", "section", "with", "some", "longer", "words", "to", "scan")
+
+"""
+proseCorpus returns about `size` characters of paragraphs and headings with little markup.
+"""
+def proseCorpus(size, seed = 1):
+    rnd = random.Random(seed)
+    parts = []
+    n = 0
+    while n < size:
+        if rnd.random() < 0.1:
+            p = "# " + " ".join(rnd.choice(_words) for i in range(0, 5)).capitalize() + "\n\n"
+        else:
+            lines = []
+            for l in range(0, rnd.randint(2, 8)):
+                lines.append(" ".join(rnd.choice(_words) for i in range(0, rnd.randint(8, 16))))
+            p = ".\n".join(lines) + ". Some *emphasis* and \\bold{bold} text.\n\n"
+        parts.append(p)
+        n += len(p)
+    return "".join(parts)
+
+"""
+denseCorpus returns about `size` characters made of copies of test/example1.md.
+"""
+def denseCorpus(size):
+    with open(os.path.join(_root, "test", "example1.md"), encoding = "utf-8") as file:
+        src = file.read() + "\n\n"
+    return src * (size // len(src) + 1)
+
+"""
+baselineScanner loads scanner.py of the git revision `rev` as a module.
+"""
+def baselineScanner(rev):
+    src = subprocess.check_output(["git", "show", f"{rev}:src/pymates/scanner.py"], cwd = _root)
+    spec = importlib.util.spec_from_loader("baseline_scanner", loader = None)
+    module = importlib.util.module_from_spec(spec)
+    exec(compile(src, f"{rev}:scanner.py", "exec"), module.__dict__)
+    return module
+
+def scanAll(module, src):
+    s = module.Scanner(src)
+    eof = module.Token.EoF
+    n = 0
+    while True:
+        r, t, txt = s.scan()
+        n += 1
+        if t == eof:
+            return n
+
+def tokenizeAll(module, src):
+    return len(module.Tokens(src))
+
+"""
+measure returns the best time of `repeat` runs and the number of tokens.
+Like timeit, the garbage collector is disabled while measuring.
+"""
+def measure(func, module, src, repeat):
+    best = None
+    for i in range(0, repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            n = func(module, src)
+            t = time.perf_counter() - start
+        finally:
+            gc.enable()
+        if best == None or t < best:
+            best = t
+    return best, n
+
+def main():
+    args = argparse.ArgumentParser(description = "Measures the scanner")
+    args.add_argument("--size", type = float, default = 4, help = "Size of each corpus in MB")
+    args.add_argument("--repeat", type = int, default = 3, help = "Number of runs of which the best is reported")
+    args.add_argument("--baseline", help = "git revision whose scanner is measured for comparison")
+    args = args.parse_args()
+    size = int(args.size * 1000000)
+    baseline = baselineScanner(args.baseline) if args.baseline else None
+    for name, src in (("prose", proseCorpus(size)), ("dense", denseCorpus(size))):
+        t, n = measure(scanAll, pymates.scanner, src, args.repeat)
+        line = f"{name:6} {len(src) / 1e6:5.1f} MB {n:8} tokens  scan {t:7.2f}s"
+        if baseline != None:
+            bt, bn = measure(scanAll, baseline, src, args.repeat)
+            if bn != n:
+                line += f"  baseline differs: {bn} tokens"
+            line += f"  baseline {bt:7.2f}s  {bt / t:5.1f}x"
+        t, n = measure(tokenizeAll, pymates.scanner, src, args.repeat)
+        print(line + f"  Tokens {t:7.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+bench_scan_linear checks that scanning time grows linearly with the size of adversarial inputs:
+very long lines, long runs of digits, deep indentation and long table rows.
+
+    python bench/bench_scan_linear.py [--size MB] [--steps N] [--ratio R]
+
+Each corpus is scanned at `--size` MB and at N - 1 doubled sizes. The script fails if doubling
+the input multiplies the scanning time by more than R.
+"""
+import sys
+import argparse
+# bench_scan makes pymates importable
+from bench_scan import scanAll, measure
+import pymates.scanner
+
+"""
+longLine returns a single line of about `size` characters with inline markup.
+"""
+def longLine(size):
+    unit = "word *emph* \\bold{x} `code` $m$ | "
+    return unit * (size // len(unit) + 1)
+
+"""
+digitRuns returns lines which start with runs of 1000 digits, some of them ending in '.',
+and text holding long digit runs.
+"""
+def digitRuns(size):
+    digits = "1234567890" * 100
+    unit = f"{digits}\n\n{digits}. item\n\ntext {digits} {digits}.\n\n"
+    return unit * (size // len(unit) + 1)
+
+"""
+deepIndent returns lines indented by 5000 blanks, each holding many short tokens.
+"""
+def deepIndent(size):
+    unit = " " * 5000 + "*a* " * 10000 + "\n"
+    return unit * (size // len(unit) + 1)
+
+"""
+indentedList returns list items indented by 2000 blanks.
+"""
+def indentedList(size):
+    unit = " " * 2000 + "- item\n" + " " * 2000 + "1. item\n"
+    return unit * (size // len(unit) + 1)
+
+"""
+tableRows returns a table with rows of 1000 cells.
+"""
+def tableRows(size):
+    unit = "| cell " * 1000 + "|\n"
+    return "\n" + unit * (size // len(unit) + 1)
+
+corpora = (longLine, digitRuns, deepIndent, indentedList, tableRows)
+
+def main():
+    args = argparse.ArgumentParser(description = "Checks that scanning adversarial inputs takes linear time")
+    args.add_argument("--size", type = float, default = 0.25, help = "Smallest size of each corpus in MB")
+    args.add_argument("--steps", type = int, default = 4, help = "Number of sizes, each twice the previous one")
+    args.add_argument("--ratio", type = float, default = 3, help = "Largest accepted time ratio when the size doubles")
+    args.add_argument("--repeat", type = int, default = 1, help = "Number of runs of which the best is reported")
+    args = args.parse_args()
+    failed = False
+    for corpus in corpora:
+        times = []
+        for step in range(0, args.steps):
+            size = int(args.size * 1000000) << step
+            t, n = measure(scanAll, pymates.scanner, corpus(size), args.repeat)
+            times.append(t)
+        ratios = [b / a for a, b in zip(times, times[1:]) if a > 0.01]
+        worst = max(ratios, default = 0)
+        ok = worst <= args.ratio
+        failed = failed or not ok
+        print(f"{corpus.__name__:13} " + " ".join(f"{t:6.2f}s" for t in times) + f"   worst ratio {worst:4.1f}" + ("" if ok else "   NOT LINEAR"))
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+bench_stream_memory measures the peak memory of laying out a synthetic book with tracemalloc,
+when it is streamed page by page and when the whole document is generated and laid out at once.
+
+    python bench/bench_stream_memory.py [--pages N ...] [--ratio R]
+
+The book is parsed and evaluated before measuring, hence only the memory of generation and layout is counted.
+The script fails if the streamed peak of the largest book exceeds R times that of the smallest.
+"""
+import gc
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pymates.markdown
+import pymates.sizes
+import pymates.fonts
+import pymates.headlessbackend
+from pymates.parser import Parser
+from pymates.scanner import Scanner
+from pymates.evaluator import Evaluator
+from pymates.treeify import treeify
+from pymates.generator import generate, generateStream
+from pymates.lom import Layouter
+
+pymates.fonts.setFontMetricsBackend(pymates.headlessbackend)
+
+_paragraph = ("Text is laid out in blocks, which are broken into lines and distributed over the pages of the flow. "
+    "Some words are *emphasized* and some are \\bold{bold}, such that the lines mix fonts. ") * 3
+
+"""
+book returns a document of chapters with about `pages` A4 pages of text.
+"""
+def book(pages):
+    parts = []
+    # A chapter fills about ten pages
+    for chapter in range(0, max(1, round(pages / 10))):
+        parts.append(f"# Chapter {chapter + 1}\n\n")
+        for i in range(0, 95):
+            parts.append(_paragraph + "\n\n")
+    return "".join(parts)
+
+def parse(src):
+    parser = Parser()
+    parser.addBuiltins(pymates.markdown)
+    parser.addBuiltins(pymates.sizes)
+    parser.setInput(Scanner(src))
+    parser.parse()
+    ev = Evaluator()
+    for step in (None, "counters", "references"):
+        ev.evaluate(parser.doc, parser.nspace, step)
+        if step == None:
+            treeify(parser.doc)
+    return parser.doc
+
+"""
+_Painter accepts the calls of Page.draw.
+"""
+class _Painter:
+    def startText(self, x, y):
+        pass
+
+    def setPen(self, color):
+        pass
+
+    def setFont(self, font):
+        pass
+
+    def drawText(self, x, y, txt):
+        pass
+
+def streamed(doc):
+    painter = _Painter()
+    pages = 0
+    for page in Layouter(generateStream(doc)).layoutPages():
+        page.draw(painter)
+        page.release()
+        pages += 1
+    return pages
+
+def batch(doc):
+    painter = _Painter()
+    layouter = Layouter(generate(doc))
+    layouter.layout()
+    for page in layouter.pages:
+        page.draw(painter)
+    return len(layouter.pages)
+
+"""
+peak returns the number of pages, the peak of the memory allocated by `layout(doc)` in bytes and the time.
+"""
+def peak(layout, doc):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        pages = layout(doc)
+        return pages, tracemalloc.get_traced_memory()[1], time.perf_counter() - start
+    finally:
+        tracemalloc.stop()
+
+def main():
+    args = argparse.ArgumentParser(description = "Measures the peak memory of streamed and batch layout")
+    args.add_argument("--pages", type = int, nargs = "+", default = [250, 500, 1000, 2000], help = "Approximate numbers of pages")
+    args.add_argument("--ratio", type = float, default = 1.5, help = "Largest accepted growth of the streamed peak")
+    args.add_argument("--no-batch", action = "store_true", help = "Measure streamed layout only")
+    args = args.parse_args()
+    peaks = []
+    # Fonts and caches are loaded before measuring
+    streamed(parse(book(10)))
+    print("    pages   streamed peak             batch peak")
+    for n in args.pages:
+        doc = parse(book(n))
+        pages, streamedPeak, t = peak(streamed, doc)
+        peaks.append(streamedPeak)
+        line = f"{pages:9} {streamedPeak / 1e6:8.2f} MB {t:6.1f}s"
+        if not args.no_batch:
+            pages, batchPeak, t = peak(batch, doc)
+            line += f"   {batchPeak / 1e6:8.2f} MB {t:6.1f}s"
+        print(line)
+    growth = peaks[-1] / peaks[0]
+    print(f"streamed peak grows {growth:.2f}x")
+    if growth > args.ratio:
+        print("NOT FLAT")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+bench_treeify measures treeify on synthetic documents of headings, paragraphs, nested bullet items
+and inline nodes, and checks that the time per node stays flat up to a million nodes.
+
+    python bench/bench_treeify.py [--nodes N ...] [--ratio R]
+
+The script fails if the time per node at the largest size exceeds R times that at the smallest.
+"""
+import gc
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pymates.markdown
+from pymates.dom import DocumentNode, StyleNode
+from pymates.treeify import treeify
+
+_bold = {"fontWeight": 700}
+
+"""
+document returns a DocumentNode whose children are about `nodes` sections and inline nodes,
+in the order in which the parser emits them.
+"""
+def document(nodes):
+    doc = DocumentNode(pymates.markdown.document)
+    children = []
+    n = 0
+    i = 0
+    while n < nodes:
+        heading = pymates.markdown.h1() if i % 10 == 0 else pymates.markdown.h2()
+        heading.indent = 0
+        children.append(heading)
+        children.append(f"Heading {i}")
+        p = pymates.markdown.p()
+        p.indent = 0
+        children.append(p)
+        children.append("Some text with ")
+        children.append(StyleNode(pymates.markdown.style, _bold, "bold"))
+        children.append(" words.")
+        n += 6
+        # Items nested three levels deep
+        for indent in (0, 2, 4, 2, 0):
+            item = pymates.markdown.bulletitem()
+            item.indent = indent
+            children.append(item)
+            children.append("Item")
+            n += 2
+        i += 1
+    doc.children = children
+    for c in children:
+        if not isinstance(c, str):
+            c.parent = doc
+    return doc, n
+
+def measure(nodes):
+    doc, n = document(nodes)
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        treeify(doc)
+        return time.perf_counter() - start, n
+    finally:
+        gc.enable()
+
+def main():
+    args = argparse.ArgumentParser(description = "Measures treeify on synthetic documents")
+    args.add_argument("--nodes", type = int, nargs = "+", default = [10000, 100000, 300000, 1000000], help = "Numbers of nodes")
+    args.add_argument("--ratio", type = float, default = 2, help = "Largest accepted growth of the time per node")
+    args = args.parse_args()
+    perNode = []
+    for nodes in args.nodes:
+        t, n = measure(nodes)
+        perNode.append(t / n)
+        print(f"{n:9} nodes {t * 1000:7.0f} ms {t / n * 1e6:5.2f} us")
+    growth = perNode[-1] / perNode[0]
+    print(f"time per node grows {growth:.1f}x")
+    if growth > args.ratio:
+        print("NOT LINEAR")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
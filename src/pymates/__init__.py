@@ -0,0 +1,7 @@
+__version__ = "0.0.1"
+
+"""
+PymatesError is the base of the errors raised by pymates for documents it cannot process.
+"""
+class PymatesError(Exception):
+    pass
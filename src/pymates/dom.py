@@ -2,65 +2,243 @@ import pymates.sizes
 from functools import wraps
 from enum import Enum
 
+"""
+mergeStyle returns a style with the entries of `s1` and `s2`. Entries of `s2` override those of `s1`, except for
+"pageBox" entries, which are collected in a list. The merge of two interned styles is interned and computed only once.
+"""
 def mergeStyle(s1, s2):
+    if isinstance(s1, FrozenStyle) and isinstance(s2, FrozenStyle) and s1.interned and s2.interned:
+        key = (id(s1), id(s2))
+        entry = _mergedStyles.get(key)
+        # The entry keeps `s1` and `s2` alive, such that their ids cannot be reused by other styles
+        if entry != None and entry[0] is s1 and entry[1] is s2:
+            return entry[2]
+        s = internStyle(_mergeStyle(s1, s2))
+        _mergedStyles[key] = (s1, s2, s)
+        return s
+    return _mergeStyle(s1, s2)
+
+def _mergeStyle(s1, s2):
     s = {}
     for k in s1:
         s[k] = s1[k]
     for k in s2:
         if k == "pageBox" and "pageBox" in s:
             if isinstance(s[k], list):
-                s[k].append(s2[k])
+                # `s1` may be shared, hence its list is not modified
+                s[k] = s[k] + [s2[k]]
             else:
                 s[k] = [s[k], s2[k]]
         else:
             s[k] = s2[k]
     return s
 
+"""
+FrozenStyle is a style which cannot be modified. Node factories share one FrozenStyle between all the nodes
+they create instead of giving each node a dict of its own. Styles are changed by replacing them, e.g. by the result of mergeStyle.
+"""
+class FrozenStyle(dict):
+    __slots__ = ("interned",)
+
+    def __init__(self, *args, **kwargs):
+        super(FrozenStyle, self).__init__(*args, **kwargs)
+        # True if this is the one style with its content, see internStyle
+        self.interned = False
+
+    def _readOnly(self, *args, **kwargs):
+        raise BaseException("A shared style cannot be modified")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _readOnly
+
+    def __reduce__(self):
+        return (internStyle if self.interned else FrozenStyle, (dict(self),))
+
+# Interned styles by the keys of their content, see _styleKey
+_internedStyles = {}
+# Merged interned styles as tuples (s1, s2, merged) by the ids of the styles s1 and s2 which have been merged
+_mergedStyles = {}
+# Functions which clear caches keyed by the ids of interned styles, see onResetStyles
+_styleCaches = []
+
+"""
+internStyle returns the FrozenStyle which is shared by all styles with the same content as `style`.
+Interned styles are not freed until resetStyles is called. Hence caches can identify them by `id`,
+e.g. the caches of the generator, if they register with onResetStyles.
+A style holding values which cannot be hashed is not interned.
+"""
+def internStyle(style):
+    if isinstance(style, FrozenStyle) and style.interned:
+        return style
+    try:
+        key = _styleKey(style)
+        s = _internedStyles.get(key)
+    except TypeError:
+        return style if isinstance(style, FrozenStyle) else FrozenStyle(style)
+    if s == None:
+        s = FrozenStyle(style)
+        s.interned = True
+        _internedStyles[key] = s
+    return s
+
+"""
+resetStyles forgets all interned styles, such that the styles of documents which are no longer used can be freed.
+Caches registered with onResetStyles are cleared as well.
+"""
+def resetStyles():
+    _internedStyles.clear()
+    _mergedStyles.clear()
+    for clear in _styleCaches:
+        clear()
+
+"""
+onResetStyles registers `clear`, which is called by resetStyles to clear a cache keyed by the ids of interned styles.
+"""
+def onResetStyles(clear):
+    _styleCaches.append(clear)
+
+"""
+_styleKey returns a hashable value which is equal for equal styles, lists, tuples and values.
+Values of different types are distinguished, e.g. True and 1.
+"""
+def _styleKey(value):
+    if isinstance(value, dict):
+        return (dict,) + tuple((k, _styleKey(value[k])) for k in sorted(value))
+    if isinstance(value, (list, tuple)):
+        return (type(value),) + tuple(_styleKey(v) for v in value)
+    return (type(value), value)
+
 def checkBool(key, val):
     if not isinstance(val, bool):
         raise BaseException(f"Argument {key} is not a boolean")
 
+"""
+_structure identifies the current arrangement of the nodes. It is replaced whenever a node which has a parent
+is moved to another parent or detached, see structureChanged. Adding a node which has no parent yet does not replace it.
+It is an object instead of a number, such that the tokens of pickled nodes never equal the current one.
+"""
+_structure = object()
+# True if nodes have cached their document and section since `_structure` has been replaced
+_structureUsed = False
+
+"""
+structureChanged invalidates the documents and sections which nodes have cached.
+"""
+def structureChanged():
+    global _structure, _structureUsed
+    if _structureUsed:
+        _structure = object()
+        _structureUsed = False
+
+"""
+Node is the base of all DOM nodes. Nodes have no instance dicts, each class lists its attributes in `__slots__`.
+`children` is None as long as a node has no children. The list is created by the first `append`.
+
+A node caches its document and section in `_cache` as a tuple (structure, document, section).
+They are valid as long as `structure` is the current `_structure`. Hence the parents of nodes must be changed with `append`, `insertChild` or `setParent`,
+or `structureChanged` must be called afterwards.
+"""
 class Node:
+    __slots__ = ("func", "children", "indent", "className", "parent", "_cache")
+
     def __init__(self, func, children=None):
         self.func = func
-        if children == None:
-            self.children = []
-        elif isinstance(children, tuple):
-            self.children = list(children)
+        self.parent = None
+        self._cache = None
+        if children == None or len(children) == 0:
+            self.children = None
         else:
+            if isinstance(children, tuple):
+                children = list(children)
             self.children = children
-        for c in self.children:
-            c.parent = self
+            for c in children:
+                if _structureUsed and c.parent != None:
+                    c.setParent(self)
+                else:
+                    c.parent = self
         self.indent = -1
         self.className = None
-        self.parent = None
         
     def append(self, *children):
+        if self.children == None:
+            self.children = []
         for c in children:
             self.children.append(c)
             if not isinstance(c, str):
-                c.parent = self
+                if _structureUsed and c.parent != None:
+                    c.setParent(self)
+                else:
+                    c.parent = self
 
     def insertChild(self, pos, child):
+        if self.children == None:
+            self.children = []
         self.children.insert(pos, child)#
         if not isinstance(child, str):
-            child.parent = self
+            child.setParent(self)
+
+    """
+    setParent makes `parent` the parent of the node without adding the node to the children of `parent`.
+    `parent` can be None to detach the node.
+    """
+    def setParent(self, parent):
+        # Nothing has to be invalidated if no node has cached its document since the last change
+        if _structureUsed and self.parent != None and self.parent != parent:
+            if self.children == None or len(self.children) == 0:
+                # Only the node itself has cached the old document and section
+                self._cache = None
+            else:
+                structureChanged()
+        self.parent = parent
 
     def document(self):
-        if isinstance(self, DocumentNode):
-            return self
-        if self.parent != None:
-            return self.parent.document()
-        return None
+        cache = self._cache
+        if cache == None or cache[0] != _structure:
+            cache = self._lookup()
+        return cache[1]
 
+    """
+    section returns the closest ParagNode, which is the node itself or one of its ancestors.
+    """
     def section(self):
-        if isinstance(self, ParagNode):
-            return self
-        if self.parent != None:
-            return self.parent.section()
-        return None
+        cache = self._cache
+        if cache == None or cache[0] != _structure:
+            cache = self._lookup()
+        return cache[2]
+
+    """
+    _lookup determines the document and section of the node and caches them in the node and in its ancestors,
+    up to the first ancestor which knows them. Nothing is cached for nodes which are not part of a document.
+    It returns the new value of `_cache`.
+    """
+    def _lookup(self):
+        global _structureUsed
+        _structureUsed = True
+        path = []
+        n = self
+        while True:
+            cache = n._cache
+            if cache != None and cache[0] == _structure:
+                break
+            if isinstance(n, DocumentNode):
+                cache = (_structure, n, None)
+                n._cache = cache
+                break
+            path.append(n)
+            n = n.parent
+            if n == None:
+                for n in path:
+                    if isinstance(n, ParagNode):
+                        return (None, None, n)
+                return (None, None, None)
+        for n in reversed(path):
+            if isinstance(n, ParagNode):
+                cache = (_structure, cache[1], n)
+            n._cache = cache
+        return cache
 
 class DocumentNode(Node):
+    __slots__ = ("style", "labels", "counters", "vars", "isDefaultContainer", "isExplicitContainer", "parentContainer", "functions")
+
     def __init__(self, func):
         super(DocumentNode, self).__init__(func)
         self.style = {"pageSize": pymates.sizes.A4, "margin": pymates.sizes.Margin(20, 20, 20, 20), "pageBox": []}
@@ -70,6 +248,21 @@ class DocumentNode(Node):
         self.isDefaultContainer = True
         self.isExplicitContainer = True
         self.parentContainer = None
+        # Maps an evaluation step to the FunctionNodes which are evaluated in this step.
+        # None if the FunctionNodes of the document have not been indexed.
+        self.functions = None
+
+    """
+    indexFunction adds the FunctionNode `node` to the nodes which are evaluated in the step `node.className`.
+    A node which has been indexed already is not added again.
+    """
+    def indexFunction(self, node):
+        if node.isIndexed:
+            return
+        node.isIndexed = True
+        if self.functions == None:
+            self.functions = {}
+        self.functions.setdefault(node.className, []).append(node)
 
     def setLabel(self, name, node):
         if name in self.labels:
@@ -103,6 +296,8 @@ class DocumentNode(Node):
         return self.vars[name]
 
 class ParagNode(Node):
+    __slots__ = ("style", "config", "parentContainer", "isDefaultContainer", "isExplicitContainer", "_refName")
+
     def __init__(self, func, style = None, children=None, config = None, parentContainer = None, isDefaultContainer = False, isExplicitContainer = False):
         super(ParagNode, self).__init__(func, children)
         self.style = style
@@ -128,6 +323,8 @@ class ParagNode(Node):
         return self._isContainer
 
 class StyleNode(Node):
+    __slots__ = ("style",)
+
     def __init__(self, func, style, child = None):
         super(StyleNode, self).__init__(func)
         self.style = style
@@ -140,12 +337,16 @@ class StyleNode(Node):
 #                else: raise BaseException(f"Argument {k} is not a supported style option")
 
 class SpanNode(Node):
+    __slots__ = ()
+
     def __init__(self, func, children = None):
         super(SpanNode, self).__init__(func)
-        if children != None:
+        if children != None and len(children) != 0:
             self.children = children
 
 class MathNode(Node):
+    __slots__ = ()
+
     def __init__(self, func, children):
         super(MathNode, self).__init__(func)
         self.children = children
@@ -156,12 +357,15 @@ class FunctionNodeMode(Enum):
     Section = 3
 
 class FunctionNode(Node):
+    __slots__ = ("mode", "args", "kwargs", "evaluateArgs", "isIndexed")
+
     def __init__(self, func, mode, args, kwargs):
         super(FunctionNode, self).__init__(func)
         self.mode = mode
         self.args = args
         self.kwargs = kwargs
         self.evaluateArgs = False
+        self.isIndexed = False
 
 def section(className):
     def decorator(func):
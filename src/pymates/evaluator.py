@@ -1,10 +1,93 @@
+import ast
+from collections import OrderedDict
 from pymates.dom import Node, FunctionNode, SpanNode, StyleNode, DocumentNode
+from pymates.visitor import Dispatcher, Visitor
+import pymates.trace
+import pymates.timing
+
+_trace = pymates.trace.category("evaluator")
+_profiler = pymates.timing.profiler
+
+# Compiled argument expressions, shared by all evaluation steps and documents.
+# Maps the text of an expression to a tuple (isConstant, value), where value is either the folded constant or a code object.
+# The least recently used expressions are dropped once the cache holds more than `_maxExpressions`.
+_expressions = OrderedDict()
+_maxExpressions = 4096
+_expressionHits = 0
+_expressionMisses = 0
+# Syntax which an expression consisting of literals only may contain
+_constantSyntax = (ast.Expression, ast.Constant, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.Tuple, ast.Load, ast.operator, ast.unaryop, ast.boolop, ast.cmpop)
+# Folded values are shared by all calls. Hence only immutable values are folded
+_immutableTypes = (int, float, complex, str, bytes, bool, type(None))
+
+"""
+compileExpression returns a tuple (isConstant, value) for the Python expression `text`.
+If the expression consists of literals only, it is evaluated once and value is the result.
+Otherwise value is the compiled code object.
+"""
+def compileExpression(text):
+    global _expressionHits, _expressionMisses
+    entry = _expressions.get(text)
+    if entry != None:
+        _expressionHits += 1
+        _expressions.move_to_end(text)
+        return entry
+    _expressionMisses += 1
+    # Like eval(), ignore leading blanks
+    tree = ast.parse(text.lstrip(" \t"), mode = "eval")
+    code = compile(tree, "<string>", "eval")
+    entry = (False, code)
+    if all(isinstance(n, _constantSyntax) for n in ast.walk(tree)):
+        try:
+            value = eval(code, {"__builtins__": {}})
+            if _isImmutable(value):
+                entry = (True, value)
+        except Exception:
+            # The error is raised again when the expression is evaluated
+            pass
+    _expressions[text] = entry
+    if len(_expressions) > _maxExpressions:
+        _expressions.popitem(last = False)
+    return entry
+
+def _isImmutable(value):
+    if isinstance(value, tuple):
+        return all(_isImmutable(v) for v in value)
+    return isinstance(value, _immutableTypes)
+
+"""
+evaluateExpression evaluates the Python expression `text` with the builtins `nspace` as globals.
+"""
+def evaluateExpression(text, nspace):
+    isConstant, value = compileExpression(text)
+    if isConstant:
+        return value
+    return eval(value, nspace)
+
+"""
+expressionCacheStats returns the number of hits and misses of the expression cache, its hit rate and its size.
+"""
+def expressionCacheStats():
+    lookups = _expressionHits + _expressionMisses
+    return {"hits": _expressionHits, "misses": _expressionMisses, "hitRate": _expressionHits / lookups if lookups != 0 else 0, "size": len(_expressions)}
+
   
-class Evaluator:
+"""
+Evaluator calls the functions of an evaluation step. The children of a node are handled by the methods
+registered with `_dispatcher` for their class, see the end of this module. They are called as
+`handler(evaluator, node, parent, nspace)` and return the nodes which replace `node`, or None to keep it.
+"""
+class Evaluator(Visitor):
     def __init__(self):
+        super().__init__(_dispatcher)
         self.doc = None
         self.step = None
 
+    """
+    evaluate calls the functions of the current step in the tree `node`.
+    For a document, the step is `step` and only the FunctionNodes indexed for this step are visited.
+    Otherwise the whole tree is searched for them.
+    """
     def evaluate(self, node, nspace, step = None):
         if isinstance(node, str):
             return
@@ -14,82 +97,262 @@ class Evaluator:
         elif isinstance(node, DocumentNode):
             self.doc = node
             self.step = step
+            with _profiler.span(f"evaluate {step}"):
+                if node.functions == None:
+                    indexFunctions(node)
+                self.evaluateIndexed(nspace)
+            return
         self.evaluateChildren(node, nspace)
 
+    """
+    evaluateIndexed calls the functions which are indexed for the current step in document order.
+    A function which is nested in a FunctionNode of another step is not called, just like when searching the tree.
+    Such functions remain in the index. Functions which are no longer part of the document are dropped from it.
+    """
+    def evaluateIndexed(self, nspace):
+        functions = self.doc.functions
+        positions = _Positions(self.doc)
+        nodes = []
+        waiting = []
+        for node in functions.pop(self.step, []):
+            path, isNested = positions.position(node)
+            if isNested:
+                waiting.append(node)
+            elif path != None:
+                nodes.append((path, node))
+        # Functions may have been moved, e.g. by treeify. Hence their order is determined for each step
+        nodes.sort(key = _path)
+        positions.hints = {}
+        # Maps parents to the replacements of their children, see _splice.
+        # The children are replaced once all functions have been called.
+        replacements = {}
+        for path, node in nodes:
+            # The node has been evaluated as an argument of another function already?
+            parent = node.parent
+            if parent == None:
+                continue
+            i = positions.index(parent, node)
+            if i == None:
+                continue
+            positions.hints[parent] = i + 1
+            replacements.setdefault(parent, []).append((i, self.evaluateFunction(parent, node, nspace)))
+        for parent, r in replacements.items():
+            parent.children[:] = _splice(parent.children, r)
+        if len(waiting) != 0:
+            functions.setdefault(self.step, []).extend(waiting)
+
+    """
+    evaluateChildren calls the functions of the current step below `parent`.
+    The children of each node are replaced by the results in one pass.
+    """
     def evaluateChildren(self, parent, nspace):
         nodes = parent.children
         if nodes == None:
             return
-        i = 0
-        while i < len(nodes):
-            node = nodes[i]
-            if isinstance(node, FunctionNode):
-                # Do not evaluate the function in the current step?
-                if node.className != self.step:
-                    i += 1
-                    continue
-                print(f"Calling {node.func.__name__} {node.className}")
-                # Evaluate the DOM-arguments
-                self.evaluateChildren(node, nspace)
-                # Build argument list for function call
-                if node.evaluateArgs:
-                    args = []
-                    for arg in node.args:
-                        print(arg)
-                        value = eval(arg, nspace)
-                        args.append(value)
-                elif node.className != None:
-                    # Functions decorated with @inline or @section
-                    # expect their node as first argument.
-                    args = [node]
-                    args.extend(node.args)
-                else:
-                    args = node.args
-                args.extend(node.children)
-                if node.evaluateArgs:
-                    kwargs = {}
-                    for k, arg in node.kwargs.items():
-                        print(k)
-                        print(arg)
-                        value = eval(arg, nspace)
-                        kwargs[k] = value
-                else:
-                    kwargs = node.kwargs
-                # Call function
-                result = node.func(*args, **kwargs)
-                nodes.pop(i)
-                # A FunctionNode is substituted by another function node?
-                # This happens when the @inline or @section decorator has been used.
-                if isinstance(result, FunctionNode):
-                    result.evaluateArgs = False
-                    # Preserve the children
-                    result.children = node.children
-                    # result.args = [result]
-                    # result.args.extend(args[:len(node.args)])
-                # Insert the result
-                if isinstance(result, list) or isinstance(result, tuple):
-                    for r in result:
-                        if isinstance(r, (str, int, float, bool)):
-                            parent.insertChild(i, str(r))
-                            i += 1
-                        elif isinstance(r, Node):
-                            r.indent = node.indent
-                            parent.insertChild(i, r)
-                            i += 1
-                        else:
-                            raise BaseException(f"Wrong return type of function {node.func.__name__}")
-                elif isinstance(result, (str, int, float, bool)):
-                    parent.insertChild(i, str(result))
-                    i += 1
-                elif isinstance(result, Node):
-                    result.indent = node.indent
-                    parent.insertChild(i, result)
-                    i += 1
-                elif result == None:
-                    pass
+        replacements = []
+        handlers = _dispatcher.typeHandlers
+        for i, node in enumerate(nodes):
+            items = (handlers.get(type(node)) or _dispatcher.handler(node))(self, node, parent, nspace)
+            if items != None:
+                replacements.append((i, items))
+        if len(replacements) != 0:
+            nodes[:] = _splice(nodes, replacements)
+
+    def visitText(self, node, parent, nspace):
+        return None
+
+    def visitNode(self, node, parent, nspace):
+        self.evaluateChildren(node, nspace)
+        return None
+
+    def visitDocument(self, node, parent, nspace):
+        self.evaluate(node, nspace)
+        return None
+
+    def visitFunction(self, node, parent, nspace):
+        # Do not evaluate the function in the current step?
+        if node.className != self.step:
+            return None
+        return self.evaluateFunction(parent, node, nspace)
+
+    """
+    evaluateFunction calls the function of the FunctionNode `node`, which is a child of `parent`.
+    It returns the list of nodes and strings which replace `node` in the children of `parent`.
+    """
+    def evaluateFunction(self, parent, node, nspace):
+        if _trace.enabled:
+            _trace(f"Calling {node.func.__name__} {node.className}")
+        # Evaluate the DOM-arguments
+        self.evaluateChildren(node, nspace)
+        # Build argument list for function call
+        if node.evaluateArgs:
+            args = []
+            for arg in node.args:
+                if _trace.enabled:
+                    _trace(arg)
+                value = evaluateExpression(arg, nspace)
+                args.append(value)
+        elif node.className != None:
+            # Functions decorated with @inline or @section
+            # expect their node as first argument.
+            args = [node]
+            args.extend(node.args)
+        else:
+            args = node.args
+        if node.children != None:
+            args.extend(node.children)
+        if node.evaluateArgs:
+            kwargs = {}
+            for k, arg in node.kwargs.items():
+                if _trace.enabled:
+                    _trace(k, arg)
+                value = evaluateExpression(arg, nspace)
+                kwargs[k] = value
+        else:
+            kwargs = node.kwargs
+        # Call function
+        result = node.func(*args, **kwargs)
+        # The node is no longer part of the document, and neither are the nodes below it
+        node.setParent(None)
+        # A FunctionNode is substituted by another function node?
+        # This happens when the @inline or @section decorator has been used.
+        if isinstance(result, FunctionNode):
+            result.evaluateArgs = False
+            # Preserve the children
+            result.children = node.children
+            if result.children != None:
+                for c in result.children:
+                    if not isinstance(c, str):
+                        c.setParent(result)
+            # result.args = [result]
+            # result.args.extend(args[:len(node.args)])
+        # Convert the result
+        if isinstance(result, list) or isinstance(result, tuple):
+            items = []
+            for r in result:
+                if isinstance(r, (str, int, float, bool)):
+                    items.append(str(r))
+                elif isinstance(r, Node):
+                    r.indent = node.indent
+                    r.setParent(parent)
+                    items.append(r)
                 else:
-                    print(result)
                     raise BaseException(f"Wrong return type of function {node.func.__name__}")
-            else:
-                self.evaluate(node, nspace)
-                i += 1
\ No newline at end of file
+        elif isinstance(result, (str, int, float, bool)):
+            items = [str(result)]
+        elif isinstance(result, Node):
+            result.indent = node.indent
+            result.setParent(parent)
+            items = [result]
+        elif result == None:
+            items = []
+        else:
+            if _trace.enabled:
+                _trace(result)
+            raise BaseException(f"Wrong return type of function {node.func.__name__}")
+        if self.doc != None and self.doc.functions != None:
+            self.indexResult(items)
+        return items
+
+    """
+    indexResult adds the FunctionNodes in the `result` of a function to the index of the document.
+    The parents of all nodes in the result are set, since functions may build their result without Node.append.
+    """
+    def indexResult(self, result):
+        _indexTree(self.doc, [r for r in result if not isinstance(r, str)])
+
+_dispatcher = Dispatcher()
+_dispatcher.addClass(str, Evaluator.visitText)
+_dispatcher.addClass(Node, Evaluator.visitNode)
+_dispatcher.addClass(DocumentNode, Evaluator.visitDocument)
+_dispatcher.addClass(FunctionNode, Evaluator.visitFunction)
+
+"""
+indexFunctions adds all FunctionNodes of the document `doc` to its index.
+This is required for documents which have not been created by the Parser.
+"""
+def indexFunctions(doc):
+    doc.functions = {}
+    _indexTree(doc, [doc])
+
+def _indexTree(doc, nodes):
+    stack = nodes
+    while len(stack) != 0:
+        n = stack.pop()
+        if isinstance(n, FunctionNode):
+            doc.indexFunction(n)
+        if n.children == None:
+            continue
+        for c in n.children:
+            if not isinstance(c, str):
+                if c.parent != n:
+                    c.setParent(n)
+                stack.append(c)
+
+"""
+_Positions determines where nodes are located in the document `doc`.
+Nodes are mostly looked up in document order. Hence a search in the children of a parent starts
+where the previous search in these children ended, and the positions of ancestors are remembered.
+"""
+class _Positions:
+    def __init__(self, doc):
+        # Maps nodes to the tuples returned by position
+        self.known = {doc: ((), False)}
+        # Maps parents to the position at which the next search in their children starts
+        self.hints = {}
+
+    """
+    position returns the positions of `node` and its ancestors in the children of their parents, starting at the document,
+    and whether `node` is nested in a FunctionNode. The positions are None if `node` is not part of the document.
+    """
+    def position(self, node):
+        chain = []
+        n = node
+        while n not in self.known:
+            chain.append(n)
+            n = n.parent
+            if n == None:
+                return None, False
+        path, isNested = self.known[n]
+        for c in reversed(chain):
+            p = c.parent
+            if path != None:
+                i = self.index(p, c)
+                path = path + (i,) if i != None else None
+            isNested = isNested or isinstance(p, FunctionNode)
+            self.known[c] = (path, isNested)
+        return path, isNested
+
+    """
+    index returns the position of `node` in the children of `parent` or None.
+    """
+    def index(self, parent, node):
+        children = parent.children
+        hint = self.hints.get(parent, 0)
+        try:
+            i = children.index(node, hint)
+        except ValueError:
+            try:
+                i = children.index(node, 0, hint)
+            except ValueError:
+                return None
+        self.hints[parent] = i
+        return i
+
+"""
+_splice returns a copy of the list `nodes` in which some items are replaced.
+`replacements` is a list of tuples (position, items) in increasing order of position.
+The item at each position is replaced by the list `items`.
+"""
+def _splice(nodes, replacements):
+    result = []
+    start = 0
+    for i, items in replacements:
+        result.extend(nodes[start:i])
+        result.extend(items)
+        start = i + 1
+    result.extend(nodes[start:])
+    return result
+
+def _path(entry):
+    return entry[0]
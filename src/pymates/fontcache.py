@@ -0,0 +1,161 @@
+import os
+import sys
+import mmap
+import array
+import struct
+import hashlib
+import pymates
+import pymates.timing
+
+_profiler = pymates.timing.profiler
+
+# Changes whenever the format of the cache files changes
+_formatVersion = 1
+_suffix = ".metrics"
+_magic = b"PMFM"
+
+# magic, format version, byte order, ascent, descent, leading, default width, number of code points.
+# The advances follow as doubles, then the code points as unsigned ints, both in native byte order
+_header = struct.Struct("=4sIIddddI")
+
+"""
+CachedFontMetrics are the metrics of a font file in 1/1000 of the font size.
+`codePoints` and `advances` are parallel arrays, which are views into the mapped cache file.
+"""
+class CachedFontMetrics:
+    def __init__(self, ascent, descent, leading, defaultWidth, codePoints, advances):
+        self.ascent = ascent
+        self.descent = descent
+        self.leading = leading
+        self.defaultWidth = defaultWidth
+        self.codePoints = codePoints
+        self.advances = advances
+
+    """
+    widths returns a dict which maps each code point to its advance.
+    """
+    def widths(self):
+        return dict(zip(self.codePoints, self.advances))
+
+"""
+FontMetricsCache stores the metrics of font files on disk, such that layout can start without parsing the fonts.
+
+An entry is addressed by the hash of the content of the font file. It is a small binary file, which is mapped
+into memory when loaded.
+If the directory is empty or cannot be created, nothing is cached and the metrics are read from the font files each time.
+"""
+class FontMetricsCache:
+    def __init__(self, directory = None):
+        if directory == None:
+            directory = defaultCacheDirectory()
+        self.directory = directory
+        self.enabled = directory != ""
+        if self.enabled:
+            try:
+                os.makedirs(directory, exist_ok = True)
+            except OSError:
+                self.enabled = False
+
+    """
+    key returns the name of the cache entry for the font file at `path`.
+    """
+    def key(self, path):
+        h = hashlib.sha256()
+        with open(path, "rb") as file:
+            while True:
+                data = file.read(1 << 16)
+                if len(data) == 0:
+                    break
+                h.update(data)
+        h.update(f"{pymates.__version__}/{_formatVersion}\0".encode())
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + _suffix)
+
+    """
+    load returns the CachedFontMetrics stored under `key` or None.
+    """
+    def load(self, key):
+        if not self.enabled:
+            return None
+        try:
+            with open(self.path(key), "rb") as file:
+                data = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        with _profiler.span("font metrics load", "cache"):
+            try:
+                magic, version, byteorder, ascent, descent, leading, defaultWidth, n = _header.unpack_from(data)
+                end = _header.size + n * 12
+                if magic != _magic or version != _formatVersion or byteorder != _byteOrder() or len(data) != end:
+                    raise ValueError("Wrong format")
+            except (struct.error, ValueError):
+                # A broken entry is treated like a missing one
+                data.close()
+                self.invalidate(key)
+                return None
+            view = memoryview(data)
+            advances = view[_header.size:_header.size + n * 8].cast("d")
+            codePoints = view[_header.size + n * 8:end].cast("I")
+            return CachedFontMetrics(ascent, descent, leading, defaultWidth, codePoints, advances)
+
+    """
+    store writes `metrics` to the cache under `key`. `metrics.codePoints` and `metrics.advances` can be any sequences.
+    Metrics which cannot be written, e.g. because the disk is full, are not cached.
+    """
+    def store(self, key, metrics):
+        if not self.enabled:
+            return
+        codePoints = array.array("I", metrics.codePoints)
+        advances = array.array("d", metrics.advances)
+        header = _header.pack(_magic, _formatVersion, _byteOrder(), metrics.ascent, metrics.descent, metrics.leading,
+            metrics.defaultWidth, len(codePoints))
+        path = self.path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as file:
+                file.write(header)
+                file.write(advances.tobytes())
+                file.write(codePoints.tobytes())
+            # Readers never see a partially written entry
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    """
+    invalidate removes the entry `key` from the cache.
+    """
+    def invalidate(self, key):
+        if not self.enabled:
+            return
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+    """
+    clear removes all entries from the cache.
+    """
+    def clear(self):
+        if not self.enabled:
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(_suffix):
+                self.invalidate(name[:-len(_suffix)])
+
+def _byteOrder():
+    return 1 if sys.byteorder == "little" else 2
+
+"""
+defaultCacheDirectory returns the directory named by the environment variable PYMATES_FONT_CACHE
+or a pymates directory in the user's cache directory. An empty PYMATES_FONT_CACHE disables the cache.
+"""
+def defaultCacheDirectory():
+    if "PYMATES_FONT_CACHE" in os.environ:
+        return os.environ["PYMATES_FONT_CACHE"]
+    base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "pymates", "fonts")
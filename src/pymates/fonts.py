@@ -1,6 +1,31 @@
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
 _backend = None
 _fontBackends = []
 
+# The number of advances which each Font remembers, see Font.advance
+_maxAdvances = 4096
+
+# Code points below this limit are looked up in a list, the others in a dict, see GlyphAdvances
+_denseCodePoints = 0x3000
+
+# advanceWords measures at least this many words at once with NumPy. For fewer words the advance cache is faster.
+_minBatch = 32
+
+# NumPy is imported on first use. False if it is not installed.
+_np = None
+
+def _numpy():
+    global _np
+    if _np == None:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:
+            _np = False
+    return _np
+
 def setFontMetricsBackend(b):
     global _backend
     _backend = b
@@ -21,23 +46,167 @@ class Font:
         self.registeredFont = _matchFont(family, weight, italic)
         _loadFont(self.registeredFont)
         self.fontmetrics = _backend.nativeFontMetrics(self)
+        self.glyphAdvances = _glyphAdvances(self.registeredFont)
+        # The advances of the strings measured last. The least recently used ones are dropped
+        # once it holds more than `_maxAdvances`.
+        self.advances = OrderedDict()
+        self.advanceHits = 0
+        self.advanceMisses = 0
 
+    """
+    advance returns the width of `str` in points. Natural language repeats the same words constantly,
+    hence the advances are remembered, such that the backend measures each word once.
+    """
     def advance(self, str):
-        return self.fontmetrics.horizontalAdvance(str, -1)
+        advances = self.advances
+        a = advances.get(str)
+        if a != None:
+            self.advanceHits += 1
+            advances.move_to_end(str)
+            return a
+        self.advanceMisses += 1
+        a = self._measure(str)
+        advances[str] = a
+        if len(advances) > _maxAdvances:
+            advances.popitem(last = False)
+        return a
+
+    """
+    advanceWords returns the advances of all `words`. Words which are not in the advance cache are measured
+    at once with the glyph advance table.
+    """
+    def advanceWords(self, words):
+        glyphs = self.glyphAdvances
+        if glyphs == None or len(words) < _minBatch or not _numpy():
+            return [self.advance(w) for w in words]
+        advances = self.advances
+        result = []
+        missing = []
+        for i in range(0, len(words)):
+            a = advances.get(words[i])
+            if a != None:
+                advances.move_to_end(words[i])
+            else:
+                missing.append(i)
+            result.append(a)
+        self.advanceHits += len(words) - len(missing)
+        if len(missing) < _minBatch:
+            for i in missing:
+                result[i] = self.advance(words[i])
+            return result
+        self.advanceMisses += len(missing)
+        scale = 0.001 * self.size
+        measured = glyphs.measureWords([words[i] for i in missing])
+        for i, w in zip(missing, measured):
+            a = self.fontmetrics.advance(words[i]) if w == None else w * scale
+            result[i] = a
+            advances[words[i]] = a
+        while len(advances) > _maxAdvances:
+            advances.popitem(last = False)
+        return result
+
+    def _measure(self, str):
+        if self.glyphAdvances != None:
+            w = self.glyphAdvances.measure(str)
+            if w != None:
+                return w * 0.001 * self.size
+        return self.fontmetrics.advance(str)
+
+"""
+GlyphAdvances is the advance of each code point of a registered font in 1/1000 of the font size.
+`widths` maps code points to advances. Other code points have the advance `default`.
+If `default` is None, strings with other code points cannot be measured with the table.
+"""
+class GlyphAdvances:
+    def __init__(self, widths, default = None):
+        self.widths = widths
+        self.default = default
+        size = min(max(widths, default = -1) + 1, _denseCodePoints)
+        self.table = [default] * size
+        for c, w in widths.items():
+            if c < size:
+                self.table[c] = w
+        # The table as a NumPy array, built by measureWords. Importing NumPy takes longer than loading the fonts
+        self.array = None
+
+    """
+    measure returns the advance of `str` in 1/1000 of the font size, or None if it contains code points which are not in the table.
+    """
+    def measure(self, str):
+        table = self.table
+        try:
+            return sum([table[ord(c)] for c in str])
+        except (IndexError, TypeError):
+            pass
+        widths = self.widths
+        default = self.default
+        w = 0
+        for c in str:
+            a = widths.get(ord(c), default)
+            if a == None:
+                return None
+            w += a
+        return w
+
+    """
+    measureWords returns the advances of all `words` like measure does. All words are looked up and summed in one
+    vectorized operation if NumPy is installed.
+    """
+    def measureWords(self, words):
+        np = _numpy()
+        if not np or len(words) == 0:
+            return [self.measure(w) for w in words]
+        try:
+            codes = np.frombuffer("".join(words).encode("utf-32-le"), dtype = np.uint32)
+        except UnicodeEncodeError:
+            # Lone surrogates
+            return [self.measure(w) for w in words]
+        if self.array is None:
+            self.array = np.array([np.nan if w == None else w for w in self.table], dtype = np.float64)
+        if codes.size == 0 or codes.max() >= len(self.array):
+            return [self.measure(w) for w in words]
+        lengths = np.fromiter(map(len, words), dtype = np.intp, count = len(words))
+        starts = np.zeros(len(words), dtype = np.intp)
+        np.cumsum(lengths[:-1], out = starts[1:])
+        sums = np.add.reduceat(self.array[codes], starts)
+        # Empty words and words with code points which are not in the table
+        missing = np.isnan(sums) | (lengths == 0)
+        result = sums.tolist()
+        if missing.any():
+            for i in np.flatnonzero(missing).tolist():
+                result[i] = self.measure(words[i])
+        return result
 
 fonts = {}
 
+"""
+advanceCacheStats returns the number of hits and misses of the advance caches of all fonts, their hit rate and size.
+"""
+def advanceCacheStats():
+    hits = sum(f.advanceHits for f in fonts.values())
+    misses = sum(f.advanceMisses for f in fonts.values())
+    lookups = hits + misses
+    return {"hits": hits, "misses": misses, "hitRate": hits / lookups if lookups != 0 else 0, "size": sum(len(f.advances) for f in fonts.values())}
+
 # Font factory that cashes Font objects.
 def font(family, size, weight = 400, italic = False, underline = False, strikeOut = False):
-    name = f"{family}|{size}|{weight}|{italic}|{underline}|{strikeOut}"
-    if name in fonts:
-        return fonts[name]
+    key = (family, size, weight, italic, underline, strikeOut)
+    f = fonts.get(key)
+    if f != None:
+        return f
     f = Font(family, size, weight, italic, underline, strikeOut)
-    fonts[name] = f
+    fonts[key] = f
     return f
 
 _registeredFonts = []
 
+# The registered fonts by family and italic. Each entry holds the weights in ascending order and the fonts in the same order.
+# Fonts of the same weight are kept in the order of registration.
+_fontIndex = {}
+
+# The results of _matchFont by family, weight and italic. Cleared whenever a font is registered
+_matches = {}
+
 class RegisteredFont:
     def __init__(self, file, name, family, weight, italic):
         self.file = file
@@ -48,48 +217,63 @@ class RegisteredFont:
         self.family = family
         self.weight = weight
         self.italic = italic
+        # Set by _glyphAdvances
+        self.glyphAdvancesLoaded = False
+        self.glyphAdvances = None
 
 def registerFont(file, family, weight, italic):
-    _registeredFonts.append(RegisteredFont(file, None, family, weight, italic))
+    _addFont(RegisteredFont(file, None, family, weight, italic))
 
 def registerBuiltinFont(name, family, weight, italic):
-    _registeredFonts.append(RegisteredFont(None, name, family, weight, italic))
+    _addFont(RegisteredFont(None, name, family, weight, italic))
+
+def _addFont(regfont):
+    _registeredFonts.append(regfont)
+    key = (regfont.family, regfont.italic)
+    entry = _fontIndex.get(key)
+    if entry == None:
+        entry = ([], [])
+        _fontIndex[key] = entry
+    weights, fonts = entry
+    i = bisect_right(weights, regfont.weight)
+    weights.insert(i, regfont.weight)
+    fonts.insert(i, regfont)
+    _matches.clear()
 
+"""
+_matchFont returns the registered font of `family` whose weight is nearest to `weight`.
+Lighter fonts are preferred for weights up to 500, bolder ones otherwise.
+If the family has no italic font, a regular one is used. If the family is not registered, Helvetica is used.
+"""
 def _matchFont(family, weight, italic):
+    key = (family, weight, italic)
+    f = _matches.get(key)
+    if f == None:
+        f = _findFont(family, weight, italic)
+        _matches[key] = f
+    return f
+
+def _findFont(family, weight, italic):
+    entry = _fontIndex.get((family, italic))
+    if entry == None:
+        if italic:
+            # Try again, now ignoring italic
+            return _findFont(family, weight, False)
+        if family == "Helvetica":
+            raise Exception(f"No font matches {family} {weight}")
+        # Use Helvetica as fallback
+        return _findFont("Helvetica", weight, italic)
+    weights, fonts = entry
+    i = bisect_left(weights, weight)
     # Find exact match
-    for f in _registeredFonts:
-        if f.family == family and f.weight == weight and f.italic == italic:
-            return f
-    # Search for nearest weight match
-    bestSmaller = None
-    bestSmallerDist = 1000
-    bestBigger = None
-    bestBiggerDist = 1000
-    for f in _registeredFonts:
-        if f.family == family and f.italic == italic:
-            w = f.weight
-            if w > weight and (w - weight) < bestBiggerDist:
-                bestBigger = f
-                bestBiggerDist = (w - weight)
-            elif w < weight and (weight - w) < bestSmallerDist:
-                bestSmaller = f
-                bestSmallerDist = (weight - w)
-    if bestSmaller == None and bestBigger == None and italic:
-        # Try again, now ignoring italic
-        return _matchFont(family, weight, False)
-    # Find a good weight match (if at least one match exists)
-    if bestSmaller != None or bestBigger != None:
-        if weight <= 500:
-            if bestSmaller:
-                return bestSmaller
-            else:
-                return bestBigger
-        if bestBigger:
-            return bestBigger
-        else:
-            return bestSmaller
-    # Use Helvetica as fallback
-    return _matchFont("Helvetica", weight, italic)
+    if i < len(weights) and weights[i] == weight:
+        return fonts[i]
+    # The nearest lighter font is the first one of its weight
+    smaller = bisect_left(weights, weights[i - 1]) if i > 0 else -1
+    bigger = i if i < len(weights) else -1
+    if weight <= 500:
+        return fonts[smaller] if smaller >= 0 else fonts[bigger]
+    return fonts[bigger] if bigger >= 0 else fonts[smaller]
 
 def _loadFont(regfont):
     # Builtin font?
@@ -97,3 +281,14 @@ def _loadFont(regfont):
         return
     for b in _fontBackends:
         b.loadFont(regfont)
+
+"""
+_glyphAdvances returns the GlyphAdvances of `regfont`, or None if the metrics backend cannot provide them.
+They are extracted once per registered font.
+"""
+def _glyphAdvances(regfont):
+    if not regfont.glyphAdvancesLoaded:
+        regfont.glyphAdvancesLoaded = True
+        if hasattr(_backend, "glyphAdvances"):
+            regfont.glyphAdvances = _backend.glyphAdvances(regfont)
+    return regfont.glyphAdvances
@@ -2,11 +2,34 @@ from pymates.lom import PageLayout, PageLayoutBox, Document, Alignment, color
 from pymates.sizes import Padding, Margin, Rect
 from pymates.fonts import font
 from pymates import dom, markdown
+from pymates.dom import FrozenStyle
+from pymates.visitor import Dispatcher
+import pymates.timing
 
-generators = {}
+_profiler = pymates.timing.profiler
+
+# Finds the generator of a node by its class, or by its function if the class has none, see register
+_dispatcher = Dispatcher()
+generators = _dispatcher.funcHandlers
+
+# The fonts, colors, margins and paddings derived from interned styles, see pymates.dom.internStyle.
+# The keys are tuples of the base value, e.g. the font of the parent, and the id of the style.
+# They are cleared together with the interned styles, such that an id cannot refer to a freed style.
+_fonts = {}
+_colors = {}
+_margins = {}
+_paddings = {}
+
+def _clearCaches():
+    _fonts.clear()
+    _colors.clear()
+    _margins.clear()
+    _paddings.clear()
+
+dom.onResetStyles(_clearCaches)
 
 def register(func, gen):
-    generators[func] = gen
+    _dispatcher.addFunc(func, gen)
 
 def generatePageLayout(docNode, style):
     if "margin" in style:
@@ -31,34 +54,54 @@ def ensureCursor(doc, cursor):
     return cursor
 
 def generate(docNode):
+    with _profiler.span("generate"):
+        pl = generatePageLayout(docNode, docNode.style)
+        f = font("Helvetica", 12)
+        doc = Document(pl, f)
+        # flow = doc.newFlow()
+        # cursor = flow.cursor
+        # genNode(docNode, doc, cursor)
+        genNode(docNode, doc, None)
+
+    return doc
+
+"""
+generateStream returns the Document of `docNode` like generate, but its content is generated while it is laid out,
+one child of `docNode` at a time, see Document.setSource and Layouter.layoutPages.
+"""
+def generateStream(docNode):
     pl = generatePageLayout(docNode, docNode.style)
     f = font("Helvetica", 12)
     doc = Document(pl, f)
-    # flow = doc.newFlow()
-    # cursor = flow.cursor
-    # genNode(docNode, doc, cursor)
-    genNode(docNode, doc, None)
-
+    doc.setSource(_generateParts(docNode, doc))
     return doc
 
+def _generateParts(docNode, doc):
+    if _profiler.enabled:
+        _profiler.count("nodes")
+    cursor = None
+    if docNode.children != None:
+        handlers = _dispatcher.typeHandlers
+        for n in docNode.children:
+            with _profiler.span("generate"):
+                if _profiler.enabled:
+                    _profiler.count("nodes")
+                cursor = (handlers.get(type(n)) or _dispatcher.handler(n))(n, doc, cursor)
+            yield cursor
+
 def genNodes(nodes, doc, cursor):
     if nodes != None:
+        if _profiler.enabled:
+            _profiler.count("nodes", len(nodes))
+        handlers = _dispatcher.typeHandlers
         for n in nodes:
-            cursor = genNode(n, doc, cursor)
+            cursor = (handlers.get(type(n)) or _dispatcher.handler(n))(n, doc, cursor)
     return cursor
 
 def genNode(node, doc, cursor):
-    if isinstance(node, str):
-        return genText(node, doc, cursor)
-    if isinstance(node, dom.ParagNode):
-        return genParag(node, doc, cursor)
-    if isinstance(node, dom.SpanNode):
-        return genSpan(node, doc, cursor)
-    if isinstance(node, dom.StyleNode):
-        return genStyle(node, doc, cursor)
-    if isinstance(node, dom.DocumentNode):
-        return genDocument(node, doc, cursor)
-    return generators[node.func](node, doc, cursor)
+    if _profiler.enabled:
+        _profiler.count("nodes")
+    return _dispatcher.handler(node)(node, doc, cursor)
 
 def genDocument(node, doc, cursor):
     return genNodes(node.children, doc, cursor)
@@ -83,25 +126,20 @@ def genParag(node, doc, cursor):
         cursor = ensureCursor(doc, cursor)
     # ("genParag")
     align = node.style["align"] if "align" in node.style else Alignment.Left
-    textFont = deriveFont(doc.font, node.style)
-    textColor = None
-    if "color" in node.style:
-        s = node.style["color"]
-        textColor = color(s[0], s[1], s[2])
+    textFont = _derive(_fonts, deriveFont, doc.font, node.style)
+    textColor = _derive(_colors, _styleColor, None, node.style)
     # TODO: Get the next two values from style
     leftIndent = cursor.leftIndent
     hangingLeftIndent = 0
     if "enum" in node.style:
-        enumIndent = textFont.fontmetrics.advance(node.style["enum"])
+        enumIndent = textFont.advance(node.style["enum"])
         hangingLeftIndent = enumIndent
         savedLeftIndent = cursor.leftIndent
         cursor.leftIndent += enumIndent
     cursor.startBlock(font=textFont, textColor=textColor, align=align, leftIndent=leftIndent, hangingLeftIndent=hangingLeftIndent)
     if "enum" in node.style:
         cursor.text(node.style["enum"])
-    if node.children != None:
-        for n in node.children:
-            cursor = genNode(n, doc, cursor)
+    cursor = genNodes(node.children, doc, cursor)
     if "enum" in node.style:
         cursor.leftIndent = savedLeftIndent
     if returnCursor != None:
@@ -110,18 +148,15 @@ def genParag(node, doc, cursor):
 
 def genStyle(node, doc, cursor):
     # print("genStyle")
-    textFont = deriveFont(cursor.currentFont(), node.style)
-    textColor = None
-    if "color" in node.style:
-        s = node.style["color"]
-        textColor = color(s[0], s[1], s[2])
+    textFont = _derive(_fonts, deriveFont, cursor.currentFont(), node.style)
+    textColor = _derive(_colors, _styleColor, None, node.style)
     cursor.startFormat(font=textFont, textColor=textColor)
     align = node.style["align"] if "align" in node.style else None
-    padding = derivePadding(cursor.block.padding, node.style["padding"]) if "padding" in node.style else None
-    margin = deriveMargin(cursor.block.margin, node.style["margin"]) if "margin" in node.style else None
+    padding = _derive(_paddings, _stylePadding, cursor.block.padding, node.style) if "padding" in node.style else None
+    margin = _derive(_margins, _styleMargin, cursor.block.margin, node.style) if "margin" in node.style else None
     if align != None or padding != None or margin != None:
         cursor.blockFormat(align=align, margin=margin, padding=padding)
-    if len(node.children) != 0:
+    if node.children != None and len(node.children) != 0:
         genNodes(node.children, doc, cursor)
         cursor.endFormat()
     # print("endStyle")
@@ -135,6 +170,39 @@ def genText(node, doc, cursor):
     cursor.text(node)
     return cursor
 
+_dispatcher.addClass(str, genText)
+_dispatcher.addClass(dom.ParagNode, genParag)
+_dispatcher.addClass(dom.SpanNode, genSpan)
+_dispatcher.addClass(dom.StyleNode, genStyle)
+_dispatcher.addClass(dom.DocumentNode, genDocument)
+
+"""
+_derive returns `derive(base, style)`. The result is computed once for each base value and interned style.
+The cache keeps the style with the result, such that its id is not reused while the entry exists.
+"""
+def _derive(cache, derive, base, style):
+    if isinstance(style, FrozenStyle) and style.interned:
+        key = (base, id(style))
+        entry = cache.get(key)
+        if entry != None and entry[0] is style:
+            return entry[1]
+        value = derive(base, style)
+        cache[key] = (style, value)
+        return value
+    return derive(base, style)
+
+def _styleColor(base, style):
+    if style == None or "color" not in style:
+        return base
+    s = style["color"]
+    return color(s[0], s[1], s[2])
+
+def _styleMargin(baseMargin, style):
+    return deriveMargin(baseMargin, style["margin"])
+
+def _stylePadding(basePadding, style):
+    return derivePadding(basePadding, style["padding"])
+
 def deriveFont(baseFont, style):
     if style == None:
         return baseFont
@@ -0,0 +1,180 @@
+import sys
+import array
+import struct
+import pymates.fonts
+import pymates.afmmetrics
+from pymates.fontcache import FontMetricsCache, CachedFontMetrics
+
+# The headless backend provides font metrics without reportlab or Qt, e.g. for counting pages. It cannot draw.
+# The metrics of the standard PDF fonts are bundled, those of TrueType fonts are read from the font files.
+# Layouts are the same as with the PDF backend.
+
+# The layout uses 20% of the font size as leading, like the PDF backend
+_leading = 200
+
+class headlessFontMetrics:
+    def __init__(self, font, metrics):
+        self.font = font
+        self.ascent = metrics.ascent * font.size / 1000
+        self.descent = -metrics.descent * font.size / 1000
+        self.leading = metrics.leading * font.size / 1000
+
+    def advance(self, txt):
+        return self.font.glyphAdvances.measure(txt) * 0.001 * self.font.size
+
+def nativeFontMetrics(font):
+    return headlessFontMetrics(font, _metrics(font.registeredFont))
+
+def glyphAdvances(regfont):
+    metrics = _metrics(regfont)
+    return pymates.fonts.GlyphAdvances(metrics.widths(), metrics.defaultWidth)
+
+_fontCache = None
+
+"""
+loadFont reads the metrics of the TrueType font `regfont`, unless they are in the font metrics cache.
+"""
+def loadFont(regfont):
+    global _fontCache
+    if hasattr(regfont, "headlessmetrics"):
+        return
+    if _fontCache == None:
+        _fontCache = FontMetricsCache()
+    key = _fontCache.key(regfont.file)
+    metrics = _fontCache.load(key)
+    if metrics == None:
+        metrics = readTrueTypeMetrics(regfont.file)
+        _fontCache.store(key, metrics)
+    regfont.headlessmetrics = metrics
+
+def _metrics(regfont):
+    if not hasattr(regfont, "headlessmetrics"):
+        if regfont.file != None:
+            loadFont(regfont)
+        else:
+            regfont.headlessmetrics = _builtinMetrics(regfont.name)
+    return regfont.headlessmetrics
+
+def _builtinMetrics(name):
+    afm = pymates.afmmetrics.fonts.get(name)
+    if afm == None:
+        raise Exception(f"Unknown builtin font {name}")
+    ascent, descent, encoding, widths = afm
+    codePoints = pymates.afmmetrics.encodings[encoding]
+    if name not in pymates.afmmetrics.substitutionFonts:
+        table = {}
+        for substitute in reversed(pymates.afmmetrics.substitutionFonts):
+            a, d, e, w = pymates.afmmetrics.fonts[substitute]
+            table.update(zip(pymates.afmmetrics.encodings[e], w))
+        table.update(zip(codePoints, widths))
+        codePoints = table.keys()
+        widths = table.values()
+    return CachedFontMetrics(ascent, descent, _leading, pymates.afmmetrics.notdefWidth, codePoints, widths)
+
+"""
+readTrueTypeMetrics returns the CachedFontMetrics of the TrueType font file at `path`.
+Only the head, hhea, maxp, OS/2, cmap and hmtx tables are read. Ascent, descent and advances are computed like reportlab does.
+"""
+def readTrueTypeMetrics(path):
+    with open(path, "rb") as file:
+        data = file.read()
+    tables = {}
+    numTables = struct.unpack_from(">H", data, 4)[0]
+    for i in range(0, numTables):
+        tag, checksum, offset, length = struct.unpack_from(">4sIII", data, 12 + 16 * i)
+        tables[tag] = offset
+    for tag in (b"head", b"hhea", b"maxp", b"cmap", b"hmtx"):
+        if tag not in tables:
+            raise Exception(f"{path}: No {tag.decode()} table")
+    head = tables[b"head"]
+    unitsPerEm = struct.unpack_from(">H", data, head + 18)[0]
+    scale = 1000 / unitsPerEm
+    numberOfHMetrics = struct.unpack_from(">H", data, tables[b"hhea"] + 34)[0]
+    numGlyphs = struct.unpack_from(">H", data, tables[b"maxp"] + 4)[0]
+    if b"OS/2" in tables:
+        ascent, descent = struct.unpack_from(">hh", data, tables[b"OS/2"] + 68)
+    else:
+        descent, ascent = struct.unpack_from(">hh", data, head + 38)[0], struct.unpack_from(">h", data, head + 42)[0]
+    # Advance widths and left side bearings. Glyphs beyond numberOfHMetrics have the last advance
+    hmtx = _ushorts(data, tables[b"hmtx"], 2 * numberOfHMetrics)
+    glyphAdvances = [a * scale for a in hmtx[0::2]]
+    glyphAdvances.extend([glyphAdvances[-1]] * (numGlyphs - numberOfHMetrics))
+    codePoints = []
+    advances = []
+    for c, g in _cmap(data, tables[b"cmap"]):
+        if g < numGlyphs:
+            codePoints.append(c)
+            advances.append(glyphAdvances[g])
+    widths = dict(zip(codePoints, advances))
+    # No-break spaces are as wide as spaces
+    if 0x20 in widths:
+        widths[0xa0] = widths[0x20]
+    elif 0xa0 in widths:
+        widths[0x20] = widths[0xa0]
+    return CachedFontMetrics(ascent * scale, descent * scale, _leading, glyphAdvances[0], widths.keys(), widths.values())
+
+"""
+_cmap yields the code points and glyphs of the character map subtable which reportlab uses.
+Formats 4 and 12 are supported.
+"""
+def _cmap(data, cmap):
+    offset = None
+    kind = 0
+    version, count = struct.unpack_from(">HH", data, cmap)
+    for i in range(0, count):
+        platform, encoding, o = struct.unpack_from(">HHI", data, cmap + 4 + 8 * i)
+        if platform == 3 or (platform == 1 and encoding == 1) or (platform == 0 and encoding != 5):
+            kind = 1
+            offset = o
+        elif platform == 1 and encoding == 0 and kind != 1:
+            kind = 2
+            offset = o
+    if offset == None:
+        raise Exception("No suitable cmap subtable")
+    offset += cmap
+    fmt = struct.unpack_from(">H", data, offset)[0]
+    if fmt == 4:
+        segCount = struct.unpack_from(">H", data, offset + 6)[0] // 2
+        length = struct.unpack_from(">H", data, offset + 2)[0]
+        ends = _ushorts(data, offset + 14, segCount)
+        starts = _ushorts(data, offset + 16 + 2 * segCount, segCount)
+        deltas = _ushorts(data, offset + 16 + 4 * segCount, segCount)
+        rangeOffsets = offset + 16 + 6 * segCount
+        for n in range(0, segCount):
+            rangeOffset = struct.unpack_from(">H", data, rangeOffsets + 2 * n)[0]
+            for c in range(starts[n], ends[n] + 1):
+                if rangeOffset == 0:
+                    yield c, (c + deltas[n]) & 0xffff
+                    continue
+                o = rangeOffsets + 2 * n + rangeOffset + 2 * (c - starts[n])
+                g = struct.unpack_from(">H", data, o)[0] if o < offset + length else 0
+                yield c, (g + deltas[n]) & 0xffff if g != 0 else 0
+    elif fmt == 12:
+        groups = struct.unpack_from(">I", data, offset + 12)[0]
+        for n in range(0, groups):
+            start, end, glyph = struct.unpack_from(">III", data, offset + 16 + 12 * n)
+            for c in range(start, end + 1):
+                yield c, glyph + c - start
+    else:
+        raise Exception(f"Unsupported cmap format {fmt}")
+
+def _ushorts(data, offset, count):
+    a = array.array("H", data[offset:offset + 2 * count])
+    if sys.byteorder == "little":
+        a.byteswap()
+    return a
+
+# Register PDF builtin fonts, like the PDF backend does
+pymates.fonts.registerBuiltinFont("Courier-BoldOblique", "Courier", 700, True)
+pymates.fonts.registerBuiltinFont("Courier-Bold", "Courier", 700, False)
+pymates.fonts.registerBuiltinFont("Courier-Oblique", "Courier", 400, True)
+pymates.fonts.registerBuiltinFont("Courier", "Courier", 400, False)
+pymates.fonts.registerBuiltinFont("Helvetica-BoldOblique", "Helvetica", 700, True)
+pymates.fonts.registerBuiltinFont("Helvetica-Bold", "Helvetica", 700, False)
+pymates.fonts.registerBuiltinFont("Helvetica-Oblique", "Helvetica", 400, True)
+pymates.fonts.registerBuiltinFont("Helvetica", "Helvetica", 400, False)
+pymates.fonts.registerBuiltinFont("Times-BoldItalic", "Times", 700, True)
+pymates.fonts.registerBuiltinFont("Times-Bold", "Times", 700, False)
+pymates.fonts.registerBuiltinFont("Times-Italic", "Times", 400, True)
+pymates.fonts.registerBuiltinFont("Symbol", "Symbol", 400, False)
+pymates.fonts.registerBuiltinFont("ZapfDingbats", "ZapfDingbats", 400, False)
@@ -1,5 +1,13 @@
+from array import array
+from bisect import bisect_right
 from pymates.sizes import Margin, Padding, Alignment
 from pymates.fonts import Font
+import pymates.trace
+import pymates.timing
+
+_trace = pymates.trace.category("layout")
+_warning = pymates.trace.category("warning")
+_profiler = pymates.timing.profiler
 
 #def ptToPx(pt, dpi):
 #    return pt/72*dpi
@@ -12,12 +20,17 @@ from pymates.fonts import Font
 
 colors = {}
 
+# The margin and padding of blocks which have none. Margins and paddings are not modified, hence they can be shared.
+_noMargin = Margin(0, 0, 0, 0)
+_noPadding = Padding(0, 0, 0, 0)
+
 def color(r, g ,b):
-    name = f"{r},{g},{b}"
-    if name in colors:
-        return colors[name]
+    key = (r, g, b)
+    c = colors.get(key)
+    if c != None:
+        return c
     c = Color(r, g, b)
-    colors[name] = c
+    colors[key] = c
     return c
 
 class Color:
@@ -26,6 +39,10 @@ class Color:
         self.g = g
         self.b = b
 
+"""
+Document holds the flows of text which are laid out on pages.
+Its content is either generated completely before layout, or on demand while it is laid out, see setSource.
+"""
 class Document:
     def __init__(self, pageLayout, font, textColor = None):
         self.flows = []
@@ -37,9 +54,51 @@ class Document:
             self.textColor = textColor
         self._flowIndex = 0
         self.namedFlows = {}
+        # The iterator which generates the content, see setSource
+        self.source = None
+        self.streaming = False
+        # The cursor which the source writes to next. Its block may still grow.
+        self.sourceCursor = None
+
+    """
+    setSource makes the document generate its content on demand. Each step of the iterator `source` generates
+    the next part of the document and yields the cursor which the next step writes to.
+    Parts are generated when the layout needs more blocks. The blocks and flows which have been laid out
+    are released, hence the document can be laid out only once.
+    """
+    def setSource(self, source):
+        self.source = iter(source)
+        self.streaming = True
+
+    """
+    generateMore runs the next step of the source. It returns False if all content has been generated.
+    """
+    def generateMore(self):
+        if self.source == None:
+            return False
+        try:
+            self.sourceCursor = next(self.source)
+            return True
+        except StopIteration:
+            self.source = None
+            self.sourceCursor = None
+            return False
+
+    """
+    isOpen returns True if more text may be added to the block `block` or more blocks to the flow `flow`.
+    """
+    def isOpen(self, flow, block = None):
+        cursor = self.sourceCursor
+        if self.source == None or cursor == None:
+            return False
+        if block != None:
+            return cursor.block == block
+        return cursor.flow == flow
 
     def newFlow(self):
         flow = TextFlow(self, None)
+        # Flows are laid out once, hence their blocks can be released
+        flow.releaseBlocks = self.streaming
         self.flows.append(flow)
         return flow
 
@@ -61,18 +120,26 @@ class Document:
     def currentFlow(self):
         while True:
             if self._flowIndex >= len(self.flows):
+                if self.generateMore():
+                    continue
                 return None
             flow = self.flows[self._flowIndex]
             if not flow.consumed():
                 return flow
-            self._flowIndex += 1
+            if self.streaming:
+                # Release the flow which has been laid out
+                del self.flows[self._flowIndex]
+            else:
+                self._flowIndex += 1
             if self._flowIndex < len(self.flows):
                 self.flows[self._flowIndex].startLayout()
 
     def lookupFlow(self, flowName):
-        if flowName in self.namedFlows:
-            return self.namedFlows[flowName]
-        return None
+        # A named flow may be defined by a part of the document which has not been generated yet
+        while flowName not in self.namedFlows:
+            if not self.generateMore():
+                return None
+        return self.namedFlows[flowName]
         
 class TextFlow:
     def __init__(self, docOrFlow, name):
@@ -90,6 +157,8 @@ class TextFlow:
         self.namedFlows = {}
         self._blockIndex = 0
         self._pageLayout = None
+        # True if the blocks which have been laid out are dropped, see Document.setSource
+        self.releaseBlocks = False
 
     def newNamedFlow(self, name):
         if name in self.namedFlows:
@@ -116,27 +185,56 @@ class TextFlow:
         if len(self.blocks) > 0:
             self.blocks[0].startLayout()
 
+    """
+    consumed returns True if all blocks of the flow have been laid out. A flow which has received blocks is not consumed
+    until a page has been filled from it, even if the blocks are empty. While the content is generated on demand,
+    the flow is consumed only once no more blocks can be added to it.
+    """
     def consumed(self):
+        doc = self.doc
+        while self._blockIndex >= len(self.blocks) and doc.source != None and doc.isOpen(self) and doc.generateMore():
+            pass
         return self._blockIndex >= len(self.blocks)
 
     def currentBlock(self):
+        doc = self.doc
         while True:
             if self._blockIndex >= len(self.blocks):
+                if doc.source != None and doc.isOpen(self) and doc.generateMore():
+                    continue
                 return None
             b = self.blocks[self._blockIndex]
+            # A block is laid out once it is complete
+            if doc.source != None and doc.isOpen(self, b):
+                doc.generateMore()
+                continue
             if not b.consumed():
                 return b
-            self._blockIndex += 1
+            if self.releaseBlocks:
+                # The block remains referenced by the lines of its pages only
+                del self.blocks[self._blockIndex]
+            else:
+                self._blockIndex += 1
             if self._blockIndex < len(self.blocks):
                 self.blocks[self._blockIndex].startLayout()
 
+# The kinds of the items of a TextBlock
+_Word = 0
+_Space = 1
+_Box = 2
+
+"""
+TextBlock holds the text of a paragraph as a sequence of items: words, spaces and text boxes.
+The items are not objects of their own, but entries in arrays indexed by the item number.
+Consecutive items with the same font and color form a run, whose TextStyle is shared with all runs of this style.
+"""
 class TextBlock:
     def __init__(self, flow, align = Alignment.Left, font = None, textColor = None, margin = None, padding = None, leftIndent = 0, hangingLeftIndent = 0):
         self.flow = flow
         self.flow.blocks.append(self)
         self.align = align
-        self.margin = Margin(0, 0, 0, 0) if margin == None else margin
-        self.padding = Padding(0, 0, 0, 0) if padding == None else padding
+        self.margin = _noMargin if margin == None else margin
+        self.padding = _noPadding if padding == None else padding
         self.leftIndent = leftIndent
         self.hangingLeftIndent = hangingLeftIndent
         if font == None:
@@ -147,7 +245,21 @@ class TextBlock:
             self.textColor = flow.doc.textColor
         else:
             self.textColor = textColor
-        self.objects = []
+        # The number of the first item and the style of each run
+        self.runStarts = array("i")
+        self.runStyles = []
+        # The kind and the advance of each item
+        self.kinds = array("b")
+        self.advances = array("d")
+        # The x position of each item on its line, set by nextLine
+        self.positions = array("d")
+        # A word is the slice texts[textIndex[i]][starts[i]:ends[i]] of one of the strings passed to appendWords
+        self.texts = []
+        self.textIndex = array("i")
+        self.starts = array("i")
+        self.ends = array("i")
+        # The TextBoxes by the number of their item
+        self.boxes = {}
         # Set when textline() is called
         self.width = -1
         self.height = -1
@@ -155,50 +267,160 @@ class TextBlock:
         self.saveObjectIndex = 0
 
     def isEmpty(self):
-        return len(self.objects) == 0
+        return len(self.kinds) == 0
 
     def startLayout(self):
         self.objectIndex = 0
 
     def consumed(self):
-        return self.objectIndex == len(self.objects)
+        return self.objectIndex == len(self.kinds)
+
+    """
+    startRun returns the style of the run to which text in `font` and `textColor` is appended.
+    A new run is started unless the last run has this style. None stands for the font or the color of the block.
+    """
+    def startRun(self, font = None, textColor = None):
+        if font == None:
+            font = self.font
+        if textColor == None:
+            textColor = self.textColor
+        if len(self.runStyles) != 0:
+            style = self.runStyles[-1]
+            if style.font == font and style.textColor == textColor:
+                return style
+            if self.runStarts[-1] == len(self.kinds):
+                # Drop the last run, which is empty
+                self.runStyles.pop()
+                self.runStarts.pop()
+        style = textStyle(font, textColor)
+        if _profiler.enabled:
+            _profiler.count("text runs")
+        self.runStyles.append(style)
+        self.runStarts.append(len(self.kinds))
+        return style
+
+    def appendSpace(self, style):
+        self.kinds.append(_Space)
+        self.advances.append(style.spaceAdvance)
+        self.positions.append(0)
+        self.textIndex.append(-1)
+        self.starts.append(0)
+        self.ends.append(0)
+
+    """
+    appendWords appends `words`, which are the words of `text`, separated by spaces to the last run.
+    `style` is the style of this run.
+    """
+    def appendWords(self, style, text, words):
+        t = len(self.texts)
+        self.texts.append(text)
+        wordAdvances = style.font.advanceWords(words)
+        kinds = self.kinds
+        advances = self.advances
+        positions = self.positions
+        textIndex = self.textIndex
+        starts = self.starts
+        ends = self.ends
+        end = 0
+        for i in range(0, len(words)):
+            if i != 0:
+                self.appendSpace(style)
+            word = words[i]
+            start = text.find(word, end)
+            end = start + len(word)
+            kinds.append(_Word)
+            advances.append(wordAdvances[i])
+            positions.append(0)
+            textIndex.append(t)
+            starts.append(start)
+            ends.append(end)
+
+    def appendBox(self, box):
+        if len(self.runStyles) == 0:
+            self.startRun()
+        self.boxes[len(self.kinds)] = box
+        self.kinds.append(_Box)
+        self.advances.append(0)
+        self.positions.append(0)
+        self.textIndex.append(-1)
+        self.starts.append(0)
+        self.ends.append(0)
+
+    """
+    runIndex returns the number of the run which contains the item `i`.
+    """
+    def runIndex(self, i):
+        return bisect_right(self.runStarts, i) - 1
 
     def nextLine(self, width, nonEmpty = False):
-        if self.objectIndex == len(self.objects):
+        kinds = self.kinds
+        n = len(kinds)
+        i = self.objectIndex
+        if i == n:
             return None
-        t = TextLine(self.objectIndex)
+        t = TextLine(self, i)
         t.x += self.leftIndent
         width -= self.margin.left + self.padding.left + self.leftIndent + self.padding.right + self.margin.right
-        if self.objectIndex != 0:
+        if i != 0:
             width -= self.hangingLeftIndent
             t.x += self.hangingLeftIndent
-        t.save()
+        advances = self.advances
+        positions = self.positions
+        runStyles = self.runStyles
+        runStarts = self.runStarts
+        r = self.runIndex(i)
+        style = runStyles[r]
+        nextRun = runStarts[r + 1] if r + 1 < len(runStarts) else n
+        lineWidth = 0
+        ascent = 0
+        descent = 0
+        # The line state before the last space
+        saveEnd = i
+        saveWidth = 0
+        saveAscent = 0
+        saveDescent = 0
         while True:
             # End of block?
-            if self.objectIndex == len(self.objects):
+            if i == n:
+                self.objectIndex = n
+                t.setExtent(n, lineWidth, ascent, descent)
                 t.endOfBlock = True
                 if self.align == Alignment.Center:
                     t.translate((width - t.width) / 2, 0)
                 elif self.align == Alignment.Right:
                     t.translate(width - t.width, 0)
                 return t
-            # Try the next text object
-            obj = self.objects[self.objectIndex]
-            self.objectIndex += 1
+            while i == nextRun:
+                r += 1
+                style = runStyles[r]
+                nextRun = runStarts[r + 1] if r + 1 < len(runStarts) else n
+            # Try the next item
+            kind = kinds[i]
             # A space? Line could end here. Save the line state
-            if obj.isSpace():
-                t.save()
-                self.saveObjectIndex = self.objectIndex
-            # Add the text object to the line
-            t.append(obj)
+            if kind == _Space:
+                saveEnd = i
+                saveWidth = lineWidth
+                saveAscent = ascent
+                saveDescent = descent
+                self.saveObjectIndex = i + 1
+            # Add the item to the line
+            positions[i] = lineWidth
+            lineWidth += advances[i]
+            if kind != _Box:
+                if style.ascent > ascent:
+                    ascent = style.ascent
+                if style.descent > descent:
+                    descent = style.descent
+            i += 1
             # line is too long?
-            if t.width > width:
-                if nonEmpty and len(t.objects) == 1:
-                    pass
+            if lineWidth > width:
+                if nonEmpty and i - t.objectIndex == 1:
+                    self.objectIndex = i
+                    t.setExtent(i, lineWidth, ascent, descent)
                 else:
                     # Restore the previous line state, but consume the space
-                    t.restore()
                     self.objectIndex = self.saveObjectIndex
+                    t.setExtent(saveEnd, saveWidth, saveAscent, saveDescent)
                 if self.align == Alignment.Justify:
                     t.justify(width)
                 elif self.align == Alignment.Center:
@@ -213,10 +435,40 @@ class TextBlock:
     def leading(self):
         return self.font.fontmetrics.leading
 
+# TextStyles by their font and color
+_textStyles = {}
+
+"""
+textStyle returns the shared TextStyle of `font` and `textColor`.
+"""
+def textStyle(font, textColor):
+    key = (font, textColor)
+    style = _textStyles.get(key)
+    if style != None:
+        return style
+    style = TextStyle(font, textColor)
+    _textStyles[key] = style
+    return style
+
+"""
+TextStyle holds the font and color of the runs of TextBlocks and the metrics needed for their layout.
+"""
+class TextStyle:
+    def __init__(self, font, textColor):
+        self.font = font
+        self.textColor = textColor
+        self.ascent = font.fontmetrics.ascent
+        self.descent = font.fontmetrics.descent
+        self.spaceAdvance = font.advance(" ")
+
+"""
+TextLine is the range of items `objectIndex` to `endIndex` (exclusive) of `block` which fit on one line.
+"""
 class TextLine:
-    def __init__(self, objectIndex):
+    def __init__(self, block, objectIndex):
+        self.block = block
         self.objectIndex = objectIndex
-        self.objects = []
+        self.endIndex = objectIndex
         self.width = 0
         self.ascent = 0
         self.descent = 0
@@ -224,117 +476,83 @@ class TextLine:
         self.endOfBlock = False
         self.x = 0
         self.y = 0
+        # Vertical offset of the text from the baseline, see translate
+        self.textY = 0
 
     def height(self):
         return self.ascent + self.descent
 
-    def save(self):
-        self._saveObjects = len(self.objects)
-        self._saveWidth = self.width
-        self._saveAscent = self.ascent
-        self._saveDescent = self.descent
-        self._saveWordCount = self.wordCount
-
-    def restore(self):
-        self.objects = self.objects[:self._saveObjects]
-        self.width = self._saveWidth
-        self.ascent = self._saveAscent
-        self.descent = self._saveDescent
-        self.wordCount = self._saveWordCount
+    def setExtent(self, endIndex, width, ascent, descent):
+        self.endIndex = endIndex
+        self.width = width
+        self.ascent = ascent
+        self.descent = descent
 
     def justify(self, width):
         if self.endOfBlock:
             return
+        kinds = self.block.kinds
+        advances = self.block.advances
+        positions = self.block.positions
         spaces = 0
-        for obj in self.objects:
-            if obj.isSpace():
-                spaces += obj.advance
+        for i in range(self.objectIndex, self.endIndex):
+            if kinds[i] == _Space:
+                spaces += advances[i]
         addSpace = (width - self.width) / spaces
         addX = 0
-        for obj in self.objects:
-            obj.x += addX
-            if obj.isSpace():
-                addX += addSpace * obj.advance
+        for i in range(self.objectIndex, self.endIndex):
+            positions[i] += addX
+            if kinds[i] == _Space:
+                addX += addSpace * advances[i]
 
     def translate(self, x, y):
-        for obj in self.objects:
-            obj.x += x
-            obj.y += y
+        positions = self.block.positions
+        for i in range(self.objectIndex, self.endIndex):
+            positions[i] += x
+        self.textY += y
 
     def draw(self, painter, x, y):
-        painter.startText(x, y + self.ascent)
-        for obj in self.objects:
-            obj.draw(painter, x, y + self.ascent)
-            
-    def append(self, obj):
-        obj.y = 0
-        obj.x = self.width
-        self.objects.append(obj)
-        self.width += obj.advance
-        self.ascent = max(self.ascent, obj.ascent)
-        self.descent = max(self.descent, obj.descent)
+        baseline = y + self.ascent
+        painter.startText(x, baseline)
+        block = self.block
+        kinds = block.kinds
+        positions = block.positions
+        runStyles = block.runStyles
+        runStarts = block.runStarts
+        r = block.runIndex(self.objectIndex)
+        # The pen and font are set once for each run on the line
+        nextRun = self.objectIndex
+        for i in range(self.objectIndex, self.endIndex):
+            while i == nextRun:
+                style = runStyles[r]
+                r += 1
+                nextRun = runStarts[r] if r < len(runStarts) else self.endIndex
+                painter.setPen(style.textColor)
+                painter.setFont(style.font)
+            kind = kinds[i]
+            if kind == _Word:
+                painter.drawText(x + positions[i], baseline + self.textY, block.texts[block.textIndex[i]][block.starts[i]:block.ends[i]])
+            elif kind == _Space:
+                painter.drawText(x + positions[i], baseline + self.textY, " ")
 
     def textBoxes(self):
-        boxes = []
-        for obj in self.objects:
-            if isinstance(obj, TextBox):
-                boxes.append(obj)
-        return boxes
-
-class TextObject:
-    def __init__(self, block):
-        self.block = block
-        block.objects.append(self)
-        self.y = 0
-        self.startOfWord = True
-        # Set by a derived class
-        self.ascent = -1
-        self.descent = -1
-        self.advance = -1
-        # Set when the object is added to a TextLine
-        self.x = -1
-
-    def draw(self, painter, x, baseline):
-        pass
-
-    def isSpace(self):
-        return False
-
-class TextBox(TextObject):
+        boxes = self.block.boxes
+        if len(boxes) == 0:
+            return []
+        return [boxes[i] for i in range(self.objectIndex, self.endIndex) if i in boxes]
+
+"""
+TextBox is an item of a TextBlock which is replaced by the named flow `flow` when the block is laid out.
+"""
+class TextBox:
     def __init__(self, block, flow):
-        super(TextBox, self).__init__(block)
         self.flow = flow
+        block.appendBox(self)
         self.ascent = 0
         self.descent = 0
         self.advance = 0
         self.marginPoints = Margin(0, 0, 0, 0)
 
-class TextString(TextObject):
-    def __init__(self, block, str, font = None, textColor = None):
-        super(TextString, self).__init__(block)
-        self.str = str
-        if font == None:
-            self.font = block.font
-        else:
-            self.font = font
-        if textColor == None:
-            self.textColor = block.textColor
-        else:
-            self.textColor = textColor
-        # Compute the dimensions
-        self.ascent = self.font.fontmetrics.ascent
-        self.descent = self.font.fontmetrics.descent
-        self.advance = self.font.fontmetrics.advance(self.str)
-
-    def draw(self, painter, x, baseline):
-        # print(f"Draw str {self.str} at {x}+{self.x}, {baseline}")
-        painter.setPen(self.textColor)
-        painter.setFont(self.font)
-        painter.drawText(x + self.x, baseline + self.y, self.str)
-
-    def isSpace(self):
-        return self.str == " "
-
 class TextCursor:
     def __init__(self, flow):
         self.flow = flow
@@ -371,21 +589,24 @@ class TextCursor:
             self.block.hangingLeftIndent
 
     def text(self, str):
-        if self.block == None:
+        block = self.block
+        if block == None:
             raise Exception("No block")
+        count = len(block.kinds)
+        style = block.startRun(self.font, self.textColor)
         if str.startswith(" "):
-            if not self._endsWithSpace and not self.block.isEmpty():
-                TextString(self.block, " ", self.font, self.textColor)
+            if not self._endsWithSpace and not block.isEmpty():
+                block.appendSpace(style)
         words = str.split()
-        for i in range(0, len(words)):
-            if i != 0:
-                TextString(self.block, " ", self.font, self.textColor)
-            TextString(self.block, words[i], self.font, self.textColor)
+        if len(words) != 0:
+            block.appendWords(style, str, words)
         if len(words) != 0 and str.endswith(" "):
-            TextString(self.block, " ", self.font, self.textColor)
+            block.appendSpace(style)
             self._endsWithSpace = True
         else:
             self._endsWithSpace = False
+        if _profiler.enabled:
+            _profiler.count("text items", len(block.kinds) - count)
 
     def startFormat(self, font = None, textColor = None):
         self.formatStack.append({"textColor": self.textColor, "font": self.font})
@@ -433,7 +654,11 @@ class PageLayout(AbstractPageLayout):
         f = flow.lookupFlow(flowName)
         if f != None:
             return f
-        return flow.doc.lookupFlow(flowName)
+        f = flow.doc.lookupFlow(flowName)
+        if f != None:
+            return f
+        # Looking up the document generated the remaining content, which may have defined the flow
+        return flow.lookupFlow(flowName)
 
     def fillPage(self, doc, floatBoxes):
         # Create a new page
@@ -450,7 +675,8 @@ class PageLayout(AbstractPageLayout):
         for layoutBox in self.layoutBoxes:
             namedFlow = self.lookupFlow(flow, layoutBox.flowName)
             if namedFlow == None:
-                print(f"Unknown flow {layoutBox.flowName}")
+                if _warning.enabled:
+                    _warning(f"Unknown flow {layoutBox.flowName}")
                 continue
             namedFlow.startLayout()
             box = PageBox(page, layoutBox.rect.x, layoutBox.rect.y, layoutBox.rect.width, layoutBox.rect.height)
@@ -471,8 +697,19 @@ class Page:
         self.boxes = []
 
     def draw(self, painter):
+        with _profiler.span("draw", "page"):
+            for box in self.boxes:
+                box.draw(painter)
+
+    """
+    release breaks the references between the page and its boxes once the page has been drawn.
+    Then the page and its lines are freed as soon as the caller drops it instead of by the garbage collector,
+    see Layouter.layoutPages. The page cannot be drawn again.
+    """
+    def release(self):
         for box in self.boxes:
-            box.draw(painter)
+            box.release()
+        self.boxes = []
 
 class PageBox:
     def __init__(self, pageOrPageBox, xPoints, yPoints, widthPoints, maxHeightPoints):
@@ -494,6 +731,13 @@ class PageBox:
 
     def removeChildBox(self, pageBox):
         self.childBoxes.remove(pageBox)
+
+    def release(self):
+        for childBox in self.childBoxes:
+            childBox.release()
+        self.childBoxes = []
+        self.parentBox = None
+        self.page = None
         
     def fill(self, flow, textBoxes):
         if flow == None:
@@ -508,11 +752,13 @@ class PageBox:
             xPoints = textBox.marginPoints.left
             boxWidthPoints = self.widthPoints - textBox.marginPoints.left - textBox.marginPoints.right
             p = PageBox(self, xPoints, yPoints, boxWidthPoints, self.maxHeightPoints - yPoints)
-            print(f"B {boxWidthPoints}")
+            if _trace.enabled:
+                _trace(f"B {boxWidthPoints}")
             textBox.flow.startLayout()
             missingBoxes = p.fill(textBox.flow, [])
             if len(missingBoxes) != 0:
-                print("TextBox in overfull TextBox")
+                if _warning.enabled:
+                    _warning("TextBox in overfull TextBox")
             if not textBox.flow.consumed():
                 self.removeChildBox(p)
                 break
@@ -533,7 +779,10 @@ class PageBox:
                     b.undoLine(line)
                     done = True
                     break
-                print("L")
+                if _trace.enabled:
+                    _trace("L")
+                if _profiler.enabled:
+                    _profiler.count("lines")
                 # line.x = 0
                 line.y += self.heightPoints
                 self.heightPoints += h
@@ -545,11 +794,13 @@ class PageBox:
                     xPoints = textBox.marginPoints.left
                     boxWidthPoints = self.widthPoints - textBox.marginPoints.left - textBox.marginPoints.right
                     p = PageBox(self, xPoints, yPoints, boxWidthPoints, self.maxHeightPoints - yPoints)
-                    print(f"B {boxWidthPoints}")
+                    if _trace.enabled:
+                        _trace(f"B {boxWidthPoints}")
                     textBox.flow.startLayout()
                     missingBoxes = p.fill(textBox.flow, [])
                     if len(missingBoxes) != 0:
-                        print("TextBox in overfull TextBox")
+                        if _warning.enabled:
+                            _warning("TextBox in overfull TextBox")
                     if not textBox.flow.consumed():
                         textBoxes.append(textBox)
                         self.removeChildBox(p)
@@ -579,23 +830,63 @@ class Layouter:
     def __init__(self, doc):
         self.doc = doc
         self.pages = []
+        self.pageCount = 0
 
+    """
+    layout lays out the whole document and keeps its pages in `pages`.
+    """
     def layout(self):
-        self.doc.startLayout()
-        floatBoxes = []
-        # Iterate over all flows
-        while True:
-            print("F")
-            flow = self.doc.currentFlow()
-            if flow == None:
-                return
-            # Choose the page layout for the flow
-            pageLayout = flow.pageLayout()
+        for page in self.layoutPages():
+            self.pages.append(page)
+
+    """
+    layoutPages lays out the document and yields each page once it has been filled. The pages are not kept.
+    If the document is generated on demand, see Document.setSource, only the pages kept by the caller
+    and the blocks of the current page remain in memory. Callers which draw each page and drop it
+    should call Page.release after drawing.
+    """
+    def layoutPages(self):
+        _profiler.begin("layout")
+        # Number of spans opened by layoutPages, i.e. "layout" and the span of the current flow
+        spans = 1
+        suspended = None
+        try:
+            self.doc.startLayout()
+            floatBoxes = []
+            flow = None
             while True:
+                if flow != None and flow.consumed():
+                    flow = None
+                    _profiler.end()
+                    spans -= 1
+                if flow == None:
+                    # Continue with the next flow
+                    if _trace.enabled:
+                        _trace("F")
+                    flow = self.doc.currentFlow()
+                    if flow == None:
+                        return
+                    # Choose the page layout for the flow
+                    pageLayout = flow.pageLayout()
+                    _profiler.begin("flow", "flow", {"flow": flow.name})
+                    spans += 1
+                else:
+                    pageLayout = pageLayout.nextPageLayout()
                 # Create pages until the flow is consumed
-                print("P")
-                page, floatBoxes = pageLayout.fillPage(self.doc, floatBoxes)
-                self.pages.append(page)
-                if flow.consumed():
-                    break
-                pageLayout = pageLayout.nextPageLayout()
+                if _trace.enabled:
+                    _trace("P")
+                with _profiler.span("page", "page", {"page": self.pageCount + 1}):
+                    page, floatBoxes = pageLayout.fillPage(self.doc, floatBoxes)
+                self.pageCount += 1
+                if _profiler.enabled:
+                    _profiler.count("pages")
+                # The spans are suspended while a page is yielded, such that the work of the caller is not charged to layout
+                suspended = _profiler.suspend(spans)
+                yield page
+                _profiler.resume(suspended)
+                suspended = None
+        finally:
+            # The spans of a generator which is not run to its end remain suspended and are dropped
+            if suspended == None:
+                for i in range(0, spans):
+                    _profiler.end()
@@ -1,5 +1,5 @@
 import sys
-from PySide6.QtGui import QPalette, QPainter, QTransform, QColor
+from PySide6.QtGui import QPalette, QPainter, QTransform, QColor, QAction, QKeySequence
 from PySide6.QtCore import Qt, QRect
 from PySide6.QtWidgets import QMainWindow, QScrollArea, QApplication, QWidget
 from pymates.qtbackend import hPtToPx, wPtToPx
@@ -69,6 +69,15 @@ class MainWindow(QMainWindow):
         self.pageArea.setFixedHeight(self.pageArea.widgetHeightPx)
         self.pageArea.setFixedWidth(self.pageArea.widgetWidthPx)
 
+    """
+    setReloadHandler adds a Reload action with the shortcut F5. It shows the document returned by `handler`.
+    """
+    def setReloadHandler(self, handler):
+        action = QAction("Reload", self)
+        action.setShortcut(QKeySequence.Refresh)
+        action.triggered.connect(lambda: self.setDocument(handler()))
+        self.addAction(action)
+
 from pymates.lom import PageLayout, Document, Layouter, color
 from pymates.fonts import font
 from pymates.sizes import Margin, Alignment, A4
@@ -1,7 +1,27 @@
 import os
 import pymates.fonts
-from pymates.dom import DocumentNode, ParagNode, StyleNode, SpanNode, MathNode, inline
+from pymates.dom import DocumentNode, ParagNode, StyleNode, SpanNode, MathNode, internStyle, inline
 from pymates.lom import Alignment
+import pymates.trace
+
+_trace = pymates.trace.category("markdown")
+
+# The default styles of the sections. They are shared by all nodes of a kind, see internStyle.
+_emptyStyle = internStyle({})
+_pStyle = internStyle({"fontSize": 12})
+_h1Style = internStyle({"fontSize": 32})
+_h2Style = internStyle({"fontSize": 24})
+_h3Style = internStyle({"fontSize": 20})
+_h4Style = internStyle({"fontSize": 16})
+_bulletitemStyle = internStyle({"fontSize": 12, "enum": "- "})
+_codeStyle = internStyle({"fontFamily": "Courier"})
+# The styles of the inline formats without parameters
+_boldStyle = internStyle({"fontWeight": 700})
+_italicStyle = internStyle({"italic": True})
+_underlineStyle = internStyle({"underline": True})
+_strikeStyle = internStyle({"strikeOut": True})
+_mathStyle = internStyle({"math": True})
+_inlineCodeStyle = internStyle({"color": (0xd0, 0x10, 0x40), "fontFamily": "Courier"})
 
 def document():
     return DocumentNode(document)
@@ -36,26 +56,27 @@ def ref(node, name):
     return section.referenceName()
 
 def p(*children):
-    return ParagNode(p, style={"fontSize": 12}, children=children)
+    return ParagNode(p, style=_pStyle, children=children)
 
 def h1(*children):
-    return ParagNode(h1, style={"fontSize": 32}, children=children)
+    return ParagNode(h1, style=_h1Style, children=children)
 
 def h2(*children):
-    return ParagNode(h2, style={"fontSize": 24}, children=children)
+    return ParagNode(h2, style=_h2Style, children=children)
 
 def h3(*children):
-    return ParagNode(h3, style={"fontSize": 20}, children=children)
+    return ParagNode(h3, style=_h3Style, children=children)
 
 def h4(*children):
-    return ParagNode(h4, style={"fontSize": 16}, children=children)
+    return ParagNode(h4, style=_h4Style, children=children)
 
 def bulletlist(*children):
-    print("------------- BULLET LIST-----------")
-    return ParagNode(bulletlist, style={}, children=children)
+    if _trace.enabled:
+        _trace("------------- BULLET LIST-----------")
+    return ParagNode(bulletlist, style=_emptyStyle, children=children)
 
 def bulletitem(*children):
-    return ParagNode(bulletitem, style={"fontSize": 12, "enum": "- "}, parentContainer=bulletlist, isExplicitContainer=True, children=children)
+    return ParagNode(bulletitem, style=_bulletitemStyle, parentContainer=bulletlist, isExplicitContainer=True, children=children)
 
 # TODO: listitem
 
@@ -66,31 +87,31 @@ def subchapter(*children):
     return h2(counter("Section {}.{}: ", "Section {}.{}", "Level1", "Level2"), *children)
 
 def code(*children):
-    return ParagNode(code, style={"fontFamily": "Courier"}, children=children)
+    return ParagNode(code, style=_codeStyle, children=children)
 
 def math(*children):
-    return ParagNode(code, style={}, children=children)
+    return ParagNode(code, style=_emptyStyle, children=children)
 
 def style(child = None, **styleInfo):
-    return StyleNode(style, child=child, style=styleInfo)
+    return StyleNode(style, child=child, style=internStyle(styleInfo))
 
 def bold(child = None):
-    return style(child, fontWeight=700)
+    return StyleNode(style, child=child, style=_boldStyle)
 
 def italic(child = None):
-    return style(child, italic=True)
+    return StyleNode(style, child=child, style=_italicStyle)
 
 def emph(child = None):
     return bold(italic(child))
 
 def underline(child = None):
-    return style(child, underline=True)
+    return StyleNode(style, child=child, style=_underlineStyle)
 
 def strike(child = None):
-    return style(child, strikeOut=True)
+    return StyleNode(style, child=child, style=_strikeStyle)
 
 def tt(child = None):
-    return style(child, fontFamily="Courier")
+    return StyleNode(style, child=child, style=_codeStyle)
 
 def color(red, green, blue, child = None):
     return style(child, color=(red, green, blue))
@@ -120,10 +141,10 @@ def padding(left=None, top=None, right=None, bottom=None, child=None):
     return style(child, padding={"left": left, "top": top, "right": right, "bottom": bottom})
 
 def inlineMath(child):
-    return style(child, math=True)
+    return StyleNode(style, child=child, style=_mathStyle)
 
 def inlineCode(child):
-    return style(child, color=(0xd0, 0x10, 0x40), fontFamily="Courier")
+    return StyleNode(style, child=child, style=_inlineCodeStyle)
 
 # def fract(counter, denominator):
 #    return MathNode(fract, [counter, denominator])
@@ -199,7 +220,7 @@ def slidedeck():
     return pagesize(landscape(A4))
 
 def slide(*children):
-    return ParagNode(slide, style={}, parentContainer=document, isDefaultContainer=True, children=(
+    return ParagNode(slide, style=_emptyStyle, parentContainer=document, isDefaultContainer=True, children=(
         flow(), pageLayout(), margin(20*mm, 50*mm, 20*mm, 20*mm),
         pageBox(flow="title", rect=(20*mm, 15*mm, 250*mm, 30*mm)),
         pageBox(flow="footer", rect=(20*mm, 190*mm, 250*mm, 10*mm)),
@@ -207,12 +228,12 @@ def slide(*children):
     ))
 
 def title(*children):
-    return ParagNode(title, style={"fontSize": 32}, parentContainer=slide, children=(
+    return ParagNode(title, style=_h1Style, parentContainer=slide, children=(
         flow("title", "flow"), *children
     ))
 
 def footer(localPage = False, *children):
-    return ParagNode(footer, style={"fontSize": 12}, children=(
+    return ParagNode(footer, style=_pStyle, children=(
         flow("footer", "flow" if localPage else "document"), *children
     ))
 
@@ -0,0 +1,226 @@
+import gc
+import os
+import zlib
+import pickle
+import hashlib
+import pymates
+import pymates.timing
+from pymates.scanner import Scanner
+
+_profiler = pymates.timing.profiler
+
+# Changes whenever the format of the cache files changes
+_formatVersion = 5
+_suffix = ".pickle"
+
+"""
+ParseCache stores parsed documents on disk, such that an unchanged source is not scanned and parsed again.
+
+An entry is addressed by the hash of the source, the builtins known to the parser and the pymates version.
+Each file of a project is cached on its own. The parsed tree is stored before evaluation.
+The cache is bounded by `maxSize` bytes. When it grows beyond, the least recently used entries are evicted.
+If `enabled` is False, the directory is empty or cannot be created, sources are parsed without caching.
+"""
+class ParseCache:
+    def __init__(self, directory = None, maxSize = 64 << 20, enabled = True):
+        if directory == None:
+            directory = defaultCacheDirectory()
+        self.directory = directory
+        self.maxSize = maxSize
+        self.enabled = enabled and directory != ""
+        if self.enabled:
+            try:
+                os.makedirs(directory, exist_ok = True)
+            except OSError:
+                self.enabled = False
+
+    """
+    parseFile sets `parser.doc` to the document parsed from the file at `path`.
+    The builtins must have been added to `parser` already.
+    The file is parsed only if it is not in the cache.
+    """
+    def parseFile(self, parser, path):
+        if not self.enabled:
+            with open(path) as file:
+                parser.setInput(Scanner(file))
+                parser.parse()
+            return
+        with _profiler.span("hash", "cache"):
+            key = self.key(_fileDigest(path), parser.nspace)
+        doc = self.load(key)
+        if doc != None:
+            parser.doc = doc
+            return
+        # The scanner reads the file in chunks while parsing
+        with open(path) as file:
+            parser.setInput(Scanner(file))
+            parser.parse()
+        self.store(key, parser.doc)
+
+    """
+    parse sets `parser.doc` to the document parsed from the string `src`.
+    """
+    def parse(self, parser, src):
+        if not self.enabled:
+            parser.setInput(Scanner(src))
+            parser.parse()
+            return
+        key = self.key(hashlib.sha256(src.encode()).digest(), parser.nspace)
+        doc = self.load(key)
+        if doc != None:
+            parser.doc = doc
+            return
+        parser.setInput(Scanner(src))
+        parser.parse()
+        self.store(key, parser.doc)
+
+    """
+    key returns the name of the cache entry for a source with the SHA-256 digest `digest`,
+    which is parsed with the Builtins `nspace`.
+    """
+    def key(self, digest, nspace):
+        h = hashlib.sha256(digest)
+        h.update(f"{pymates.__version__}/{_formatVersion}\0".encode())
+        h.update(nspace.signature().encode())
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + _suffix)
+
+    """
+    load returns the document stored under `key` or None.
+    """
+    def load(self, key):
+        if not self.enabled:
+            return None
+        path = self.path(key)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+        # Unpickling creates many objects and no garbage. Collecting while loading would take most of the time
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with _profiler.span("cache load", "cache"):
+                doc = pickle.loads(zlib.decompress(data))
+        except Exception:
+            # A broken entry is treated like a missing one
+            self.invalidate(key)
+            return None
+        finally:
+            if enabled:
+                gc.enable()
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return doc
+
+    """
+    store writes `doc` to the cache under `key` and evicts entries if the cache has grown too large.
+    Documents which cannot be serialized, e.g. because a builtin is a lambda, are not cached.
+    Neither are documents which cannot be written, e.g. because the disk is full.
+    """
+    def store(self, key, doc):
+        if not self.enabled:
+            return
+        try:
+            with _profiler.span("cache store", "cache"):
+                data = pickle.dumps(doc, pickle.HIGHEST_PROTOCOL)
+                # The tree repeats the same attributes and functions for every node. Even fast compression shrinks it a lot
+                data = zlib.compress(data, 1)
+        except (pickle.PicklingError, AttributeError, TypeError, RecursionError):
+            return
+        path = self.path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as file:
+                file.write(data)
+            # Readers never see a partially written entry
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self.evict()
+
+    """
+    invalidate removes the entry `key` from the cache.
+    """
+    def invalidate(self, key):
+        if not self.enabled:
+            return
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+    """
+    invalidateFile removes the entry for the current content of the file at `path`, parsed with the builtins of `parser`.
+    """
+    def invalidateFile(self, parser, path):
+        self.invalidate(self.key(_fileDigest(path), parser.nspace))
+
+    """
+    clear removes all entries from the cache.
+    """
+    def clear(self):
+        if not self.enabled:
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(_suffix):
+                self.invalidate(name[:-len(_suffix)])
+
+    """
+    evict removes the least recently used entries until the cache is no larger than `maxSize` bytes.
+    """
+    def evict(self):
+        entries = []
+        size = 0
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(_suffix):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    size += st.st_size
+        except OSError:
+            return
+        if size <= self.maxSize:
+            return
+        entries.sort()
+        for mtime, s, path in entries:
+            if size <= self.maxSize:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            size -= s
+
+"""
+_fileDigest returns the SHA-256 digest of the file at `path`. The file is read in chunks.
+"""
+def _fileDigest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as file:
+        while True:
+            data = file.read(1 << 16)
+            if len(data) == 0:
+                break
+            h.update(data)
+    return h.digest()
+
+"""
+defaultCacheDirectory returns the directory named by the environment variable PYMATES_CACHE
+or a pymates directory in the user's cache directory. An empty PYMATES_CACHE disables the cache.
+"""
+def defaultCacheDirectory():
+    if "PYMATES_CACHE" in os.environ:
+        return os.environ["PYMATES_CACHE"]
+    base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "pymates", "parse")
@@ -1,7 +1,12 @@
-import inspect
+import types
 from pymates.markdown import document, inlineCode, inlineMath, bold, italic, math, code, h1, h2, h3, h4, p, span, bulletitem
-from pymates.scanner import Token, Scanner
+from pymates.scanner import Token, Scanner, Tokens
 from pymates.dom import FunctionNode, SpanNode, FunctionNodeMode
+import pymates.trace
+import pymates.timing
+
+_trace = pymates.trace.category("parser")
+_profiler = pymates.timing.profiler
 
 def isKeywordArgument(code):
     for i in range(0, len(code)):
@@ -12,159 +17,358 @@ def isKeywordArgument(code):
             return False
     return False
 
+# Token kinds as small ints. These are the values stored in Tokens.kinds
+_EoF = Token.EoF.value
+_Text = Token.Text.value
+_Section = Token.Section.value
+_BracketOpen = Token.BracketOpen.value
+_BracketClose = Token.BracketClose.value
+_TableRow = Token.TableRow.value
+_InlineCode = Token.InlineCode.value
+_InlineMath = Token.InlineMath.value
+_CodeSection = Token.CodeSection.value
+_MathSection = Token.MathSection.value
+_DefinitionSection = Token.DefinitionSection.value
+_Style = Token.Style.value
+_OrderedListSection = Token.OrderedListSection.value
+_UnorderedListSection = Token.UnorderedListSection.value
+_Function = Token.Function.value
+_FunctionSection = Token.FunctionSection.value
+_FunctionArg = Token.FunctionArg.value
+_tokenKinds = max(t.value for t in Token) + 1
+
+"""
+Builtins maps names to the functions and values which can be used in markdown and in Python expressions.
+Modules are added without inspecting them. A name is resolved from the modules when it is looked up for the first time.
+A name added later hides the same name added earlier, no matter whether it has been added alone or by a module.
+"""
+class Builtins(dict):
+    def __init__(self):
+        super(Builtins, self).__init__()
+        # Modules and (name, value) pairs in the order in which they have been added
+        self.sources = []
+
+    def add(self, name, value):
+        self.sources.append((name, value))
+        self[name] = value
+
+    def addModule(self, mod):
+        self.sources.append(mod)
+        # Drop the names resolved so far which are hidden by the module
+        for name in [name for name in self.keys() if _moduleProvides(mod, name)]:
+            del self[name]
+
+    def __missing__(self, name):
+        for source in reversed(self.sources):
+            if isinstance(source, tuple):
+                if source[0] == name:
+                    value = source[1]
+                    break
+            elif _moduleProvides(source, name):
+                value = getattr(source, name)
+                break
+        else:
+            raise KeyError(name)
+        self[name] = value
+        return value
+
+    def __contains__(self, name):
+        try:
+            self[name]
+            return True
+        except KeyError:
+            return False
+
+    def get(self, name, default = None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    """
+    signature returns a string which identifies the added modules and builtins.
+    """
+    def signature(self):
+        parts = []
+        for source in self.sources:
+            if isinstance(source, tuple):
+                name, value = source
+                if callable(value):
+                    value = f"{getattr(value, '__module__', '')}.{getattr(value, '__qualname__', '')}"
+                parts.append(f"{name}={value}")
+            else:
+                parts.append(source.__name__)
+        return "\0".join(parts)
+
+"""
+_moduleProvides returns True if `name` is a builtin of the module `mod`.
+These are the names listed in `_pymates_all_` or, if the module has no such list, its functions.
+"""
+def _moduleProvides(mod, name):
+    if hasattr(mod, "_pymates_all_"):
+        return name in mod._pymates_all_
+    return isinstance(getattr(mod, name, None), types.FunctionType)
+
+"""
+Parser builds the document tree from tokens.
+`scanner` is either a Scanner or the Tokens of the whole source.
+It can be omitted and passed to setInput later, e.g. once it is known that a cached document cannot be used.
+"""
 class Parser:
-    def __init__(self, scanner):
-        self.scanner = scanner
+    def __init__(self, scanner = None):
+        self.setInput(scanner)
         self.doc = document()
-        self.nspace = {}
+        # All FunctionNodes are indexed while parsing, such that the Evaluator need not search for them
+        self.doc.functions = {}
+        self.nspace = Builtins()
+
+    def setInput(self, scanner):
+        if isinstance(scanner, Tokens):
+            self.tokens = scanner
+            self.scanner = None
+        else:
+            self.tokens = None
+            self.scanner = scanner
+        self.pos = -1       # Index of the current token in `tokens`
+        self.txt = ""       # Text of the current token read from `scanner`
 
     def addBuiltin(self, name, func):
-        self.nspace[name] = func
+        self.nspace.add(name, func)
 
     def addBuiltins(self, mod):
-        if hasattr(mod, "_pymates_all_"):
-            for key in getattr(mod, "_pymates_all_"):
-                self.addBuiltin(key, getattr(mod, key))
-            return
-        for name, val in inspect.getmembers(mod, lambda o: inspect.isfunction(o)):
-            # print(f"Importing {name}")
-            self.addBuiltin(name, val)
+        self.nspace.addModule(mod)
 
     def lookupBuiltin(self, name, default):
-        if name in self.nspace:
-            return self.nspace[name]
-        return default
+        return self.nspace.get(name, default)
 
-    def parse(self):
-        self.parseSection(self.doc)
+    """
+    next moves to the next token and returns its kind.
+    """
+    def next(self):
+        if self.tokens != None:
+            self.pos += 1
+            return self.tokens.kinds[self.pos]
+        r, tok, self.txt = self.scanner.scan()
+        return tok.value
 
-    def parseSection(self, section):
-        while True:
-            r, tok, txt = self.scanner.scan()
-            if tok == Token.EoF:
-                break
-            elif tok == Token.Text:
-                print(f"STR: '{txt}'")
-                section.append(txt)
-            elif tok == Token.OrderedListSection:
-                newSection = self.lookupBuiltin("listitem", listitem)()
-                newSection.indent = self.scanner.indent
-                section.append(newSection)
-            elif tok == Token.UnorderedListSection:
-                newSection = self.lookupBuiltin("bulletitem", bulletitem)()
-                newSection.indent = self.scanner.indent
-                section.append(newSection)            
-            elif tok == Token.Section:
-                if txt == "#p":
-                    newSection = self.lookupBuiltin("p", p)()
-                elif txt == "#":
-                    newSection = self.lookupBuiltin("h1", h1)()
-                elif txt == "##":
-                    newSection = self.lookupBuiltin("h2", h2)()
-                elif txt == "###":
-                    newSection = self.lookupBuiltin("h3", h2)()
-                elif txt == "####":
-                    newSection = self.lookupBuiltin("h4", h2)()
+    """
+    peek returns the kind of the token following the current one.
+    """
+    def peek(self):
+        if self.tokens != None:
+            return self.tokens.kinds[self.pos + 1]
+        r, tok, txt = self.scanner.peek()
+        return tok.value
+
+    """
+    text returns the text of the current token. Tokens build it on request only.
+    """
+    def text(self):
+        if self.tokens != None:
+            return self.tokens.text(self.pos)
+        return self.txt
+
+    """
+    indent returns the indentation level of the last tag after the current token.
+    """
+    def indent(self):
+        if self.tokens != None:
+            return self.tokens.indents[self.pos]
+        return self.scanner.indent
+
+    """
+    parse builds the document from all tokens.
+    Tokens are dispatched by their kind through a table of handlers. Spans which are open are kept
+    on an explicit stack instead of the Python call stack, such that nesting is not limited by recursion.
+    """
+    def parse(self):
+        with _profiler.span("parse"):
+            self.bindBuiltins()
+            # Handlers for tokens outside of spans and inside of spans, indexed by token kind
+            sectionHandlers = [self.onUnexpectedToken] * _tokenKinds
+            sectionHandlers[_Text] = self.onText
+            sectionHandlers[_Section] = self.onSection
+            sectionHandlers[_OrderedListSection] = self.onOrderedListSection
+            sectionHandlers[_UnorderedListSection] = self.onUnorderedListSection
+            sectionHandlers[_MathSection] = self.onMathSection
+            sectionHandlers[_CodeSection] = self.onCodeSection
+            sectionHandlers[_TableRow] = self.onIgnore   # TODO
+            sectionHandlers[_DefinitionSection] = self.onIgnore   # TODO
+            sectionHandlers[_FunctionSection] = self.onFunctionSection
+            spanHandlers = [self.onUnexpectedTokenInSpan] * _tokenKinds
+            spanHandlers[_Text] = self.onSpanText
+            for handlers in (sectionHandlers, spanHandlers):
+                handlers[_BracketOpen] = self.onBracketOpen
+                handlers[_InlineCode] = self.onInlineCode
+                handlers[_InlineMath] = self.onInlineMath
+                handlers[_Style] = self.onStyle
+                handlers[_Function] = self.onFunction
+            # Each open span is a tuple (span, endToken, endText, function). If `function` is not None,
+            # the span is a bracket argument of this FunctionNode.
+            self.stack = []
+            stack = self.stack
+            doc = self.doc
+            tokens = self.tokens
+            if tokens != None:
+                kinds = tokens.kinds
+            # Tokens which have been read from a Scanner. Tokens count themselves
+            count = 0
+            while True:
+                if tokens != None:
+                    self.pos += 1
+                    tok = kinds[self.pos]
                 else:
-                    raise BaseException("Oooops")
-                print(self.scanner.indent)
-                newSection.indent = self.scanner.indent
-                section.append(newSection)
-            elif tok == Token.BracketOpen:
-                newSpan = self.lookupBuiltin("span", span)()
-                section.append(self.parseSpan(newSpan, Token.BracketClose, "}"))
-            elif tok == Token.InlineCode:
-                newSpan = self.lookupBuiltin("inlineCode", inlineCode)(txt)
-                section.append(newSpan)
-            elif tok == Token.InlineMath:
-                newSpan = self.lookupBuiltin("inlineMath", inlineMath)(txt)
-                section.append(newSpan)
-            elif tok == Token.MathSection:
-                newSection = self.lookupBuiltin("math", math)()
-                newSection.indent = self.scanner.indent
-                section.append(newSection)
-            elif tok == Token.CodeSection:
-                newSection = self.lookupBuiltin("code", code)()
-                newSection.indent = self.scanner.indent
-                section.append(newSection)
-            elif tok == Token.TableRow:
-                pass # TODO
-            elif tok == Token.DefinitionSection:
-                pass # TODO
-            elif tok == Token.Style:
-                if txt == "*":
-                    newSpan = self.lookupBuiltin("bold", bold)(None)
-                    section.append(self.parseSpan(newSpan, Token.Style, "*"))
-                elif txt == "_":
-                    newSpan = self.lookupBuiltin("italic", italic)(None)
-                    section.append(self.parseSpan(newSpan, Token.Style, "_"))
+                    tok = self.next()
+                    count += 1
+                if len(stack) == 0:
+                    if tok == _EoF:
+                        break
+                    sectionHandlers[tok](doc)
+                    continue
+                span, endToken, endText, func = stack[-1]
+                # Only style tokens differ in their text
+                if tok == endToken and (tok != _Style or self.text() == endText):
+                    stack.pop()
+                    if func != None:
+                        self.openArgument(func)
+                elif tok == _EoF:
+                    raise BaseException(f"Unexpected end of file. Missing '{endText}'")
                 else:
-                    raise BaseException("Ooops")
-            elif tok == Token.Function or tok == Token.FunctionSection:
-                func = self.lookupBuiltin(txt, None)
-                if func == None:
-                    raise BaseException(f"Unknown function {txt}")
-                section.append(self.parseFunction(func, tok == Token.FunctionSection))
-            else:
-                raise BaseException(f"Unexpected token {txt}")
+                    spanHandlers[tok](span)
+            if _profiler.enabled and tokens == None:
+                _profiler.count("tokens", count)
 
-    def parseFunction(self, func, possibleSection):
-        print(f"Parse function {func.__name__}")
+    """
+    bindBuiltins resolves the builtins which are created by markup instead of by name once per parse.
+    """
+    def bindBuiltins(self):
+        lookup = self.lookupBuiltin
+        self.sectionTags = {"#p": lookup("p", p), "#": lookup("h1", h1), "##": lookup("h2", h2), "###": lookup("h3", h2), "####": lookup("h4", h2)}
+        self.listitem = lookup("listitem", None)
+        self.bulletitem = lookup("bulletitem", bulletitem)
+        self.math = lookup("math", math)
+        self.code = lookup("code", code)
+        self.span = lookup("span", span)
+        self.inlineCode = lookup("inlineCode", inlineCode)
+        self.inlineMath = lookup("inlineMath", inlineMath)
+        self.bold = lookup("bold", bold)
+        self.italic = lookup("italic", italic)
+
+    def onText(self, parent):
+        txt = self.text()
+        if _trace.enabled:
+            _trace(f"STR: '{txt}'")
+        parent.append(txt)
+
+    def onSpanText(self, parent):
+        parent.append(self.text())
+
+    def onSection(self, parent):
+        txt = self.text()
+        if txt not in self.sectionTags:
+            raise BaseException("Oooops")
+        newSection = self.sectionTags[txt]()
+        if _trace.enabled:
+            _trace(self.indent())
+        newSection.indent = self.indent()
+        parent.append(newSection)
+
+    def onOrderedListSection(self, parent):
+        if self.listitem == None:
+            raise BaseException("Unknown function listitem")
+        newSection = self.listitem()
+        newSection.indent = self.indent()
+        parent.append(newSection)
+
+    def onUnorderedListSection(self, parent):
+        newSection = self.bulletitem()
+        newSection.indent = self.indent()
+        parent.append(newSection)
+
+    def onMathSection(self, parent):
+        newSection = self.math()
+        newSection.indent = self.indent()
+        parent.append(newSection)
+
+    def onCodeSection(self, parent):
+        newSection = self.code()
+        newSection.indent = self.indent()
+        parent.append(newSection)
+
+    def onIgnore(self, parent):
+        pass
+
+    def onBracketOpen(self, parent):
+        newSpan = self.span()
+        parent.append(newSpan)
+        self.stack.append((newSpan, _BracketClose, "}", None))
+
+    def onInlineCode(self, parent):
+        parent.append(self.inlineCode(self.text()))
+
+    def onInlineMath(self, parent):
+        parent.append(self.inlineMath(self.text()))
+
+    def onStyle(self, parent):
+        txt = self.text()
+        if txt == "*":
+            newSpan = self.bold(None)
+        elif txt == "_":
+            newSpan = self.italic(None)
+        else:
+            raise BaseException("Ooops")
+        parent.append(newSpan)
+        self.stack.append((newSpan, _Style, txt, None))
+
+    def onFunction(self, parent):
+        parent.append(self.parseFunction(False))
+
+    def onFunctionSection(self, parent):
+        parent.append(self.parseFunction(True))
+
+    def onUnexpectedToken(self, parent):
+        raise BaseException(f"Unexpected token {self.text()}")
+
+    def onUnexpectedTokenInSpan(self, parent):
+        raise BaseException(f"Unexpected token {self.text()} in span")
+
+    """
+    parseFunction creates the FunctionNode of the current token and consumes its arguments in parentheses.
+    Its arguments in brackets are parsed as spans by `parse`, see openArgument.
+    """
+    def parseFunction(self, possibleSection):
+        txt = self.text()
+        func = self.nspace.get(txt)
+        if func == None:
+            raise BaseException(f"Unknown function {txt}")
+        if _trace.enabled:
+            _trace(f"Parse function {func.__name__}")
         node = FunctionNode(func, FunctionNodeMode.SectionOrInline if possibleSection else FunctionNodeMode.Inline, [], {})
         node.evaluateArgs = True
-        node.indent = self.scanner.indent
-        print(node)
-        r, tok, txt = self.scanner.peek()
-        while tok == Token.FunctionArg:    
-            self.scanner.scan()
-            txt = txt.rstrip().lstrip()
+        node.indent = self.indent()
+        self.doc.indexFunction(node)
+        if _trace.enabled:
+            _trace(node)
+        while self.peek() == _FunctionArg:
+            self.next()
+            txt = self.text().rstrip().lstrip()
             kw = isKeywordArgument(txt)
             if kw == False:
                 node.args.append(txt)
             else:
                 node.kwargs[kw[0]] = kw[1]
-            r, tok, txt = self.scanner.peek()
-        while tok == Token.BracketOpen:
-            self.scanner.scan()
-            newSpan = self.parseSpan(SpanNode(span), Token.BracketClose, "}")
-            node.append(newSpan)
-            r, tok, txt = self.scanner.peek()
+        self.openArgument(node)
         return node
 
-    def parseSpan(self, span, endToken, endText):
-        while True:
-            r, tok, txt = self.scanner.scan()
-            if tok == endToken and txt == endText:
-                return span
-            elif tok == Token.EoF:
-                raise BaseException(f"Unexpected end of file. Missing '{endText}'")
-            elif tok == Token.Text:
-                span.append(txt)
-            elif tok == Token.BracketOpen:
-                newSpan = self.lookupBuiltin("span", span)()
-                span.append(self.parseSpan(newSpan))
-            elif tok == Token.InlineCode:
-                newSpan = self.lookupBuiltin("inlineCode", inlineCode)(txt)
-                span.append(newSpan)
-            elif tok == Token.InlineMath:
-                newSpan = self.lookupBuiltin("inlineMath", inlineMath)(txt)
-                span.append(newSpan)
-            elif tok == Token.Style:
-                if txt == "*":
-                    newSpan = self.lookupBuiltin("bold", bold)(None)
-                    span.append(self.parseSpan(newSpan, Token.Style, "*"))
-                elif txt == "_":
-                    newSpan = self.lookupBuiltin("italic", italic)(None)
-                    span.append(self.parseSpan(newSpan, Token.Style, "_"))
-                else:
-                    raise BaseException("Ooops")
-            elif tok == Token.Function:
-                func = self.lookupBuiltin(txt, None)
-                if func == None:
-                    raise BaseException(f"Unknown function {txt}")
-                span.append(self.parseFunction(func, False))
-            else:
-                raise BaseException(f"Unexpected token {txt} in span")
+    """
+    openArgument opens a span for the next argument in brackets of the FunctionNode `node`, if there is one.
+    """
+    def openArgument(self, node):
+        if self.peek() == _BracketOpen:
+            self.next()
+            newSpan = SpanNode(span)
+            node.append(newSpan)
+            self.stack.append((newSpan, _BracketClose, "}", node))
 
 if __name__ == '__main__':
     scanner = Scanner("""
@@ -1,51 +1,68 @@
 import sys
 import pymates.markdown
 import pymates.sizes
-import pymates.pdfbackend
 import pymates.fonts
+import pymates.trace
+import pymates.timing
 from pymates.parser import Parser
-from pymates.scanner import Scanner
+from pymates.parsecache import ParseCache
 from pymates.evaluator import Evaluator
 from pymates.treeify import treeify
-from pymates.generator import generate
+from pymates.generator import generateStream
 from pymates.lom import Layouter
-from reportlab.pdfgen import canvas
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
+    # --trace=categories enables the trace, see pymates.trace
+    args = pymates.trace.configureFromArguments(sys.argv[1:])
+    # --profile prints where the time goes, --profile=file.json writes a Chrome trace as well
+    args = pymates.timing.configureFromArguments(args)
+    profiler = pymates.timing.profiler
+    # --no-cache parses the file even if it is in the parse cache
+    useCache = "--no-cache" not in args
+    args = [a for a in args if a != "--no-cache"]
+    if len(args) != 1:
         print("Wrong argument count")
         sys.exit(1)
 
-    pymates.pdfbackend.pdfInit()
-    pymates.fonts.setFontMetricsBackend(pymates.pdfbackend)
-
-    file = open(sys.argv[1])
-    content = file.read()
-    file.close()
-
-    scanner = Scanner(content)
-    parser = Parser(scanner)
+    parser = Parser()
     # Add builtins
     parser.addBuiltins(pymates.markdown)
     parser.addBuiltins(pymates.sizes)
-    parser.parse()
+    # An unchanged file is not parsed again
+    ParseCache(enabled = useCache).parseFile(parser, args[0])
 
     ev = Evaluator()
     ev.evaluate(parser.doc, parser.nspace)
 
     treeify(parser.doc)
-    
-    doc = generate(parser.doc)
+
+    # reportlab is imported only once the document is known to be valid
+    import pymates.pdfbackend
+    from reportlab.pdfgen import canvas
+
+    pymates.pdfbackend.pdfInit()
+    pymates.fonts.setFontMetricsBackend(pymates.pdfbackend)
+
+    # The content is generated while it is laid out, and each page is drawn as soon as it has been filled.
+    # Hence only a few pages are in memory at a time.
+    doc = generateStream(parser.doc)
 
     layouter = Layouter(doc)
-    layouter.layout()
 
     c = canvas.Canvas("out.pdf")
 
-    for page in layouter.pages:
+    for page in layouter.layoutPages():
         painter = pymates.pdfbackend.pdfPainter(page, c)
         page.draw(painter)
         painter.finish()
+        page.release()
         c.showPage()
 
-    c.save()
\ No newline at end of file
+    with profiler.span("save"):
+        c.save()
+
+    if profiler.enabled:
+        stats = pymates.fonts.advanceCacheStats()
+        profiler.count("advance cache hits", stats["hits"])
+        profiler.count("advance cache misses", stats["misses"])
+        profiler.report()
\ No newline at end of file
@@ -1,8 +1,11 @@
 from reportlab.lib import colors
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.pdfmetrics import registerFont
-from reportlab.pdfbase.ttfonts import TTFont
 import pymates.fonts
+import pymates.trace
+from pymates.fontcache import FontMetricsCache, CachedFontMetrics
+
+_trace = pymates.trace.category("pdf")
 
 def pdfInit():
     pass
@@ -11,6 +14,8 @@ def pdfColor(color):
     color.pdfcolor = colors.Color(color.r/255, color.g/255, color.b/255)
 
 def pdfFont(font):
+    if font.registeredFont.file != None:
+        _embedFont(font.registeredFont)
     font.pdffont = pdfmetrics.getFont(font.registeredFont.name)
 
 class pdfFontMetrics:
@@ -24,25 +29,97 @@ class pdfFontMetrics:
             self.descent = -self.font.pdffont.descent * font.size / 1000
         else:
             self.descent = -self.font.pdffont.face.descent * font.size / 1000
-        print(f"Metrics {font.registeredFont.name} {font.size} {self.ascent} {self.descent} {0.2*font.size}")
-        if hasattr(self.font.pdffont, "face") and hasattr(self.font.pdffont.face, "bbox"):
-            print(f"   bbox {list(map(lambda x: x * font.size / 1000, self.font.pdffont.face.bbox))}")
-            print(f"   capH {self.font.pdffont.face.capHeight * font.size / 1000}")
-            print(f"   lineGap {self.font.pdffont.face.lineGap * font.size / 1000}")
-            print(f"   winA {self.font.pdffont.face.winAscent * font.size / 1000}")
-            print(f"   winD {self.font.pdffont.face.winDescent * font.size / 1000}")
+        if _trace.enabled:
+            _trace(f"Metrics {font.registeredFont.name} {font.size} {self.ascent} {self.descent} {0.2*font.size}")
+            if hasattr(self.font.pdffont, "face") and hasattr(self.font.pdffont.face, "bbox"):
+                _trace(f"   bbox {list(map(lambda x: x * font.size / 1000, self.font.pdffont.face.bbox))}")
+                _trace(f"   capH {self.font.pdffont.face.capHeight * font.size / 1000}")
+                _trace(f"   lineGap {self.font.pdffont.face.lineGap * font.size / 1000}")
+                _trace(f"   winA {self.font.pdffont.face.winAscent * font.size / 1000}")
+                _trace(f"   winD {self.font.pdffont.face.winDescent * font.size / 1000}")
         self.leading = 0.2*font.size
 
     def advance(self, txt):
         return self.font.pdffont.stringWidth(txt, self.font.size)
 
+"""
+pdfCachedFontMetrics are the metrics of a TrueType font taken from the font metrics cache.
+The font file is not parsed until a page is drawn with it.
+"""
+class pdfCachedFontMetrics:
+    def __init__(self, font, metrics):
+        self.font = font
+        self.ascent = metrics.ascent * font.size / 1000
+        self.descent = -metrics.descent * font.size / 1000
+        self.leading = metrics.leading * font.size / 1000
+
+    def advance(self, txt):
+        return self.font.glyphAdvances.measure(txt) * 0.001 * self.font.size
+
 def nativeFontMetrics(font):
+    metrics = getattr(font.registeredFont, "pdfmetrics", None)
+    if metrics != None and not hasattr(font, "pdffont"):
+        return pdfCachedFontMetrics(font, metrics)
     if not hasattr(font, "pdffont"):
         pdfFont(font)
     return pdfFontMetrics(font)
 
+# Python codecs of the encodings of the builtin fonts
+_codecs = {"WinAnsiEncoding": "cp1252"}
+
+"""
+glyphAdvances returns the width of each code point of `regfont` as used by stringWidth.
+"""
+def glyphAdvances(regfont):
+    metrics = getattr(regfont, "pdfmetrics", None)
+    if metrics != None:
+        return pymates.fonts.GlyphAdvances(metrics.widths(), metrics.defaultWidth)
+    pdffont = pdfmetrics.getFont(regfont.name)
+    if hasattr(pdffont, "face") and hasattr(pdffont.face, "charWidths"):
+        # TrueType fonts use the default width for all other code points
+        return pymates.fonts.GlyphAdvances(dict(pdffont.face.charWidths), pdffont.face.defaultWidth)
+    codec = _codecs.get(getattr(pdffont, "encName", None))
+    if codec == None:
+        return None
+    widths = {}
+    for b in range(0, 256):
+        try:
+            widths[ord(bytes([b]).decode(codec))] = pdffont.widths[b]
+        except UnicodeDecodeError:
+            pass
+    return pymates.fonts.GlyphAdvances(widths)
+
+_fontCache = None
+
+"""
+loadFont provides the metrics of the TrueType font `regfont` for layout. They are taken from the font metrics cache
+if possible. Otherwise the font is parsed and its metrics are stored in the cache.
+"""
 def loadFont(regfont):
-    registerFont(TTFont(regfont.name, regfont.file))
+    global _fontCache
+    if _fontCache == None:
+        _fontCache = FontMetricsCache()
+    key = _fontCache.key(regfont.file)
+    regfont.pdfmetrics = _fontCache.load(key)
+    if regfont.pdfmetrics != None:
+        return
+    face = _embedFont(regfont).face
+    # The layout uses 20% of the font size as leading, see pdfFontMetrics
+    _fontCache.store(key, CachedFontMetrics(face.ascent, face.descent, 200, face.defaultWidth, face.charWidths.keys(), face.charWidths.values()))
+
+"""
+_embedFont parses the TrueType font `regfont` and registers it with reportlab, unless this has been done already.
+"""
+def _embedFont(regfont):
+    try:
+        return pdfmetrics.getFont(regfont.name)
+    except KeyError:
+        pass
+    # The TrueType support of reportlab is imported only if a document uses a TrueType font
+    from reportlab.pdfbase.ttfonts import TTFont
+    ttfont = TTFont(regfont.name, regfont.file)
+    registerFont(ttfont)
+    return ttfont
 
 class pdfPainter:
     def __init__(self, page, canvas):
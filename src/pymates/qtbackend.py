@@ -1,5 +1,8 @@
 from PySide6.QtGui import QColor, QFont, QFontMetricsF, QPainter, QFontDatabase
 from PySide6.QtCore import QPointF
+import pymates.trace
+
+_trace = pymates.trace.category("qt")
 
 qpaintDevice = None
 xdpi = 72
@@ -60,7 +63,8 @@ class qtFontMetrics:
         self.descent = hPxToPt(self.qmetrics.descent())
         self.leading = hPxToPt(self.qmetrics.leading())
         # print(f"Metrics {qfont.family()} {qfont.pointSize()} {self.ascent} {self.descent} {self.leading}")
-        print(f"ptMetrics {qfont.family()} {qfont.pointSize()} {self.qmetrics.ascent()} {self.qmetrics.descent()} {self.qmetrics.leading()}")
+        if _trace.enabled:
+            _trace(f"ptMetrics {qfont.family()} {qfont.pointSize()} {self.qmetrics.ascent()} {self.qmetrics.descent()} {self.qmetrics.leading()}")
 
     def advance(self, txt):
         return wPxToPt(self.qmetrics.horizontalAdvance(txt, -1))
@@ -1,4 +1,11 @@
+import re
+import io
+import codecs
+from array import array
 from enum import Enum
+import pymates.timing
+
+_profiler = pymates.timing.profiler
 
 class Token(Enum):
     # TokenEOF denotes the end of file.
@@ -67,13 +74,94 @@ class ScannerRange:
         self.fromLinePos = fromLinePos
         self.toOffset = toOffset
 
+# Precompiled patterns which allow the Scanner to consume whole runs of input in one step
+# instead of moving through the source one character at a time.
+_markupChars = frozenset("/>#-123456789:|_*{}\\`$(),")
+_whitespaceRe = re.compile(r"[ \t\r]*")
+_whitespaceNewlineRe = re.compile(r"[ \t\r\n]*")
+_identifierRe = re.compile(r"[a-zA-Z0-9]*")
+# Plain text in the middle of a line. The run stops at every character that might start markup.
+_textRunRe = re.compile(r"[^\\{}`$_*/|:\n]*")
+# As in CommonMark, the number of an ordered list item has at most nine digits.
+# This bounds the lookahead on lines that start with a long run of digits.
+_enumRe = re.compile(r"[0-9]{1,9}\.")
+# The ordered list check in `_scan` accepts a number at the end of the file as well.
+_orderedListRe = re.compile(r"[0-9]{1,9}(?:\.|\Z)")
+# The remaining patterns scan only input which is consumed right after the match.
+# Hence every character is visited a constant number of times and scanning is O(n).
+_spacesTillNewlineRe = re.compile(r"[ \t\r]*(?:\n|\Z)")
+# Code and math bodies. A backslash consumes the following character. If that character is the
+# terminator, the next character is consumed unchecked as well.
+_inlineCodeRe = re.compile(r"(?:[^`\\]+|\\`.?|\\.?)*", re.DOTALL)
+_inlineMathRe = re.compile(r"(?:[^$\\]+|\\\$.?|\\.?)*", re.DOTALL)
+_pythonExpressionRe = re.compile(r'[^(),"]*')
+_pythonParanthesisRe = re.compile(r'[^()"]*')
+_pythonStringRe = re.compile(r'(?:[^"\\]+|\\.?)*"?', re.DOTALL)
+# Matches the leading blanks of every line.
+_lineIndentRe = re.compile(r"^[ \t\r]*", re.MULTILINE)
+# Number of characters the scanner may look ahead of the position it moves to.
+_maxLookahead = 16
+# Chunk size used by TokenStream when rescanning. A rescan usually ends after a few lines.
+_rescanChunkSize = 1 << 12
+
+"""
+_NeedInput is raised when a streaming Scanner reaches the end of the input read so far.
+"""
+class _NeedInput(Exception):
+    pass
+
+"""
+_tokenText returns the text of a token of kind `kind` (a Token value) found at `src[start:end]`.
+"""
+def _tokenText(src, kind, start, end):
+    txt = src[start:end]
+    if kind == _inlineCode:
+        # If "\`" then the "`" is part of the text
+        if '\\' in txt:
+            txt = txt.replace("\\`", "`")
+    elif kind == _inlineMath:
+        if '\\' in txt:
+            txt = txt.replace("\\$", "$")
+    elif kind == _section and start == end:
+        # A paragraph which has been started by plain text
+        txt = "#p"
+    return txt
+
+_inlineCode = Token.InlineCode.value
+_inlineMath = Token.InlineMath.value
+_section = Token.Section.value
+
+# Looking up an Enum member is slow compared to a global, which matters when it is done for each token
+_normal = ScannerMode.Normal
+_newTag = ScannerMode.NewTag
+_definition = ScannerMode.Definition
+_functionArgs = ScannerMode.FunctionArgs
+_normalText = TextMode.Normal
+_table = TextMode.Table
+
 """
 Scanner splits markdown into tokens.
+
+`src` is either a string or a file object (or mmap) holding UTF-8 text.
+A file object is read and decoded in chunks of `chunkSize`. In this case `src`
+holds only the part of the source that is currently scanned and `base` is the offset of
+that part in the source. The offsets of tokens always refer to the complete source.
 """
 class Scanner:
-    def __init__(self, src):
+    def __init__(self, src, chunkSize = 1 << 16):
         # source
-        self.src = src
+        if isinstance(src, str):
+            self.src = src
+            self.input = None
+            self.final = True   # True if `src` holds the end of the source
+        else:
+            self.src = ""
+            self.input = src
+            self.final = False
+            self.chunkSize = chunkSize
+            self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.base = 0           # Offset of `src` in the source
+        self.lineBase = 1       # Line number of the first line in `src`
         self.mode = ScannerMode.NewTag
         self.textMode = TextMode.Normal
 
@@ -85,23 +173,111 @@ class Scanner:
         self.lineOffset = 0 # Start of the current line in `src`.
         self.lineCount = 1  # Line number of the line containing `ch`.
         self.indent = 0     # The indentation level of the last tag
+        self.textStart = 0  # Text of the last token in `src`
+        self.textEnd = 0
+
+        # Offset of the first character and of the first non-blank character of each line.
+        # The index is built once per source such that no line is walked more than once.
+        self.lineStarts = array('i')
+        self.firstNonBlanks = array('i')
+        self.indexLines(0)
+        # The scanner must not move to `limit` or beyond before more input has been read.
+        self.limit = len(self.src) + 1 if self.final else len(self.src) - _maxLookahead
 
         # Errors denotes the lexicographical errors detected while scanning.
         self.errors = []    # List of ScannerErrors
 
         # Beginning of file. Move to the first non-whitespace character
-        self.next()
-        self.skipWhitespace(True)
+        if self.final:
+            self.start()
+        else:
+            self.resume(self.start)
 
         self.peekToken = None
         self.peekText = ""
         self.peekRange = None
 
+    def start(self):
+        self.next()
+        self.skipWhitespace(True)
+
+    """
+    indexLines adds the lines of `src` following `offset` to the line index.
+    """
+    def indexLines(self, offset):
+        if len(self.lineStarts) != 0:
+            # A line starting at `offset` has been indexed already, but its leading blanks may continue
+            if self.firstNonBlanks[-1] == offset:
+                self.firstNonBlanks[-1] = _whitespaceRe.match(self.src, offset).end()
+            offset += 1
+        for m in _lineIndentRe.finditer(self.src, offset):
+            self.lineStarts.append(m.start())
+            self.firstNonBlanks.append(m.end())
+
+    """
+    read appends the next chunk of the input to `src`.
+    The chunk size doubles with the size of `src`, such that a token spanning many chunks
+    is rescanned only a logarithmic number of times.
+    """
+    def read(self):
+        size = max(self.chunkSize, len(self.src))
+        txt = ""
+        while txt == "" and not self.final:
+            data = self.input.read(size)
+            if isinstance(data, str):
+                txt = data
+            else:
+                txt = self.decoder.decode(data, len(data) == 0)
+            if len(data) == 0:
+                self.final = True
+        offset = len(self.src)
+        self.src += txt
+        self.indexLines(offset)
+        if self.final:
+            self.limit = len(self.src) + 1
+        else:
+            self.limit = len(self.src) - _maxLookahead
+
+    """
+    resume calls `func` until it does not run out of input.
+    Each time more input is read and the scanning state is restored.
+    """
+    def resume(self, func):
+        state = (self.ch, self.offset, self.readOffset, self.lineOffset, self.lineCount, self.indent, self.mode, self.textMode, len(self.errors))
+        while True:
+            try:
+                return func()
+            except _NeedInput:
+                self.ch, self.offset, self.readOffset, self.lineOffset, self.lineCount, self.indent, self.mode, self.textMode, errors = state
+                del self.errors[errors:]
+                self.read()
+
+    """
+    discard drops the part of `src` before the current character
+    once it has grown larger than a chunk.
+    """
+    def discard(self):
+        offset = self.offset
+        if offset < self.chunkSize:
+            return
+        self.src = self.src[offset:]
+        self.base += offset
+        self.offset = 0
+        self.readOffset -= offset
+        self.lineOffset -= offset
+        self.limit -= offset
+        line = self.lineCount - self.lineBase
+        self.lineStarts = array('i', [x - offset for x in self.lineStarts[line:]])
+        self.firstNonBlanks = array('i', [x - offset for x in self.firstNonBlanks[line:]])
+        self.lineBase = self.lineCount
+
     """
     Read the next Unicode char into ch.
     self.ch < 0 means end-of-file.
     """
     def next(self):
+        if self.readOffset >= self.limit:
+            raise _NeedInput()
         if self.readOffset < len(self.src):
             self.offset = self.readOffset
             if self.ch == '\n':
@@ -116,6 +292,30 @@ class Scanner:
                 self.lineCount += 1
             self.ch = chr(0) # eof
 
+    """
+    moveTo advances the scanner to `offset` in one step.
+    The result is the same as calling next() until `self.offset` equals `offset`.
+    """
+    def moveTo(self, offset):
+        if offset >= self.limit:
+            raise _NeedInput()
+        src = self.src
+        if offset > len(src):
+            offset = len(src)
+        if offset <= self.offset:
+            return
+        lines = src.count('\n', self.offset, offset)
+        if lines != 0:
+            self.lineCount += lines
+            self.lineOffset = self.lineStarts[self.lineCount - self.lineBase]
+        self.offset = offset
+        if offset < len(src):
+            self.ch = src[offset]
+            self.readOffset = offset + 1
+        else:
+            self.ch = chr(0) # eof
+            self.readOffset = len(src)
+
     # A space following a function name is not a space if followed by an identifier letter, "("" or "{",
     # because without the space the next character would become part of the function call.
     def isFunctionNameDelimiter(self):
@@ -127,94 +327,53 @@ class Scanner:
         return False
 
     def peekString(self, lookahead):
-        if len(self.src) - self.readOffset < len(lookahead):
-            return False
-        return self.src[self.readOffset:self.readOffset+len(lookahead)] == lookahead
+        return self.src.startswith(lookahead, self.readOffset)
 
     def skipWhitespace(self, skipNewline = False):
-        while self.ch == ' ' or self.ch == '\t' or (skipNewline and self.ch == '\n') or self.ch == '\r':
-            self.next()
-
-    def spacesTillNewline(self):
-        for i in range (self.readOffset, len(self.src)):
-            if self.src[i] == '\n':
-                return True
-            if self.src[i] != '\t' and self.src[i] != '\r' and self.src[i] != ' ':
-                return False
-        return True
+        if skipNewline:
+            self.moveTo(_whitespaceNewlineRe.match(self.src, self.offset).end())
+        else:
+            self.moveTo(_whitespaceRe.match(self.src, self.offset).end())
 
     def skipPythonExpression(self):
-        while ord(self.ch) != 0:
-            if self.ch == ')' or self.ch == ',':
-                return
-            if self.ch == '(':
-                self.next()
-                self.skipPythonParanthesis()
-            elif self.ch == '"':
-                self.next()
-                self.skipPythonString()
+        src = self.src
+        offset = self.offset
+        # Nesting level of parentheses. Inside parentheses a ',' does not end the expression.
+        depth = 0
+        while offset < len(src):
+            if depth == 0:
+                offset = _pythonExpressionRe.match(src, offset).end()
             else:
-                self.next()
-
-    def skipPythonParanthesis(self):
-        while ord(self.ch) != 0:
-            if self.ch == ')':
-                self.next()
-                return
-            if self.ch == '(':
-                self.next()
-                self.skipPythonParanthesis()
-            elif self.ch == '"':
-                self.next()
-                self.skipPythonString()
+                offset = _pythonParanthesisRe.match(src, offset).end()
+            if offset == len(src):
+                break
+            ch = src[offset]
+            if ch == '"':
+                offset = _pythonStringRe.match(src, offset + 1).end()
+            elif ch == '(':
+                depth += 1
+                offset += 1
+            elif ch == ')' and depth != 0:
+                depth -= 1
+                offset += 1
             else:
-                self.next()
-
-    def skipPythonString(self):
-        while ord(self.ch) != 0:
-            if self.ch == '"':
-                self.next()
-                return
-            if self.ch == '\\':
-                self.next()
-            self.next()
+                break
+        self.moveTo(offset)
 
     def skipCodeSection(self):
-        i = 0
-        while ord(self.ch) != 0:
-            if self.ch == '`':
-                self.next()
-                i = i + 1
-                if i == 3:
-                    return self.offset - 3
-            else:
-                i = 0
-                self.next()
-        return self.offset
+        end = self.src.find("```", self.offset)
+        if end < 0:
+            self.moveTo(len(self.src))
+            return self.offset
+        self.moveTo(end + 3)
+        return end
 
     """
     isStartOfLine returns true if the current character `self.ch`
     is the first non-space character in the line.
     """
     def isStartOfLine(self):
-        if self.lineOffset == self.offset:
-            return True
-        for i in range(self.lineOffset, self.offset):
-            ch = self.src[i]
-            if ch != ' ' and ch != '\t' and ch != '\r':
-                return False
-        return True
-
-    def isEnum(self):
-        if self.ch < '0' or self.ch > '9':
-            return False
-        # Peak at the next characters
-        for i in range(self.readOffset, len(self.src)):
-            if self.src[i] == '.':
-                return True
-            if self.src[i] < '0' or self.src[i] > '9':
-                return False
-        return False
+        return self.offset <= self.firstNonBlanks[self.lineCount - self.lineBase]
 
     def error(self, line, linepos, offset, text):
         self.errors.append(ScannerError(ScannerRange(offset, line, linepos, offset), text))
@@ -233,89 +392,96 @@ class Scanner:
             t = self.peekToken
             self.peekToken = None
             return self.peekRange, t, self.peekText
-        r = ScannerRange(self.offset, self.lineCount, self.offset - self.lineOffset, self.offset)
-        t, s = self._scan()
-        r.toOffset = self.offset
+        r = ScannerRange(self.base + self.offset, self.lineCount, self.offset - self.lineOffset, self.offset)
+        if self.final:
+            t = self._scan()
+        else:
+            t = self.resume(self._scan)
+        r.toOffset = self.base + self.offset
+        s = _tokenText(self.src, t._value_, self.textStart, self.textEnd)
+        if self.input != None:
+            self.discard()
         return r, t, s
 
-    def _scan(self): # Returns (Token, String)
+    """
+    _scan scans the next token and returns its kind.
+    The text of the token is `src[textStart:textEnd]`, see _tokenText.
+    """
+    def _scan(self): # Returns Token
+        src = self.src
         while ord(self.ch) != 0:
-            if self.ch == '/' and self.peekString('/'): # Comment
-                self.next()
-                self.next()
-                while self.ch != 0 and self.ch != '\n':
-                    self.next()
+            ch = self.ch
+            if ch not in _markupChars:
+                # Plain text. There is nothing to dispatch on
+                pass
+            elif ch == '/' and self.peekString('/'): # Comment
+                end = src.find('\n', self.offset)
+                self.moveTo(len(src) if end < 0 else end)
                 continue
-            elif self.ch == '>' or self.ch == '#':      # Section
-                ch = self.ch
+            elif ch == '>' or ch == '#':      # Section
                 # The '#' and '>' symbols are treated special when it is at the beginning of a line
-                if self.mode == ScannerMode.NewTag:
+                if self.mode == _newTag:
                     self.indent = self.offset - self.lineOffset
-                    self.mode = ScannerMode.Normal
-                    self.textMode = TextMode.Normal
+                    self.mode = _normal
+                    self.textMode = _normalText
                     # Consume all hashes or '>'
                     start = self.offset
-                    self.next()
-                    while self.ch == ch:
-                        self.next()
-                    name = self.src[start:self.offset]
-                    self.mode = ScannerMode.Normal
+                    end = start + 1
+                    while end < len(src) and src[end] == ch:
+                        end += 1
+                    self.moveTo(end)
+                    self.textStart = start
+                    self.textEnd = end
                     self.skipWhitespace(False)
-                    return Token.Section, name
-            elif self.ch == '-':                    # Unordered list
-                if self.mode == ScannerMode.NewTag:
-                    self.mode = ScannerMode.Normal
-                    self.textMode = TextMode.Normal
+                    return Token.Section
+            elif ch == '-':                    # Unordered list
+                if self.mode == _newTag:
+                    self.mode = _normal
+                    self.textMode = _normalText
                     indent = self.offset - self.lineOffset
-                    start = self.offset
+                    self.textStart = self.offset
+                    self.textEnd = self.offset + 1
                     # Skip the '-' character
                     self.next()
-                    txt = self.src[start:self.offset]
-                    self.mode = ScannerMode.Normal
                     self.skipWhitespace(False)
                     self.indent = indent
-                    return Token.UnorderedListSection, txt
-            elif self.ch >= '1' and self.ch <= '9': # Ordered list
-                if self.mode == ScannerMode.NewTag:
+                    return Token.UnorderedListSection
+            elif ch >= '1' and ch <= '9': # Ordered list
+                if self.mode == _newTag:
                     # Peak at the next characters
-                    isEnum = True
-                    for i in range(self.readOffset, len(self.src)):
-                        if self.src[i] == '.':
-                            break
-                        if self.src[i] < '0' or self.src[i] > '9':
-                            isEnum = False
-                            break
-                    if isEnum:
+                    m = _orderedListRe.match(src, self.offset)
+                    if m:
                         indent = self.offset - self.lineOffset
                         start = self.offset
-                        # Skip the number
-                        self.next()
-                        while self.ch >= '0' and self.ch <= '9':
-                            self.next()
-                        # Skip '.'
-                        self.next()
-                        txt = self.src[start:self.offset]
-                        self.mode = ScannerMode.Normal
-                        self.textMode = TextMode.Normal
+                        # Skip the number and the '.'
+                        self.moveTo(m.end())
+                        self.textStart = start
+                        self.textEnd = self.offset
+                        self.mode = _normal
+                        self.textMode = _normalText
                         self.indent = indent
-                        return Token.OrderedListSection, txt
-            elif self.ch == ':':
-                if self.mode == ScannerMode.Definition:
+                        return Token.OrderedListSection
+            elif ch == ':':
+                if self.mode == _definition:
+                    self.textStart = self.offset
+                    self.textEnd = self.offset + 1
                     self.next()
                     self.skipWhitespace(True)
-                    self.textMode = TextMode.Normal
-                    self.mode = ScannerMode.Normal
-                    return Token.DefinitionSection, ":"
-            elif self.ch == '|':
+                    self.textMode = _normalText
+                    self.mode = _normal
+                    return Token.DefinitionSection
+            elif ch == '|':
                 # Table mode or start of a new table?
-                if self.mode == ScannerMode.Normal and (self.textMode == TextMode.Table or self.isStartOfLine()):
-                    self.textMode = TextMode.Table
+                if self.mode == _normal and (self.textMode == _table or self.isStartOfLine()):
+                    self.textMode = _table
                     start = self.offset
                     # Skip all following `|` characters (required for multi-column cells)
-                    self.next()
-                    while self.ch == '|':
-                        self.next()
-                    end = self.offset
+                    end = start + 1
+                    while end < len(src) and src[end] == '|':
+                        end += 1
+                    self.moveTo(end)
+                    self.textStart = start
+                    self.textEnd = end
                     self.skipWhitespace(False)
                     # | followed by newline is the end of a row
                     if self.ch == '\n':
@@ -323,170 +489,372 @@ class Scanner:
                         self.skipWhitespace(False)
                         # An empty line terminates the table
                         if self.ch == '\n':
-                            self.textMode = TextMode.Normal
+                            self.textMode = _normalText
                             self.skipWhitespace(True)
-                            self.mode = ScannerMode.NewTag
-                        return Token.TableRow, self.src[start:end]
-                    return Token.TableCell, self.src[start:end]
-            elif self.ch == '_':
-                if self.mode == ScannerMode.Normal:
+                            self.mode = _newTag
+                        return Token.TableRow
+                    return Token.TableCell
+            elif ch == '_':
+                if self.mode == _normal:
+                    self.textStart = self.offset
+                    self.textEnd = self.offset + 1
                     self.next()
-                    return Token.Style, "_"
-            elif self.ch == '*':
-                if self.mode == ScannerMode.Normal:
+                    return Token.Style
+            elif ch == '*':
+                if self.mode == _normal:
+                    self.textStart = self.offset
+                    self.textEnd = self.offset + 1
                     self.next()
-                    return Token.Style, "*"
-            elif self.ch == '{':
-                if self.mode == ScannerMode.Normal:
+                    return Token.Style
+            elif ch == '{':
+                if self.mode == _normal:
+                    self.textStart = self.offset
+                    self.textEnd = self.offset + 1
                     self.next()
-                    return Token.BracketOpen, "{"
-            elif self.ch == '}':
-                if self.mode == ScannerMode.Normal:
+                    return Token.BracketOpen
+            elif ch == '}':
+                if self.mode == _normal:
+                    self.textStart = self.offset
+                    self.textEnd = self.offset + 1
                     self.next()
-                    return Token.BracketClose, "}"
-            elif self.ch == '\\':
+                    return Token.BracketClose
+            elif ch == '\\':
                 # Skip the backslash
                 self.next()
                 start = self.offset
                 # Skip the identifier
-                while (self.ch >= 'a' and self.ch <= 'z') or (self.ch >= 'A' and self.ch <= 'Z') or (self.ch >= '0' and self.ch <= '9'):
-                    self.next()
+                end = _identifierRe.match(src, start).end()
                 # There is an identifier?
-                if start < self.offset:
+                if start < end:
                     # A function call
-                    name = self.src[start:self.offset]
+                    self.moveTo(end)
+                    self.textStart = start
+                    self.textEnd = end
                     mode = self.mode
                     if self.ch == '(':
-                        self.mode = ScannerMode.FunctionArgs
+                        self.mode = _functionArgs
                     elif self.ch == '\n' or self.ch == '\t' or self.ch == '\r' or self.ch == ' ':
                         if self.isFunctionNameDelimiter():
                             self.next()
                         # else:
                         #    self.skipWhitespace(False)
-                        self.mode = ScannerMode.Normal
-                    elif self.ch == '{' or self.ch == '\\' or self.ch == '_' or selr.ch == '*':
-                        self.mode = ScannerMode.Normal
+                        self.mode = _normal
+                    elif self.ch == '{' or self.ch == '\\' or self.ch == '_' or self.ch == '*':
+                        self.mode = _normal
                     else:
-                        self.error(self.lineCount, self.lineOffset, self.offset, f"Unexpected character '{self.ch}'")
-                        self.mode = ScannerMode.Normal
-                    if mode == ScannerMode.NewTag:
-                        return Token.FunctionSection, name
-                    return Token.Function, name
-            elif self.ch == '`':
-                if self.mode == ScannerMode.Normal:
+                        self.error(self.lineCount, self.base + self.lineOffset, self.base + self.offset, f"Unexpected character '{self.ch}'")
+                        self.mode = _normal
+                    if mode == _newTag:
+                        return Token.FunctionSection
+                    return Token.Function
+            elif ch == '`':
+                if self.mode == _normal:
                     self.next()
-                    start = self.offset
-                    txt = ""
                     # Code mode is terminated by a backtick. A newline does not terminate code mode.
-                    while self.ch != '`' and ord(self.ch) != 0:
-                        # If "\`" then the "`" is part of the text.
-                        # Otherwise, do not treat "\" special
-                        if self.ch == '\\':
-                            self.next()
-                            if self.ch == '`':
-                                txt += self.src[start : self.offset-1]
-                                start = self.offset
-                                self.next()
-                        self.next()
-                    txt += self.src[start:self.offset]
+                    # If "\`" then the "`" is part of the text. Otherwise, do not treat "\" special.
+                    start = self.offset
+                    end = _inlineCodeRe.match(src, start).end()
+                    self.textStart = start
+                    self.textEnd = end
+                    self.moveTo(end)
                     if self.ch == '`':
                         self.next()
-                    return Token.InlineCode, txt
-                elif self.mode == ScannerMode.NewTag and self.peekString("``"):
-                    self.next()
-                    self.next()
-                    self.next()
+                    return Token.InlineCode
+                elif self.mode == _newTag and self.peekString("``"):
+                    self.moveTo(self.offset + 3)
                     start = self.offset
                     end = self.skipCodeSection()
+                    self.textStart = start
+                    self.textEnd = end
                     self.skipWhitespace(True)
-                    return Token.CodeSection, self.src[start:end]
-            elif self.ch == '$':
-                if self.mode == ScannerMode.Normal:
+                    return Token.CodeSection
+            elif ch == '$':
+                if self.mode == _normal:
                     self.next()
-                    start = self.offset
-                    txt = ""
                     # Math mode can only be terminated by "$". A newline does not terminate math mode.
-                    while self.ch != '$' and ord(self.ch) != 0:
-                        # If "\$" then the $ is part of the text.
-                        # Otherwise, do not treat "\" special
-                        if self.ch == '\\':
-                            self.next()
-                            if self.ch == '$':
-                                txt += self.src[start : self.offset-1]
-                                start = self.offset
-                                self.next()
-                        self.next()
-                    txt += self.src[start:self.offset]
+                    # If "\$" then the $ is part of the text. Otherwise, do not treat "\" special.
+                    start = self.offset
+                    end = _inlineMathRe.match(src, start).end()
+                    self.textStart = start
+                    self.textEnd = end
+                    self.moveTo(end)
                     if self.ch == '$':
                         self.next()
-                    return Token.InlineMath, txt
-                elif self.mode == ScannerMode.NewTag and self.peekString("$"):
-                    self.next()
-                    self.next()
-                    self.mode = ScannerMode.Normal
-                    return Token.MathSection, "$$"
-            elif self.ch == '(' or self.ch == ',':
-                if self.mode == ScannerMode.FunctionArgs:
+                    return Token.InlineMath
+                elif self.mode == _newTag and self.peekString("$"):
+                    self.textStart = self.offset
+                    self.textEnd = self.offset + 2
+                    self.moveTo(self.offset + 2)
+                    self.mode = _normal
+                    return Token.MathSection
+            elif ch == '(' or ch == ',':
+                if self.mode == _functionArgs:
                     self.next()
                     start = self.offset
                     self.skipPythonExpression()
-                    return Token.FunctionArg, self.src[start:self.offset]
-            elif self.ch == ')':
-                if self.mode == ScannerMode.FunctionArgs:
+                    self.textStart = start
+                    self.textEnd = self.offset
+                    return Token.FunctionArg
+            elif ch == ')':
+                if self.mode == _functionArgs:
                     self.next()
-                    self.mode = ScannerMode.Normal
+                    self.mode = _normal
 
-            if self.mode == ScannerMode.NewTag:
+            if self.mode == _newTag:
                 # A new tag is required. Since no other markup could be found, we assume it to be a paragraph
-                self.mode = ScannerMode.Normal
+                self.mode = _normal
                 self.indent = self.offset - self.lineOffset
-                return Token.Section, "#p"
+                # The text of the paragraph tag is empty, see _tokenText
+                self.textStart = self.offset
+                self.textEnd = self.offset
+                return Token.Section
             # Scan normal text
             start = self.offset
-            end = self.offset
-            while ord(self.ch) != 0:
+            end = self._scanText()
+            if start == end:
+                continue
+            self.textStart = start
+            self.textEnd = end
+            return Token.Text
+        self.textStart = self.offset
+        self.textEnd = self.offset
+        return Token.EoF
+
+    """
+    _scanText consumes plain text starting at the current character
+    and returns the offset at which the text ends.
+    Whole runs of characters which cannot start markup are consumed in one step.
+    The scanner is left at the character that terminated the text.
+    """
+    def _scanText(self):
+        src = self.src
+        offset = self.offset
+        end = offset
+        limit = self.limit
+        isTable = self.textMode == _table
+        startOfLine = self.isStartOfLine()
+        while offset < len(src):
+            if offset >= limit:
+                raise _NeedInput()
+            ch = src[offset]
+            if startOfLine:
+                if ch == ' ' or ch == '\t' or ch == '\r':
+                    offset = _whitespaceRe.match(src, offset).end()
+                    end = offset
+                    continue
+                startOfLine = False
                 # New section?
-                if (self.ch == '#' or self.ch == '|' or self.ch == '-' or self.ch == '>' or self.isEnum()) and self.isStartOfLine():
-                    self.mode = ScannerMode.NewTag
+                if ch == '#' or ch == '|' or ch == '-' or ch == '>' or (ch >= '1' and ch <= '9' and _enumRe.match(src, offset)):
+                    self.mode = _newTag
                     break
-                if self.ch == '`' and self.peekString("``") and self.isStartOfLine():
-                    self.mode = ScannerMode.NewTag
+                if ch == '`' and src.startswith("``", offset + 1):
+                    self.mode = _newTag
                     break
-                if self.ch == '$' and self.peekString("$") and self.isStartOfLine():
-                    self.mode = ScannerMode.NewTag
+                if ch == '$' and src.startswith("$", offset + 1):
+                    self.mode = _newTag
                     break
-                # Text markup?
-                if self.ch == '\\' or self.ch == '{' or self.ch == '}' or self.ch == '~' or self.ch == '`' or self.ch == '$' or self.ch == '_' or self.ch == '*':
-                    break
-                # Comment?
-                if self.ch == '/' and self.peekString("/"):
-                    break
-                # New table cell?
-                if self.textMode == TextMode.Table and self.ch == '|':
-                    break
-                # A definition?
-                if self.ch == ':' and self.spacesTillNewline():
+            # Text markup?
+            if ch == '\\' or ch == '{' or ch == '}' or ch == '`' or ch == '$' or ch == '_' or ch == '*':
+                break
+            # Comment?
+            if ch == '/' and src.startswith("/", offset + 1):
+                break
+            # New table cell?
+            if ch == '|' and isTable:
+                break
+            # A definition?
+            if ch == ':':
+                m = _spacesTillNewlineRe.match(src, offset + 1)
+                if m:
+                    if m.end() >= limit:
+                        raise _NeedInput()
                     # Return the text scanned until here
-                    self.mode = ScannerMode.Definition
+                    self.mode = _definition
                     break
-                if self.ch == '\\':
+            # Break upon an empty line
+            if ch == '\n':
+                lineStart = _whitespaceNewlineRe.match(src, offset + 1).end()
+                if src.find('\n', offset + 1, lineStart) >= 0:
+                    offset = lineStart
+                    self.mode = _newTag
                     break
-                # Break upon an empty line
-                if self.ch == '\n':
-                    self.next()
-                    l = self.lineCount
-                    self.skipWhitespace(True)
-                    if self.lineCount > l:
-                        self.mode = ScannerMode.NewTag
-                        break
-                else:
-                    self.next()
-                    end = self.offset
-            if start == end:
+                offset = lineStart
+                startOfLine = True
                 continue
-            result = self.src[start:end]
-            return Token.Text, result
-        return Token.EoF, ""
+            offset = _textRunRe.match(src, offset + 1).end()
+            end = offset
+        self.moveTo(offset)
+        return end
+
+"""
+Tokens holds all tokens of a source in parallel arrays of integers.
+The kind of a token is the value of its Token. The text of a token is built from its offsets
+only when it is requested. Thus no objects are allocated per token while scanning.
+"""
+class Tokens:
+    def __init__(self, src):
+        self.src = src
+        self.kinds = array('i')
+        # Range of each token (see ScannerRange)
+        self.starts = array('i')
+        self.ends = array('i')
+        self.lines = array('i')
+        self.columns = array('i')
+        # Text of each token in `src`
+        self.textStarts = array('i')
+        self.textEnds = array('i')
+        # Indentation level of the last tag after each token
+        self.indents = array('i')
+        with _profiler.span("scan"):
+            scanner = Scanner(src)
+            kinds = self.kinds.append
+            starts = self.starts.append
+            ends = self.ends.append
+            lines = self.lines.append
+            columns = self.columns.append
+            textStarts = self.textStarts.append
+            textEnds = self.textEnds.append
+            indents = self.indents.append
+            while True:
+                offset = scanner.offset
+                starts(offset)
+                lines(scanner.lineCount)
+                columns(offset - scanner.lineOffset)
+                t = scanner._scan()
+                kinds(t._value_)
+                ends(scanner.offset)
+                textStarts(scanner.textStart)
+                textEnds(scanner.textEnd)
+                indents(scanner.indent)
+                if t == Token.EoF:
+                    break
+        if _profiler.enabled:
+            _profiler.count("tokens", len(self.kinds))
+        self.errors = scanner.errors
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def text(self, i):
+        return _tokenText(self.src, self.kinds[i], self.textStarts[i], self.textEnds[i])
+
+    def range(self, i):
+        return ScannerRange(self.starts[i], self.lines[i], self.columns[i], self.ends[i])
+
+"""
+TokenStream holds the tokens of a source and updates them incrementally when the source is edited.
+
+After an edit, scanning restarts at the last token before the edit which has been scanned
+in ScannerMode.NewTag, i.e. at the start of a section. It stops as soon as the scanner reaches
+a token of the old stream in the same state. All tokens from there on are reused.
+"""
+class TokenStream:
+    def __init__(self, src):
+        self.src = src
+        # List of (ScannerRange, Token, string) as returned by Scanner.scan()
+        self.tokens = []
+        # The scanner mode, text mode and indent before each token was scanned
+        self.states = []
+        scanner = Scanner(src)
+        while True:
+            self.states.append((scanner.mode, scanner.textMode, scanner.indent))
+            r, t, s = scanner.scan()
+            self.tokens.append((r, t, s))
+            if t == Token.EoF:
+                break
+
+    """
+    edit replaces `deleted` characters at `offset` with the string `inserted` and rescans the affected tokens.
+    It returns a tuple (first, oldEnd, newEnd) denoting that the tokens `first` to `oldEnd` (exclusive)
+    of the old stream have been replaced by the tokens `first` to `newEnd` (exclusive).
+    The ranges of all following tokens are moved by the length of the edit.
+    """
+    def edit(self, offset, deleted, inserted):
+        old = self.tokens
+        src = self.src[:offset] + inserted + self.src[offset + deleted:]
+        delta = len(inserted) - deleted
+        lineDelta = inserted.count('\n') - self.src.count('\n', offset, offset + deleted)
+        # End of the edit in the new source
+        end = offset + len(inserted)
+        first = self.resyncPoint(offset)
+        if first < 0:
+            first = 0
+            scanner = Scanner(io.StringIO(src), _rescanChunkSize)
+        else:
+            scanner = self.scannerAt(src, first)
+        tokens = []
+        states = []
+        # Old tokens before `last` start before the current position of the scanner
+        last = first
+        while True:
+            state = (scanner.mode, scanner.textMode, scanner.indent)
+            pos = scanner.base + scanner.offset
+            # Once the newline starting the current line follows the edit, the scanner behaves as it did
+            # on the old source if it is in the same state at the same position.
+            # Several tokens may start at the same position.
+            if scanner.base + scanner.lineOffset > end:
+                while last < len(old) and old[last][0].fromOffset + delta < pos:
+                    last += 1
+                i = last
+                while i < len(old) and old[i][0].fromOffset + delta == pos and self.states[i] != state:
+                    i += 1
+                if i < len(old) and old[i][0].fromOffset + delta == pos:
+                    last = i
+                    break
+            r, t, s = scanner.scan()
+            tokens.append((r, t, s))
+            states.append(state)
+            if t == Token.EoF:
+                last = len(old)
+                break
+        if delta != 0 or lineDelta != 0:
+            for i in range(last, len(old)):
+                r = old[i][0]
+                r.fromOffset += delta
+                r.toOffset += delta
+                r.fromLine += lineDelta
+        self.tokens[first:last] = tokens
+        self.states[first:last] = states
+        self.src = src
+        return first, last, first + len(tokens)
+
+    """
+    resyncPoint returns the index of the last token which has been scanned in ScannerMode.NewTag
+    and which is not affected by an edit at `offset`, or -1 if there is no such token.
+    """
+    def resyncPoint(self, offset):
+        # The scanner looks ahead of its position. Hence the token must start before the edit by this margin
+        offset -= _maxLookahead
+        lo = 0
+        hi = len(self.tokens)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.tokens[mid][0].fromOffset <= offset:
+                lo = mid + 1
+            else:
+                hi = mid
+        i = lo - 1
+        while i >= 0 and self.states[i][0] != ScannerMode.NewTag:
+            i -= 1
+        return i
+
+    """
+    scannerAt returns a scanner for `src` which is in the state in which the token at `index` has been scanned.
+    The scanner reads `src` in chunks, such that only the rescanned part of the source is indexed.
+    """
+    def scannerAt(self, src, index):
+        r = self.tokens[index][0]
+        scanner = Scanner(io.StringIO(src[r.fromOffset:]), _rescanChunkSize)
+        scanner.base = r.fromOffset
+        scanner.lineBase = r.fromLine
+        scanner.lineCount = r.fromLine
+        # The current line starts before `src` has been cut
+        lineStart = r.fromOffset - r.fromLinePos
+        scanner.lineOffset = -r.fromLinePos
+        scanner.lineStarts[0] = -r.fromLinePos
+        scanner.firstNonBlanks[0] = _whitespaceRe.match(src, lineStart, r.fromOffset).end() - r.fromOffset
+        scanner.mode, scanner.textMode, scanner.indent = self.states[index]
+        return scanner
 
 if __name__ == '__main__':
     scanner = Scanner("""
@@ -0,0 +1,196 @@
+import sys
+import json
+import time
+
+"""
+timing measures where the time goes when a document is processed.
+The stages of the pipeline, e.g. parsing, evaluation and layout, record nested spans, and they count
+tokens, nodes, text items and runs, lines and pages. The result can be written in the Chrome trace event format,
+which is shown by chrome://tracing or https://ui.perfetto.dev, or as a summary table.
+
+Recording is disabled by default. Then a span costs a method call, and counting is skipped at the call site:
+
+    _profiler = pymates.timing.profiler
+    ...
+    with _profiler.span("layout"):
+        ...
+    if _profiler.enabled:
+        _profiler.count("lines")
+
+pdf.py enables it with the option --profile or --profile=trace.json.
+"""
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        # Path of the Chrome trace written by report, or None
+        self.outputPath = None
+        self.clear()
+
+    """
+    clear removes all recorded spans and counters.
+    """
+    def clear(self):
+        # Completed spans as tuples (name, category, start, end, duration, selfDuration, args) in nanoseconds.
+        # `duration` is shorter than `end - start` if the span has been suspended.
+        self.spans = []
+        # Open spans as lists [name, category, args, start, duration of completed children, time suspended]
+        self.open = []
+        self.counters = {}
+        self.origin = time.perf_counter_ns()
+
+    def enable(self, enabled = True):
+        self.enabled = enabled
+
+    """
+    begin opens a span. Spans are closed by `end` in reverse order.
+    `args` is a dict which is shown with the span in the trace.
+    """
+    def begin(self, name, category = "stage", args = None):
+        if self.enabled:
+            self.open.append([name, category, args, time.perf_counter_ns(), 0, 0])
+
+    def end(self):
+        if len(self.open) == 0:
+            return
+        now = time.perf_counter_ns()
+        name, category, args, start, children, suspended = self.open.pop()
+        duration = now - start - suspended
+        if len(self.open) != 0:
+            self.open[-1][4] += duration
+        self.spans.append((name, category, start, now, duration, duration - children, args))
+
+    """
+    suspend takes the `count` innermost open spans off the stack and returns them, e.g. before a generator yields.
+    resume puts them back on top of the spans which are open then. A suspended span is still recorded once,
+    when it is ended, and the time in which it was suspended is not charged to it.
+    """
+    def suspend(self, count):
+        if not self.enabled or count == 0:
+            return None
+        now = time.perf_counter_ns()
+        spans = self.open[-count:]
+        del self.open[-count:]
+        for span in spans:
+            span[5] -= now
+        return spans
+
+    def resume(self, spans):
+        if spans == None:
+            return
+        now = time.perf_counter_ns()
+        for span in spans:
+            span[5] += now
+        self.open.extend(spans)
+
+    """
+    span returns a context manager which opens a span on enter and closes it on exit.
+    """
+    def span(self, name, category = "stage", args = None):
+        if not self.enabled:
+            return _noSpan
+        return _Span(self, name, category, args)
+
+    """
+    count adds `n` to the counter `name`.
+    """
+    def count(self, name, n = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    """
+    chromeTrace returns the spans and counters as a dict in the Chrome trace event format.
+    """
+    def chromeTrace(self):
+        events = []
+        end = self.origin
+        for name, category, start, stop, duration, selfDuration, args in self.spans:
+            event = {"name": name, "cat": category, "ph": "X", "pid": 1, "tid": 1,
+                "ts": (start - self.origin) / 1000, "dur": (stop - start) / 1000}
+            if stop - start != duration:
+                # A suspended span covers the work done in between. Its own time is given as an argument
+                args = dict(args or {}, active_ms = duration / 1e6)
+            if args != None:
+                event["args"] = args
+            events.append(event)
+            end = max(end, stop)
+        for name, value in self.counters.items():
+            events.append({"name": name, "ph": "C", "pid": 1, "tid": 1, "ts": (end - self.origin) / 1000, "args": {name: value}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def writeChromeTrace(self, path):
+        with open(path, "w") as file:
+            json.dump(self.chromeTrace(), file)
+
+    """
+    summary returns a table of the time spent in the spans of each name, and of the counters.
+    """
+    def summary(self):
+        rows = {}
+        for name, category, start, stop, duration, selfDuration, args in self.spans:
+            row = rows.get(name)
+            if row == None:
+                row = [0, 0, 0, 0]
+                rows[name] = row
+            row[0] += 1
+            row[1] += duration
+            row[2] += selfDuration
+            row[3] = max(row[3], duration)
+        lines = [f"{'span':<24} {'calls':>8} {'total ms':>10} {'self ms':>10} {'mean ms':>10} {'max ms':>10}"]
+        for name, (calls, total, selfTotal, maximum) in sorted(rows.items(), key = lambda item: -item[1][1]):
+            lines.append(f"{name:<24} {calls:>8} {total / 1e6:>10.2f} {selfTotal / 1e6:>10.2f} {total / calls / 1e6:>10.3f} {maximum / 1e6:>10.2f}")
+        if len(self.counters) != 0:
+            lines.append("")
+            lines.append(f"{'counter':<24} {'value':>8}")
+            for name, value in self.counters.items():
+                lines.append(f"{name:<24} {value:>8}")
+        return "\n".join(lines)
+
+    """
+    report writes the Chrome trace to `outputPath`, if it is set, and the summary to `file`.
+    """
+    def report(self, file = None):
+        if self.outputPath != None:
+            self.writeChromeTrace(self.outputPath)
+        print(self.summary(), file = file if file != None else sys.stderr)
+
+class _Span:
+    def __init__(self, profiler, name, category, args):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.profiler.begin(self.name, self.category, self.args)
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.profiler.end()
+        return False
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        return False
+
+_noSpan = _NoSpan()
+
+# The profiler used by all stages
+profiler = Profiler()
+
+"""
+configureFromArguments enables the profiler if `args` contain the option `--profile` or `--profile=path`
+and returns the remaining arguments. With a path, report writes a Chrome trace to it.
+"""
+def configureFromArguments(args):
+    remaining = []
+    for arg in args:
+        if arg == "--profile":
+            profiler.enable()
+        elif arg.startswith("--profile="):
+            profiler.enable()
+            profiler.outputPath = arg[len("--profile="):]
+        else:
+            remaining.append(arg)
+    return remaining
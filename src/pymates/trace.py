@@ -0,0 +1,93 @@
+import os
+import sys
+
+"""
+The trace facility writes diagnostic messages of the subsystems of pymates, e.g. of the parser or the layout.
+Each subsystem has a Category which is enabled or disabled as a whole.
+A disabled category costs one attribute lookup per call site, because messages are only formatted
+if their category is enabled:
+
+    _trace = pymates.trace.category("layout")
+    ...
+    if _trace.enabled:
+        _trace(f"Page {n}")
+
+Categories are enabled by the environment variable PYMATES_TRACE or by the option --trace of pdf.py and viewer.py.
+Both take a comma separated list of category names. "all" enables all categories and "none" disables them.
+A name prefixed with "-" disables the category. Only warnings are enabled by default.
+"""
+
+# All categories by name
+_categories = {}
+# Categories which have been enabled or disabled explicitly
+_settings = {"warning": True}
+# Applies to all other categories
+_default = False
+# Messages are written to this file. None is sys.stderr
+_output = None
+
+class Category:
+    def __init__(self, name):
+        self.name = name
+        self.enabled = _settings.get(name, _default)
+
+    """
+    Writes a message. Like print, the arguments are separated by blanks.
+    """
+    def __call__(self, *args):
+        file = _output if _output != None else sys.stderr
+        print(f"[{self.name}]", *args, file = file)
+
+"""
+category returns the Category named `name`. It is created on the first call.
+"""
+def category(name):
+    c = _categories.get(name)
+    if c == None:
+        c = Category(name)
+        _categories[name] = c
+    return c
+
+"""
+configure enables and disables categories. `spec` is a comma separated list as described above.
+The settings of earlier calls remain unless they are overridden by `spec`.
+"""
+def configure(spec):
+    global _default
+    for name in spec.split(","):
+        name = name.strip()
+        if name == "":
+            continue
+        if name == "all" or name == "none":
+            _default = name == "all"
+            _settings.clear()
+        elif name.startswith("-"):
+            _settings[name[1:]] = False
+        else:
+            _settings[name] = True
+    for c in _categories.values():
+        c.enabled = _settings.get(c.name, _default)
+
+"""
+configureFromArguments configures the categories named by the options `--trace=spec` in `args`
+and returns the remaining arguments.
+"""
+def configureFromArguments(args):
+    remaining = []
+    for arg in args:
+        if arg.startswith("--trace="):
+            configure(arg[len("--trace="):])
+        elif arg == "--trace":
+            configure("all")
+        else:
+            remaining.append(arg)
+    return remaining
+
+"""
+setOutput makes the trace write to `file` instead of sys.stderr.
+"""
+def setOutput(file):
+    global _output
+    _output = file
+
+configure(os.environ.get("PYMATES_TRACE", ""))
@@ -1,120 +1,218 @@
-from pymates.dom import Node, StyleNode, ParagNode, DocumentNode, FunctionNode, FunctionNodeMode, mergeStyle
+from pymates.dom import Node, StyleNode, ParagNode, DocumentNode, FunctionNode, FunctionNodeMode, mergeStyle, structureChanged
+from pymates.visitor import Dispatcher
+from pymates import PymatesError
+import pymates.trace
+import pymates.timing
 
+_trace = pymates.trace.category("treeify")
+_profiler = pymates.timing.profiler
+
+"""
+TreeifyError is raised if a section cannot be placed in the tree, because no open section can contain it.
+"""
+class TreeifyError(PymatesError):
+    pass
+
+"""
+treeify turns the sequence of sections and inline nodes in the children of `doc` into a tree.
+A section becomes a child of the preceding section with a smaller indentation, or of a container it requires.
+Inline nodes become children of the preceding section.
+
+Each node is visited once, from left to right. The children of a node are not modified while they are visited,
+but collected in a new list which replaces them at the end. When a section has been placed, its own children
+are treeified before the next node is visited. The nodes in progress are kept on a stack instead of the Python call stack.
+"""
 def treeify(doc):
-    print("====================== TREE ================")
-    treeifyChildren(doc)
+    if _trace.enabled:
+        _trace("====================== TREE ================")
+    with _profiler.span("treeify"):
+        frames = [_Frame(doc)]
+        while len(frames) != 0:
+            frame = frames[-1]
+            if frame.i == len(frame.nodes):
+                frame.finish()
+                frames.pop()
+                continue
+            newNode = frame.visit(frame.nodes[frame.i])
+            frame.i += 1
+            if newNode != None:
+                frames.append(_Frame(newNode))
+        # Parents have been assigned directly, hence the documents and sections cached by the nodes are outdated
+        structureChanged()
 
-def treeifyChildren(parent):
-    if parent.children == None:
-        return
-    i = 0
-    section = parent
-    doNotInline = False
-    hasText = False
-    while i < len(parent.children):
-        node = parent.children[i]
-        print(f"node {i} {node.func if isinstance(node, Node) else '>' + node + '<'}")
-        # Style nodes, strings and inline functions become children of the current section.
-        if not doNotInline and (isinstance(node, (str, StyleNode)) or (isinstance(node, FunctionNode) and node.mode == FunctionNodeMode.Inline)):
-            # TODO: Check that no ParagNodes became children of a StyleNode
-            if isinstance(node, str) and node != "":
-                hasText = True
-            if isinstance(node, StyleNode) and not hasText:
-                # Style nodes following a ParagNode and not preceeded by text are removed and their
-                # style is merged with the ParagNode´s style.
-                section.style = mergeStyle(section.style, node.style)
-                parent.children.pop(i)
-            elif section == parent:
-                # The node is a child of ´section´ already.
-                i += 1
-            else:
-                # Make `node`a parent of `section`.
-                parent.children.pop(i)
-                section.append(node)
-        elif isinstance(node, ParagNode) or (isinstance(node, FunctionNode) and node.mode == FunctionNodeMode.Section):
-            if node.indent == -1:
-                node.indent = parent.indent
-            if node.indent > section.indent:
-                i, newNode = _makeChild(section, i, section, node)
-            elif node.indent <= section.indent:
-                p = section
-                while p != parent:
-                    if node.indent >= p.indent:
-                        break
-                    p = p.parent
-                print(f"_makeChild {node.func} {i} of {node.parent.func}")
-                i, newNode = _makeChild(parent, i, p, node)
-                print(f"    returns {i}")
-            else:
-                i += 1
-            # treeifyChildren(node)
-            treeify(newNode)
-            section = node
-            doNotInline = False
-            hasText = False
-        elif isinstance(node, FunctionNode) and node.mode == FunctionNodeMode.SectionOrInline:
-            i += 1
-            doNotInline = True
+"""
+_Frame treeifies the children of `parent`.
+"""
+class _Frame:
+    def __init__(self, parent):
+        self.parent = parent
+        self.nodes = parent.children if parent.children != None else []
+        self.i = 0
+        # The nodes which remain children of `parent`
+        self.children = []
+        # The indentation stack. It holds the open sections, starting at `parent`.
+        # Each node is the parent of the following one. The last one is the current section.
+        self.sections = [parent]
+        self.doNotInline = False
+        self.hasText = False
+
+    """
+    visit moves the child `node` of `parent` to its place in the tree.
+    If `node` is a section, visit returns the node which has been placed, i.e. `node` or a container created for it.
+    The node is handled by the method registered with `_dispatcher` for its class, see the end of this module.
+    """
+    def visit(self, node):
+        if _trace.enabled:
+            _trace(f"node {self.i} {node.func if isinstance(node, Node) else '>' + node + '<'}")
+        return (_handlers.get(type(node)) or _dispatcher.handler(node))(self, node)
+
+    """
+    visitInline handles style nodes, strings and inline functions, which become children of the current section.
+    """
+    def visitInline(self, node):
+        if self.doNotInline:
+            self.children.append(node)
+            return None
+        section = self.sections[-1]
+        # TODO: Check that no ParagNodes became children of a StyleNode
+        if isinstance(node, str):
+            if node != "":
+                self.hasText = True
+        elif isinstance(node, StyleNode) and not self.hasText:
+            # Style nodes following a ParagNode and not preceeded by text are removed and their
+            # style is merged with the ParagNode´s style.
+            section.style = mergeStyle(section.style, node.style)
+            node.parent = None
+            return None
+        if section == self.parent:
+            # The node is a child of ´section´ already.
+            self.children.append(node)
         else:
-            i += 1
+            # Make `node`a child of `section`.
+            section.append(node)
+        return None
 
-def _makeChild(rootParent, index, parent, child):
-    prevParent = child.parent
-    childChain = _createIntermediatParents(child)
-    if isinstance(childChain, DocumentNode):
-        print(f"       doc anchor {prevParent} {rootParent}")
-        # The `child` cannot be added to the closes container.
-        indirectParent = child.parent
+    """
+    visitSection places a section, which becomes the current section.
+    """
+    def visitSection(self, node):
+        if node.indent == -1:
+            node.indent = self.parent.indent
+        top = len(self.sections) - 1
+        if node.indent > self.sections[-1].indent:
+            # Only the current section can be the parent
+            newNode = self.place(node, top, top)
+        else:
+            # Close the sections which are indented more than `node`
+            while top > 0 and node.indent < self.sections[top].indent:
+                top -= 1
+            newNode = self.place(node, top, 0)
+        self.doNotInline = False
+        self.hasText = False
+        return newNode
+
+    def visitFunction(self, node):
+        if node.mode == FunctionNodeMode.Inline:
+            return self.visitInline(node)
+        if node.mode == FunctionNodeMode.Section:
+            return self.visitSection(node)
+        # The nodes following a function which can be a section or inline are not inlined
+        self.doNotInline = True
+        self.children.append(node)
+        return None
+
+    """
+    visitOther keeps all other nodes as children of `parent`.
+    """
+    def visitOther(self, node):
+        self.children.append(node)
+        return None
+
+    """
+    place makes the section `child` a child of one of the open sections `sections[top]` down to `sections[bottom]`,
+    the first one which can contain it. If `child` requires a container, e.g. a list item,
+    the container is created, unless it is open already.
+    place returns the node which has been added to the open section.
+    """
+    def place(self, child, top, bottom):
+        sections = self.sections
+        prevParent = child.parent
+        childChain = _createIntermediatParents(child)
+        if isinstance(childChain, DocumentNode):
+            # The `child` cannot be added to the closest container.
+            # Search the open sections for a node type that appears in the childChain.
+            # It must terminate, because at the end of the `childChain` there is a DocumentNode.
+            indirectParent = child.parent
+            c = child
+            while True:
+                for k in range(top, bottom - 1, -1):
+                    if indirectParent.func == sections[k].func:
+                        return self.attach(k, bottom, prevParent, child, c)
+                # Try the next node in the `childChain`.
+                c = indirectParent
+                indirectParent = indirectParent.parent
+                if c == None:
+                    raise TreeifyError(f"Child {child} cannot live inside parent {sections[bottom]}")
+        # The loop must terminate because the document is a default container
         c = child
-        # Search in parent (and recursively in parent´s parent) for a node type that
-        # appears in the childChain.
-        # Start with the direct parent of `child` and work the way down
-        # It must terminate, because at the end of the `childChain` there is a DocumentNode.
-        # The same is true for the chain of parents starting at `parent`.
         while True:
-            # Iterate down the chain of parents, starting at `parent`, and
-            # look for an instance of `indirectParent`.
-            newParent = parent
-            while newParent != rootParent.parent:
-                print(f"    testing child {c.func} {c} against {newParent.func} {newParent}")
-                if indirectParent.func == newParent.func:
-                    return _makeChildIntern(rootParent, index, newParent, prevParent, c)
-                newParent = newParent.parent
-            # Try the next node in the `childChain`.
-            c = indirectParent
-            indirectParent = indirectParent.parent
-            if c == None:
-                raise BaseException(f"Child {child} cannot live inside parent {rootParent}")
+            for k in range(top, bottom - 1, -1):
+                newParent = sections[k]
+                if c.parent != None and c.parent.func == newParent.func:
+                    return self.attach(k, bottom, prevParent, child, c)
+                if c.parentContainer == None and (newParent.isDefaultContainer or (newParent.isExplicitContainer and newParent.indent < child.indent)):
+                    return self.attach(k, bottom, prevParent, child, c)
+            c = c.parent
+            if c == None or c == prevParent:
+                if _trace.enabled:
+                    _trace(child.indent, sections[top].indent)
+                raise TreeifyError(f"Child {child.func} cannot live inside parent {sections[bottom].func}")
+
+    """
+    attach adds `newChild`, which is `child` or one of the containers created for it, to the open section `sections[k]`.
+    The sections following it are closed and `child` becomes the current section.
+    """
+    def attach(self, k, bottom, prevParent, child, newChild):
+        sections = self.sections
+        newParent = sections[k]
+        if newParent == prevParent and newParent == sections[bottom]:
+            if _trace.enabled:
+                _trace(f"     replacing with {newChild.func} at {newParent.func}")
+            # `newChild` takes the place of `child`
+            self.children.append(newChild)
+            newChild.parent = newParent
+        else:
+            if _trace.enabled:
+                _trace(f"     reparenting {newChild.func} to {newParent.func}")
+            newParent.append(newChild)
+        del sections[k + 1:]
+        # Open `newChild` and the containers below it down to `child`
+        chain = []
+        n = child
+        while n != newChild:
+            chain.append(n)
+            n = n.parent
+        chain.append(newChild)
+        chain.reverse()
+        sections.extend(chain)
+        return newChild
 
-    # The loop must terminate because the document is a default container
-    c = child
-    while True:
-        # Iterate down the chain of parents, starting at `parent`, and
-        # look for an instance of `indirectParent`.
-        newParent = parent
-        while newParent != rootParent.parent:
-            print(f"    testing {c.func} of parent {c.parent} against {newParent.func} {newParent.isDefaultContainer}")
-            if c.parent != None and c.parent.func == newParent.func:
-                return _makeChildIntern(rootParent, index, newParent, prevParent, c)
-            if c.parentContainer == None and (newParent.isDefaultContainer or (newParent.isExplicitContainer and newParent.indent < child.indent)):
-                return _makeChildIntern(rootParent, index, newParent, prevParent, c)
-            newParent = newParent.parent
-        c = c.parent
-        if c == None:
-            print(child.indent, parent.indent)
-            raise BaseException(f"Child {child.func} cannot live inside parent {rootParent.func}")
+    """
+    finish replaces the children of `parent` by the nodes which have remained its children.
+    """
+    def finish(self):
+        if self.parent.children != None:
+            self.parent.children[:] = self.children
+        elif len(self.children) != 0:
+            self.parent.children = self.children
 
-def _makeChildIntern(rootParent, index, newParent, prevParent, newChild):
-    if newParent == prevParent and newParent == rootParent:
-        print(f"     replacing with {newChild.func} at {rootParent}")
-        rootParent.children[index] = newChild
-        newChild.parent = rootParent
-        print(f"     new child {newChild} of parent {newChild.parent}")
-        return index + 1, newChild
-    print(f"     reparenting {newChild.func} to {newParent.func}")
-    prevParent.children.pop(index)
-    newParent.append(newChild)
-    return index, newChild
+_dispatcher = Dispatcher()
+_dispatcher.addClass(str, _Frame.visitInline)
+_dispatcher.addClass(StyleNode, _Frame.visitInline)
+_dispatcher.addClass(ParagNode, _Frame.visitSection)
+_dispatcher.addClass(FunctionNode, _Frame.visitFunction)
+_dispatcher.addClass(Node, _Frame.visitOther)
+_handlers = _dispatcher.typeHandlers
 
 def _createIntermediatParents(child):
     parentFunc = child.parentContainer
@@ -123,5 +221,5 @@ def _createIntermediatParents(child):
         p.append(child)
         p.indent = child.indent
         child = p
-        parentFunc = child.parentContainer    
-    return child
\ No newline at end of file
+        parentFunc = child.parentContainer
+    return child
@@ -2,41 +2,54 @@ import sys
 import pymates.markdown
 import pymates.sizes
 import pymates.fonts
-import pymates.qtbackend
-import pymates.pdfbackend
-from pymates.mainwindow import MainWindow
+import pymates.trace
+import pymates.dom
 from pymates.parser import Parser
-from pymates.scanner import Scanner
+from pymates.parsecache import ParseCache
 from pymates.evaluator import Evaluator
 from pymates.treeify import treeify
 from pymates.generator import generate
 from pymates.fonts import registerFont
-from PySide6.QtWidgets import QApplication
-from PySide6.QtGui import QFontDatabase
 
-if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Wrong argument count")
-        sys.exit(1)
-
-    file = open(sys.argv[1])
-    content = file.read()
-    file.close()
-
-    scanner = Scanner(content)
-    parser = Parser(scanner)
+"""
+load parses and evaluates the document in the file at `path` and returns it.
+The styles interned for a previously loaded document are forgotten, such that they can be freed.
+"""
+def load(path, useCache):
+    pymates.dom.resetStyles()
+    parser = Parser()
     # Add builtins
     parser.addBuiltins(pymates.markdown)
     parser.addBuiltins(pymates.sizes)
-    parser.parse()
+    # An unchanged file is not parsed again
+    ParseCache(enabled = useCache).parseFile(parser, path)
 
     ev = Evaluator()
     for step in (None, "counters", "references"):
         ev.evaluate(parser.doc, parser.nspace, step)
         if step == None:
             treeify(parser.doc)
-    
-    app = QApplication(sys.argv)
+    return parser.doc
+
+if __name__ == '__main__':
+    # --trace=categories enables the trace, see pymates.trace
+    args = pymates.trace.configureFromArguments(sys.argv[1:])
+    # --no-cache parses the file even if it is in the parse cache
+    useCache = "--no-cache" not in args
+    args = [a for a in args if a != "--no-cache"]
+    if len(args) != 1:
+        print("Wrong argument count")
+        sys.exit(1)
+
+    doc = load(args[0], useCache)
+
+    # Qt and reportlab are imported only once the document is known to be valid
+    import pymates.qtbackend
+    import pymates.pdfbackend
+    from pymates.mainwindow import MainWindow
+    from PySide6.QtWidgets import QApplication
+
+    app = QApplication(sys.argv[:1] + args)
     app.setApplicationDisplayName("Preview")
     app.setApplicationName("Preview")
 
@@ -48,9 +61,11 @@ if __name__ == '__main__':
     pymates.fonts.addFontBackend(pymates.qtbackend)
     # pymates.fonts.setFontMetricsBackend(pymates.qtbackend)
 
-    d = generate(parser.doc)
+    d = generate(doc)
 
     mw.setDocument(d)
+    # F5 loads the file again, e.g. after it has been edited
+    mw.setReloadHandler(lambda: generate(load(args[0], useCache)))
     mw.show()
     sys.exit(app.exec_())
 
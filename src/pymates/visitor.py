@@ -0,0 +1,97 @@
+from pymates import PymatesError
+
+"""
+visitor finds the handlers of DOM nodes for passes over the DOM, e.g. the generator, the Evaluator and treeify.
+Handlers are registered for classes of nodes, including str for text, and for the functions which created the nodes.
+A class handler applies to subclasses as well, unless they have a handler of their own. A function handler applies
+to the nodes whose class has no handler, e.g. to the nodes created by functions which a document defines.
+The handler of each type is determined once and cached, such that dispatching a node costs a dict lookup
+instead of a chain of isinstance checks:
+
+    dispatcher = Dispatcher()
+    dispatcher.addClass(str, genText)
+    dispatcher.addClass(ParagNode, genParag)
+    dispatcher.addFunc(mybox, genMyBox)
+    ...
+    dispatcher.handler(node)(node, doc, cursor)
+
+The dispatcher does not call the handlers, hence each pass chooses their arguments.
+"""
+class Dispatcher:
+    def __init__(self, default = None):
+        # Handlers by the classes they have been registered for
+        self.classHandlers = {}
+        # Handlers by the `func` of nodes
+        self.funcHandlers = {}
+        # Handlers by the exact type of nodes. It is filled on demand from classHandlers, see resolve.
+        # Loops can look up the handler of a node here first and call `handler` if there is none:
+        #     h = typeHandlers.get(type(node)) or dispatcher.handler(node)
+        self.typeHandlers = {}
+        # The types without class handler, whose nodes are dispatched by their function
+        self.funcTypes = set()
+        # The handler of nodes which have neither a class handler nor a function handler, or None
+        self.default = default
+
+    """
+    addClass registers `handler` for the nodes of class `cls` and of its subclasses.
+    """
+    def addClass(self, cls, handler):
+        self.classHandlers[cls] = handler
+        self.typeHandlers.clear()
+        self.funcTypes.clear()
+
+    """
+    addFunc registers `handler` for the nodes created by `func`, unless their class has a handler.
+    """
+    def addFunc(self, func, handler):
+        self.funcHandlers[func] = handler
+
+    """
+    handler returns the handler of `node`. It raises PymatesError if there is none.
+    """
+    def handler(self, node):
+        cls = type(node)
+        h = self.typeHandlers.get(cls)
+        if h != None:
+            return h
+        if cls not in self.funcTypes:
+            h = self.resolve(cls)
+            if h != None:
+                return h
+        h = self.funcHandlers.get(node.func, self.default)
+        if h == None:
+            raise PymatesError(f"No handler for {getattr(node.func, '__name__', node.func)}")
+        return h
+
+    """
+    resolve returns the handler of the type `cls`, which is the class handler of `cls` or of its closest base class.
+    If there is none, it returns None and the nodes of this type are dispatched by their function.
+    """
+    def resolve(self, cls):
+        for c in cls.__mro__:
+            h = self.classHandlers.get(c)
+            if h != None:
+                self.typeHandlers[cls] = h
+                return h
+        self.funcTypes.add(cls)
+        return None
+
+"""
+Visitor is the base of passes which handle nodes by their methods.
+The handlers registered with the dispatcher are functions, e.g. `MyPass.visitParag`, which are called with the visitor,
+the node and the remaining arguments of `visit`.
+"""
+class Visitor:
+    def __init__(self, dispatcher):
+        self.dispatcher = dispatcher
+
+    def visit(self, node, *args):
+        return self.dispatcher.handler(node)(self, node, *args)
+
+    """
+    visitChildren visits the children of `node` in order.
+    """
+    def visitChildren(self, node, *args):
+        if node.children != None:
+            for c in node.children:
+                self.visit(c, *args)
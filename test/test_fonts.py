@@ -0,0 +1,73 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pymates.fonts
+import pymates.headlessbackend
+from pymates.fonts import Font
+
+pymates.fonts.setFontMetricsBackend(pymates.headlessbackend)
+
+def _words(n, prefix = "w"):
+    return [f"{prefix}{i}" for i in range(0, n)]
+
+class AdvanceCacheTest(unittest.TestCase):
+    def setUp(self):
+        # A Font of its own, such that the counters of the shared fonts are not involved
+        self.font = Font("Helvetica", 12)
+
+    def test_eviction(self):
+        f = self.font
+        n = pymates.fonts._maxAdvances
+        words = _words(n + 10)
+        advances = [f.advance(w) for w in words]
+        self.assertEqual(f.advanceMisses, n + 10)
+        self.assertEqual(f.advanceHits, 0)
+        self.assertEqual(len(f.advances), n)
+        # The least recently used words have been dropped
+        self.assertNotIn(words[9], f.advances)
+        self.assertIn(words[10], f.advances)
+        self.assertEqual(f.advance(words[-1]), advances[-1])
+        self.assertEqual(f.advanceHits, 1)
+        # A hit makes a word the most recently used one
+        f.advance(words[10])
+        f.advance("new")
+        self.assertIn(words[10], f.advances)
+        self.assertNotIn(words[11], f.advances)
+        self.assertEqual(f.advanceHits, 2)
+        self.assertEqual(f.advanceMisses, n + 11)
+        # An evicted word is measured again
+        self.assertEqual(f.advance(words[0]), advances[0])
+        self.assertEqual(f.advanceMisses, n + 12)
+        self.assertEqual(len(f.advances), n)
+
+    def test_advanceWords(self):
+        f = self.font
+        n = pymates.fonts._maxAdvances
+        words = _words(n + 100)
+        for a, w in zip(f.advanceWords(words), words):
+            # NumPy may sum the glyph advances in another order
+            self.assertAlmostEqual(a, f._measure(w))
+        self.assertEqual(f.advanceMisses, n + 100)
+        self.assertEqual(len(f.advances), n)
+        # The most recent words are hits, the first ones have been dropped
+        f.advanceWords(words[-50:] + words[:50])
+        self.assertEqual(f.advanceHits, 50)
+        self.assertEqual(f.advanceMisses, n + 150)
+        self.assertEqual(len(f.advances), n)
+
+    def test_stats(self):
+        f = pymates.fonts.font("Helvetica", 13.5)
+        stats = pymates.fonts.advanceCacheStats()
+        f.advance("cached")
+        f.advance("cached")
+        f.advance("other")
+        after = pymates.fonts.advanceCacheStats()
+        self.assertEqual(after["hits"] - stats["hits"], 1)
+        self.assertEqual(after["misses"] - stats["misses"], 2)
+        self.assertEqual(after["size"] - stats["size"], 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import os
+import sys
+import hashlib
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pymates.markdown
+import pymates.sizes
+from pymates.parser import Parser
+from pymates.scanner import Scanner
+from pymates.parsecache import ParseCache
+from treedump import dumpTree
+
+_dir = os.path.dirname(os.path.abspath(__file__))
+
+def _parser():
+    parser = Parser()
+    parser.addBuiltins(pymates.markdown)
+    parser.addBuiltins(pymates.sizes)
+    return parser
+
+def _parse(src):
+    parser = _parser()
+    parser.setInput(Scanner(src))
+    parser.parse()
+    return parser.doc
+
+def _key(cache, parser, src):
+    return cache.key(hashlib.sha256(src.encode()).digest(), parser.nspace)
+
+def _entries(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".pickle"))
+
+class ParseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp.name, "parse")
+        with open(os.path.join(_dir, "example1.md"), encoding = "utf-8") as file:
+            self.src = file.read()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hit(self):
+        cache = ParseCache(self.directory)
+        first = _parser()
+        cache.parse(first, self.src)
+        self.assertEqual(len(_entries(self.directory)), 1)
+        self.assertIsNotNone(cache.load(_key(cache, first, self.src)))
+        second = _parser()
+        cache.parse(second, self.src)
+        self.assertIsNot(second.doc, first.doc)
+        self.assertEqual(dumpTree(second.doc), dumpTree(_parse(self.src)))
+        self.assertEqual(dumpTree(second.doc), dumpTree(first.doc))
+
+    def test_hitFile(self):
+        cache = ParseCache(self.directory)
+        path = os.path.join(_dir, "slides.md")
+        cache.parseFile(_parser(), path)
+        parser = _parser()
+        cache.parseFile(parser, path)
+        with open(path, encoding = "utf-8") as file:
+            self.assertEqual(dumpTree(parser.doc), dumpTree(_parse(file.read())))
+        cache.invalidateFile(parser, path)
+        self.assertEqual(_entries(self.directory), [])
+
+    def test_truncatedEntry(self):
+        cache = ParseCache(self.directory)
+        cache.parse(_parser(), self.src)
+        name, = _entries(self.directory)
+        path = os.path.join(self.directory, name)
+        with open(path, "rb") as file:
+            data = file.read()
+        with open(path, "wb") as file:
+            file.write(data[:len(data) // 2])
+        # A broken entry is a miss and is removed
+        self.assertIsNone(cache.load(name[:-len(".pickle")]))
+        self.assertFalse(os.path.exists(path))
+        # The next parse stores it again
+        parser = _parser()
+        cache.parse(parser, self.src)
+        self.assertEqual(dumpTree(parser.doc), dumpTree(_parse(self.src)))
+        self.assertEqual(_entries(self.directory), [name])
+
+    def test_eviction(self):
+        cache = ParseCache(self.directory)
+        cache.parse(_parser(), self.src)
+        size = os.path.getsize(os.path.join(self.directory, _entries(self.directory)[0]))
+        cache.clear()
+        # Room for about three entries
+        cache.maxSize = size * 3 + size // 2
+        for i in range(0, 10):
+            cache.parse(_parser(), self.src + f"\n\nParagraph {i}\n")
+            names = _entries(self.directory)
+            total = sum(os.path.getsize(os.path.join(self.directory, name)) for name in names)
+            self.assertLessEqual(total, cache.maxSize)
+            self.assertGreater(len(names), 0)
+            # Make the order of the entries independent of the resolution of the file system timestamps
+            for name in names:
+                path = os.path.join(self.directory, name)
+                st = os.stat(path)
+                os.utime(path, (st.st_atime - 10, st.st_mtime - 10))
+        # The most recent entry is kept
+        self.assertIsNotNone(cache.load(_key(cache, _parser(), self.src + "\n\nParagraph 9\n")))
+
+    def test_unwritableDirectory(self):
+        # The cache directory cannot be created below a file
+        blocker = os.path.join(self.tmp.name, "file")
+        with open(blocker, "w") as file:
+            file.write("x")
+        cache = ParseCache(os.path.join(blocker, "parse"))
+        self.assertFalse(cache.enabled)
+        parser = _parser()
+        cache.parse(parser, self.src)
+        self.assertEqual(dumpTree(parser.doc), dumpTree(_parse(self.src)))
+
+    def test_directoryRemoved(self):
+        cache = ParseCache(self.directory)
+        # The directory disappears after the cache has been created, such that entries cannot be written
+        os.rmdir(self.directory)
+        with open(self.directory, "w") as file:
+            file.write("x")
+        parser = _parser()
+        cache.parse(parser, self.src)
+        self.assertEqual(dumpTree(parser.doc), dumpTree(_parse(self.src)))
+        self.assertEqual(os.listdir(self.tmp.name), ["parse"])
+
+    def test_disabled(self):
+        cache = ParseCache(self.directory, enabled = False)
+        parser = _parser()
+        cache.parse(parser, self.src)
+        self.assertEqual(dumpTree(parser.doc), dumpTree(_parse(self.src)))
+        self.assertFalse(os.path.exists(self.directory))
+
+if __name__ == "__main__":
+    unittest.main()
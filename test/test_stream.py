@@ -0,0 +1,164 @@
+import gc
+import os
+import sys
+import unittest
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pymates.markdown
+import pymates.sizes
+import pymates.fonts
+import pymates.headlessbackend
+import pymates.timing
+from pymates.parser import Parser
+from pymates.scanner import Scanner
+from pymates.evaluator import Evaluator
+from pymates.treeify import treeify
+from pymates.generator import generate, generateStream
+from pymates.lom import Layouter
+
+pymates.fonts.setFontMetricsBackend(pymates.headlessbackend)
+
+_titleOnlyDeck = """\\slidedeck
+\\setvar("author", "Hans Wurst")
+\\footer \\var("author"), Rautavistische Systeme
+\\slide
+\\title Slide Title One
+
+This is slide number one.
+
+\\slide
+\\title Title Only Slide
+
+\\slide
+\\title Slide Title Three
+
+This is slide number three.
+"""
+
+def _book(chapters):
+    paragraph = "Text is laid out in blocks, which are broken into lines. Some words are *emphasized*. " * 6
+    return "".join(f"# Chapter {i}\n\n" + (paragraph + "\n\n") * 50 for i in range(0, chapters))
+
+def _parse(src):
+    parser = Parser()
+    parser.addBuiltins(pymates.markdown)
+    parser.addBuiltins(pymates.sizes)
+    parser.setInput(Scanner(src))
+    parser.parse()
+    ev = Evaluator()
+    for step in (None, "counters", "references"):
+        ev.evaluate(parser.doc, parser.nspace, step)
+        if step == None:
+            treeify(parser.doc)
+    return parser.doc
+
+"""
+_Recorder records the calls of Page.draw, such that the contents of pages can be compared.
+"""
+class _Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def startText(self, x, y):
+        self.calls.append(("startText", x, y))
+
+    def setPen(self, color):
+        self.calls.append(("setPen", color.r, color.g, color.b))
+
+    def setFont(self, font):
+        self.calls.append(("setFont", font.registeredFont.name, font.size))
+
+    def drawText(self, x, y, txt):
+        self.calls.append(("drawText", x, y, txt))
+
+def _draw(page):
+    r = _Recorder()
+    page.draw(r)
+    return r.calls
+
+def _batchPages(src):
+    layouter = Layouter(generate(_parse(src)))
+    layouter.layout()
+    return [_draw(page) for page in layouter.pages]
+
+def _streamedPages(src):
+    pages = []
+    for page in Layouter(generateStream(_parse(src))).layoutPages():
+        pages.append(_draw(page))
+        page.release()
+    return pages
+
+"""
+_streamedPeak returns the number of pages of `doc` and the peak of the memory allocated while they are streamed.
+"""
+def _streamedPeak(doc):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        pages = 0
+        for page in Layouter(generateStream(doc)).layoutPages():
+            # The calls recorded for the page are dropped
+            _draw(page)
+            page.release()
+            pages += 1
+        return pages, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+class StreamTest(unittest.TestCase):
+    def assertSamePages(self, src, count):
+        batch = _batchPages(src)
+        streamed = _streamedPages(src)
+        self.assertEqual(len(batch), count)
+        self.assertEqual(len(streamed), count)
+        self.assertEqual(streamed, batch)
+
+    def test_titleOnlySlide(self):
+        self.assertSamePages(_titleOnlyDeck, 3)
+        self.assertIn("Only", [c[3] for c in _streamedPages(_titleOnlyDeck)[1] if c[0] == "drawText"])
+
+    def test_commentOnly(self):
+        self.assertSamePages("// Nothing but a comment\n", 1)
+
+    def test_empty(self):
+        self.assertSamePages("", 0)
+
+    def test_memoryFlat(self):
+        # Fonts and caches are loaded before measuring
+        _streamedPeak(_parse(_book(1)))
+        smallPages, small = _streamedPeak(_parse(_book(2)))
+        largePages, large = _streamedPeak(_parse(_book(8)))
+        self.assertGreater(largePages, 3 * smallPages)
+        # The blocks of laid out pages are freed, hence the peak does not grow with the number of pages
+        self.assertLess(large, small * 1.5)
+
+    def test_profileSpans(self):
+        # One flow spanning several pages
+        doc = _parse("Some text. " * 3000)
+        profiler = pymates.timing.profiler
+        profiler.clear()
+        profiler.enable()
+        try:
+            with profiler.span("caller"):
+                for page in Layouter(generateStream(doc)).layoutPages():
+                    _draw(page)
+                    page.release()
+        finally:
+            profiler.enable(False)
+        spans = {}
+        for name, category, start, end, duration, selfDuration, args in profiler.spans:
+            spans.setdefault(name, []).append((start, end, duration))
+        profiler.clear()
+        self.assertGreater(len(spans["page"]), 1)
+        self.assertEqual(len(spans["draw"]), len(spans["page"]))
+        # The layout and flow spans are suspended while the caller draws a page, but recorded once
+        self.assertEqual(len(spans["layout"]), 1)
+        self.assertEqual(len(spans["flow"]), 1)
+        start, end, duration = spans["layout"][0]
+        drawn = sum(d for s, e, d in spans["draw"])
+        self.assertLessEqual(duration, end - start - drawn)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pymates.dom import internStyle, mergeStyle, resetStyles
+
+class StyleTest(unittest.TestCase):
+    def tearDown(self):
+        resetStyles()
+
+    def test_merge(self):
+        s1 = internStyle({"fontSize": 12, "pageBox": "a"})
+        s2 = internStyle({"fontWeight": 700, "pageBox": "b"})
+        merged = mergeStyle(s1, s2)
+        self.assertEqual(merged, {"fontSize": 12, "fontWeight": 700, "pageBox": ["a", "b"]})
+        self.assertTrue(merged.interned)
+        self.assertIs(mergeStyle(s1, s2), merged)
+        self.assertIs(internStyle({"fontSize": 12, "fontWeight": 700, "pageBox": ["a", "b"]}), merged)
+
+    def test_mergeAfterReset(self):
+        s2 = internStyle({"fontWeight": 700})
+        # Styles interned before resetStyles keep their flag, e.g. those held by a document loaded before
+        old = internStyle({"fontSize": 12})
+        resetStyles()
+        self.assertEqual(mergeStyle(old, s2), {"fontSize": 12, "fontWeight": 700})
+        oldId = id(old)
+        del old
+        # Styles interned now may get the id of a freed style
+        styles = []
+        for i in range(0, 1000):
+            s = internStyle({"fontSize": 13 + i})
+            styles.append(s)
+            if id(s) == oldId:
+                break
+        for i, s in enumerate(styles):
+            self.assertEqual(mergeStyle(s, s2), {"fontSize": 13 + i, "fontWeight": 700})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pymates.scanner import TokenStream
+
+_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Pieces of markdown which are inserted by random edits. They start and end tokens of all kinds.
+_fragments = ("a", "word ", " ", "  ", "\n", "\n\n", "# ", "## ", "> ", "- ", " - ", "1. ", "12", ".", ":", ": \n",
+    "|", "| ", "_", "*", "{", "}", "\\bold", "\\p(", "(", ")", ",", "\"", "\\", "`", "``", "```", "$", "$$",
+    "//", "// note\n", "\t", "x y z\n")
+
+def _dump(tokens):
+    return [(r.fromOffset, r.fromLine, r.fromLinePos, r.toOffset, t, s) for r, t, s in tokens]
+
+def _sources():
+    for name in sorted(os.listdir(_dir)):
+        if name.endswith(".md"):
+            with open(os.path.join(_dir, name), encoding = "utf-8") as file:
+                yield file.read()
+
+class TokenStreamTest(unittest.TestCase):
+    def assertRescanned(self, ts):
+        fresh = TokenStream(ts.src)
+        self.assertEqual(_dump(ts.tokens), _dump(fresh.tokens))
+        self.assertEqual(ts.states, fresh.states)
+
+    def test_randomEdits(self):
+        rnd = random.Random(4)
+        generated = "".join(rnd.choice(_fragments) for i in range(0, 1000))
+        for src in list(_sources()) + [generated]:
+            ts = TokenStream(src)
+            for i in range(0, 300):
+                offset = rnd.randint(0, len(ts.src))
+                deleted = rnd.randint(0, min(8, len(ts.src) - offset))
+                inserted = "".join(rnd.choice(_fragments) for j in range(0, rnd.randint(0, 3)))
+                with self.subTest(edit = i, offset = offset, deleted = deleted, inserted = inserted):
+                    first, oldEnd, newEnd = ts.edit(offset, deleted, inserted)
+                    self.assertLessEqual(first, newEnd)
+                    self.assertRescanned(ts)
+
+    def test_editReturnsChangedTokens(self):
+        ts = TokenStream("# One\n\nSome text.\n\n# Two\n\nMore text.\n")
+        old = _dump(ts.tokens)
+        first, oldEnd, newEnd = ts.edit(ts.src.index("Some"), 4, "Other")
+        self.assertRescanned(ts)
+        new = _dump(ts.tokens)
+        self.assertEqual(new[:first], old[:first])
+        self.assertEqual(len(new) - newEnd, len(old) - oldEnd)
+        self.assertEqual([t[4:] for t in new[newEnd:]], [t[4:] for t in old[oldEnd:]])
+
+    def test_editAtEnds(self):
+        ts = TokenStream("")
+        ts.edit(0, 0, "Text")
+        self.assertRescanned(ts)
+        ts.edit(0, 0, "# ")
+        self.assertRescanned(ts)
+        ts.edit(len(ts.src), 0, "\n\n- item\n")
+        self.assertRescanned(ts)
+        ts.edit(0, len(ts.src), "")
+        self.assertRescanned(ts)
+
+if __name__ == "__main__":
+    unittest.main()
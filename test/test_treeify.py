@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pymates.markdown
+import pymates.sizes
+from pymates.dom import Node
+from pymates.parser import Parser
+from pymates.scanner import Scanner
+from pymates.evaluator import Evaluator
+from pymates.treeify import treeify, TreeifyError
+from treedump import dumpTree
+
+_dir = os.path.dirname(os.path.abspath(__file__))
+# The trees recorded for the documents. Set PYMATES_RECORD=1 to record them again.
+_fixture = os.path.join(_dir, "treeify.json")
+
+# Lines of generated documents. Items and paragraphs are indented at random.
+_lines = ("# Heading", "## Subheading", "Text with *emphasis* and \\bold{bold}.", "More text", "- Item", "- Item",
+    "\\p\\bold Styled paragraph", "\\slide", "\\title Title", "\\footer Footer", "")
+
+def _generate(seed):
+    rnd = random.Random(seed)
+    lines = []
+    for i in range(0, rnd.randint(5, 20)):
+        line = rnd.choice(_lines)
+        if line.startswith("-"):
+            line = rnd.choice(("", "", "  ", "    ")) + line
+        elif line.startswith("Text"):
+            line = rnd.choice(("", "", "", "  ")) + line
+        lines.append(line)
+        if rnd.random() < 0.5:
+            lines.append("")
+    return "\n".join(lines) + "\n"
+
+def _documents():
+    for name in sorted(os.listdir(_dir)):
+        if name.endswith(".md"):
+            with open(os.path.join(_dir, name), encoding = "utf-8") as file:
+                yield name, file.read()
+    for seed in range(0, 40):
+        yield f"generated{seed}", _generate(seed)
+
+def _treeify(src):
+    parser = Parser()
+    parser.addBuiltins(pymates.markdown)
+    parser.addBuiltins(pymates.sizes)
+    parser.setInput(Scanner(src))
+    parser.parse()
+    Evaluator().evaluate(parser.doc, parser.nspace)
+    treeify(parser.doc)
+    return parser.doc
+
+def _result(src):
+    try:
+        return dumpTree(_treeify(src))
+    except TreeifyError:
+        return "TreeifyError"
+
+class TreeifyTest(unittest.TestCase):
+    def assertParents(self, node):
+        for c in node.children or ():
+            if isinstance(c, Node):
+                self.assertIs(c.parent, node)
+                self.assertParents(c)
+
+    def test_fixture(self):
+        results = {name: _result(src) for name, src in _documents()}
+        if os.environ.get("PYMATES_RECORD"):
+            with open(_fixture, "w", encoding = "utf-8") as file:
+                # One line per document
+                file.write("{\n" + ",\n".join(f"{json.dumps(name)}: {json.dumps(results[name])}" for name in sorted(results)) + "\n}\n")
+        with open(_fixture, encoding = "utf-8") as file:
+            recorded = json.load(file)
+        self.assertEqual(sorted(results), sorted(recorded))
+        for name in results:
+            with self.subTest(document = name):
+                self.assertEqual(results[name], recorded[name])
+
+    def test_parents(self):
+        for name, src in _documents():
+            with self.subTest(document = name):
+                try:
+                    doc = _treeify(src)
+                except TreeifyError:
+                    continue
+                self.assertParents(doc)
+
+    def test_sectionWithoutParent(self):
+        # The search for a parent reaches the node which contained the paragraph before (c == prevParent)
+        with self.assertRaises(TreeifyError):
+            _treeify("# Heading\n\n   Indented paragraph\n")
+        # The search reaches the end of the containers created for the item (c == None)
+        with self.assertRaises(TreeifyError):
+            _treeify("# Heading\n  - Item\n")
+
+    def test_nestedItems(self):
+        doc = _treeify("- One\n  - Two\n    - Three\n- Four\n")
+        self.assertEqual(dumpTree(doc)[4], [
+            ["ParagNode", "bulletlist", None, 0, {}, [
+                ["ParagNode", "bulletitem", None, 0, {"enum": "- ", "fontSize": 12}, ["One",
+                    ["ParagNode", "bulletlist", None, 2, {}, [
+                        ["ParagNode", "bulletitem", None, 2, {"enum": "- ", "fontSize": 12}, ["Two",
+                            ["ParagNode", "bulletlist", None, 4, {}, [
+                                ["ParagNode", "bulletitem", None, 4, {"enum": "- ", "fontSize": 12}, ["Three"]]]]]]]]]],
+                ["ParagNode", "bulletitem", None, 0, {"enum": "- ", "fontSize": 12}, ["Four"]]]]])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pymates import PymatesError
+from pymates.dom import Node, ParagNode, SpanNode
+from pymates.visitor import Dispatcher
+
+def _mybox():
+    pass
+
+def _other():
+    pass
+
+class DispatcherTest(unittest.TestCase):
+    def test_handlers(self):
+        d = Dispatcher()
+        d.addClass(str, "text")
+        d.addClass(Node, "node")
+        d.addFunc(_mybox, "mybox")
+        self.assertEqual(d.handler("x"), "text")
+        # A class handler applies to subclasses
+        self.assertEqual(d.handler(ParagNode(_mybox)), "node")
+        d.addClass(ParagNode, "parag")
+        self.assertEqual(d.handler(ParagNode(_mybox)), "parag")
+        self.assertEqual(d.handler(SpanNode(_other)), "node")
+
+    def test_funcHandlers(self):
+        d = Dispatcher()
+        d.addClass(ParagNode, "parag")
+        d.addFunc(_mybox, "mybox")
+        self.assertEqual(d.handler(SpanNode(_mybox)), "mybox")
+        with self.assertRaises(PymatesError):
+            d.handler(SpanNode(_other))
+        self.assertEqual(Dispatcher("default").handler(SpanNode(_other)), "default")
+
+if __name__ == "__main__":
+    unittest.main()
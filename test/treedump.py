@@ -0,0 +1,39 @@
+from enum import Enum
+import pymates.dom
+
+"""
+dumpTree returns the DOM tree below `node` as nested lists of strings, numbers and None,
+such that trees can be compared and stored as JSON.
+"""
+def dumpTree(node):
+    if isinstance(node, str):
+        return node
+    out = [type(node).__name__, _funcName(node.func), node.className, node.indent]
+    if isinstance(node, pymates.dom.FunctionNode):
+        out.append([node.mode.name, _dumpValue(node.args), _dumpValue(node.kwargs)])
+    elif isinstance(node, (pymates.dom.ParagNode, pymates.dom.StyleNode)):
+        out.append(_dumpValue(node.style))
+    out.append([dumpTree(c) for c in node.children or ()])
+    return out
+
+def _funcName(func):
+    if func == None or isinstance(func, str):
+        return func
+    return getattr(func, "__qualname__", type(func).__name__)
+
+def _dumpValue(value):
+    if value == None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, Enum):
+        return str(value)
+    if isinstance(value, dict):
+        return {str(k): _dumpValue(v) for k, v in sorted(value.items(), key = lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_dumpValue(v) for v in value]
+    if isinstance(value, pymates.dom.Node):
+        return dumpTree(value)
+    if callable(value):
+        return _funcName(value)
+    if hasattr(value, "__dict__"):
+        return [type(value).__name__, _dumpValue(vars(value))]
+    return repr(value)